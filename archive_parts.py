@@ -6,26 +6,38 @@
 # Project is distributed under the terms of the GNU General Public License v3.0
 
 import argparse
+import os
+import sys
 import exporter_kicad
 
 def main():
     parser = argparse.ArgumentParser()
+    parser.add_argument('-e', dest='epoch',
+                        help='use fixed timestamp or \'digest\' for timestamps based on contents',
+                        default=os.environ.get('SOURCE_DATE_EPOCH'))
     parser.add_argument('-l', dest='library', help='add footprints to a specified library',
                         default=None)
+    parser.add_argument('-u', dest='update', help='update parts of an existing library',
+                        default=False, action='store_true')
     parser.add_argument(dest='files', nargs='*')
     options = parser.parse_args()
 
-    parts = []
+    # Unchanged parts of an existing library are copied from their original positions
+    parts = {}
+    if options.update and options.library is not None and os.path.exists(options.library):
+        parts.update(exporter_kicad.Converter.index_archive(options.library))
     for filename in options.files:
-        with open(filename, 'rb') as file:
-            parts.append(file.read().decode('utf-8'))
-    library_data = exporter_kicad.Converter.archive(parts)
+        name, source = exporter_kicad.Converter.index_part(filename)
+        parts[name] = source
 
     if options.library is not None:
-        with open(options.library, 'wb') as file:
-            file.write(library_data.encode('utf-8'))
+        # Library is replaced only after all parts were copied
+        temporary_path = options.library + '.tmp'
+        with open(temporary_path, 'wb') as file:
+            exporter_kicad.Converter.write_archive(file, parts, options.epoch)
+        os.replace(temporary_path, options.library)
     else:
-        print(library_data)
+        exporter_kicad.Converter.write_archive(sys.stdout.buffer, parts, options.epoch)
 
 if __name__ == '__main__':
     main()
@@ -7,7 +7,6 @@
 
 from collections import deque
 import itertools
-import copy
 import math
 import numpy as np
 
@@ -17,6 +16,9 @@ from wrlconv import model
 DEBUG_ENABLED = False
 DISCARD, HIDDEN, CHAMFER, FUNCTOR, INVERSION, RESOLUTION, TENSION = range(7)
 
+# Connectivity is shared between objects built from the same edges and faces
+TOPOLOGY_CACHE = {}
+
 def make_control_points(points, controls=None):
     default_tension = 1.0 / 3.0
     output_controls = []
@@ -239,6 +241,48 @@ def unpack_index(pair):
     return pair if isinstance(pair, int) else pair[0]
 
 
+def freeze_indices(groups):
+    return tuple(tuple(group) if isinstance(group, list) else group for group in groups)
+
+
+class Topology:
+    def __init__(self, edges, faces):
+        self.edges = unpack_edges(edges) if edges is not None and edges else unpack_faces(faces)
+        self.edges.sort()
+        self.graph = make_graph(self.edges)
+        self.sequences = {}
+
+    def get_joint_sequence(self, number):
+        if number in self.sequences:
+            return self.sequences[number]
+
+        points = self.graph[number]
+        graph_copy = {key: value for key, value in self.graph.items() if key != number}
+
+        min_sequence, min_length = None, None
+        for sequence in itertools.permutations(points, len(points)):
+            current_length = 0
+            for i, current in enumerate(sequence):
+                previous = sequence[i - 1]
+                current_length += len(find_shortest_path(graph_copy, previous, current))
+            if min_length is None or min_length > current_length:
+                min_sequence, min_length = sequence, current_length
+
+        self.sequences[number] = min_sequence
+        return min_sequence
+
+
+def make_topology(edges, faces):
+    if edges is not None and edges:
+        key = (freeze_indices(edges), None)
+    else:
+        key = (None, freeze_indices(freeze_indices(face) for face in faces))
+
+    if key not in TOPOLOGY_CACHE:
+        TOPOLOGY_CACHE[key] = Topology(edges, faces)
+    return TOPOLOGY_CACHE[key]
+
+
 class BezierObject:
     EPSILON = 1e-12
 
@@ -458,9 +502,9 @@ class BezierObject:
     def __init__(self, vertices, edges, faces, chamfer, edge_resolution, line_resolution,
                  sharpness=math.pi, vertex_attributes=None, edge_attributes=None,
                  face_attributes=None):
-        self.edges = unpack_edges(edges) if edges is not None and edges else unpack_faces(faces)
-        self.edges.sort()
-        self.graph = make_graph(self.edges)
+        self.topology = make_topology(edges, faces)
+        self.edges = self.topology.edges
+        self.graph = self.topology.graph
         self.vertices = vertices
         self.faces = faces
 
@@ -925,20 +969,7 @@ class BezierObject:
         for number in [key for key, value in self.graph.items() if len(value) > 3]:
             if self.is_vertex_discarded(number):
                 continue
-
-            graph_copy = copy.deepcopy(self.graph)
-            points = graph_copy[number]
-            del graph_copy[number]
-
-            min_sequence, min_length = None, None
-            for sequence in itertools.permutations(points, len(points)):
-                current_length = 0
-                for i, current in enumerate(sequence):
-                    previous = sequence[i - 1]
-                    current_length += len(find_shortest_path(graph_copy, previous, current))
-                if min_length is None or min_length > current_length:
-                    min_sequence, min_length = sequence, current_length
-            joint_points[number] = min_sequence
+            joint_points[number] = self.topology.get_joint_sequence(number)
 
         # Calculate corner positions and tangent vectors, calculate corner patches
         for number, sequence in joint_points.items():
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# build_lib.py
+# Copyright (C) 2026 xent
+# Project is distributed under the terms of the GNU General Public License v3.0
+
+import argparse
+import json
+import os
+import re
+
+import fp
+import mod
+import primitives
+from wrlconv import vrml_export, vrml_export_kicad, vrml_import, x3d_export, x3d_import
+
+def parse_args(args=None):
+    config_path = f'{os.path.dirname(os.path.realpath(__file__))}/config.json'
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('-c', dest='config', help='path to a configuration file',
+                        default=config_path)
+    parser.add_argument('-d', dest='debug', help='show debug information',
+                        default=False, action='store_true')
+    parser.add_argument('-e', dest='epoch',
+                        help='use fixed timestamp or \'digest\' for timestamps based on contents',
+                        default=os.environ.get('SOURCE_DATE_EPOCH'))
+    parser.add_argument('-f', dest='pattern', help='filter parts by name',
+                        default='.*')
+    parser.add_argument('-l', dest='library', help='add parts to a specified library',
+                        default=None)
+    parser.add_argument('-o', dest='output', help='write footprints and models to a directory',
+                        default=None)
+    parser.add_argument('--legacy', dest='legacy', help='use legacy footprint format',
+                        default=False, action='store_true')
+    parser.add_argument('--legacy-pretty', dest='legacy_pretty', help='use old s-expression format',
+                        default=False, action='store_true')
+    parser.add_argument('--pretty', dest='pretty',
+                        help='use s-expression format together with other selected formats',
+                        default=False, action='store_true')
+    mod.add_export_arguments(parser)
+    parser.add_argument(dest='files', nargs='*')
+
+    return parser.parse_args(args)
+
+def load_config(config_file):
+    # Missing sections of a custom configuration are taken from the default configuration
+    config_path = f'{os.path.dirname(os.path.realpath(__file__))}/config.json'
+    config = json.load(open(config_path, 'rb'))
+    if os.path.realpath(config_file) != os.path.realpath(config_path):
+        config.update(json.load(open(config_file, 'rb')))
+    return config
+
+def main(options):
+    config = load_config(options.config)
+    specs_default = config['specs']
+
+    output_formats = []
+    if options.legacy:
+        output_formats.append(fp.Generator.FORMAT_LEGACY)
+    if options.legacy_pretty:
+        output_formats.append(fp.Generator.FORMAT_SEXPRESSION_LEGACY)
+    if options.pretty or not output_formats:
+        output_formats.append(fp.Generator.FORMAT_SEXPRESSION)
+
+    # Builders are resolved once for all descriptions
+    generator = fp.Generator(options.library, options.output, output_formats, options.vrml,
+                             options.epoch)
+    types = mod.load_package_types()
+    pattern = re.compile(options.pattern, re.S)
+    lods = options.lods.split(',') if options.lods is not None else None
+    primitives.PATTERNS.enabled = not options.isolated
+
+    for filename in options.files:
+        # Description is parsed and filtered once for both footprints and models
+        desc = json.load(open(filename, 'rb'))
+        spec = desc['specs'] if 'specs' in desc else specs_default
+        parts = [part for part in desc['parts'] if pattern.search(part['title']) is not None]
+
+        footprints = generator.load_footprints(spec, parts, None)
+        batches = mod.load_description_models(config, types, desc, os.path.dirname(filename),
+                                              parts, lods, fp.make_model_names(footprints))
+
+        generator.write_footprints(footprints, options.debug)
+        if options.output is not None:
+            for lod, models in batches.items():
+                models = mod.process_models(models, options)
+                mod.write_models(models, mod.make_lod_library(options.library, lod),
+                                 options.output, options.vrml, options.debug, options.shared)
+
+if __name__ == '__main__':
+    parsed_options = parse_args()
+
+    if parsed_options.debug:
+        vrml_export.debug_enabled = True
+        vrml_export_kicad.debug_enabled = True
+        vrml_import.debug_enabled = True
+        x3d_import.debug_enabled = True
+        x3d_export.debug_enabled = True
+
+    main(parsed_options)
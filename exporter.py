@@ -5,12 +5,13 @@
 # Copyright (C) 2016 xent
 # Project is distributed under the terms of the GNU General Public License v3.0
 
-import functools
 import hashlib
 import math
+import time
 import numpy as np
 
-from wrlconv import curves
+# Timestamps are calculated from the footprint contents
+EPOCH_DIGEST = 'digest'
 
 def make_vector(data, size=None):
     if data is None:
@@ -36,7 +37,45 @@ def make_vector(data, size=None):
     return data
 
 
+def make_epoch(value):
+    # Empty values, for example an exported but unset SOURCE_DATE_EPOCH, disable fixed timestamps
+    if isinstance(value, str):
+        value = value.strip() or None
+    if value is None or value == EPOCH_DIGEST:
+        return value
+    return int(value)
+
+def make_timestamp(epoch, content=None):
+    # Wall clock is used by default, fixed epoch or content digest make output reproducible
+    if epoch is None:
+        return int(time.time())
+    if epoch == EPOCH_DIGEST:
+        return int(hashlib.md5(content.encode()).hexdigest()[:8], 16)
+    return epoch
+
+
+class TextWriter:
+    def __init__(self, stream=None):
+        # Text is written to a stream when it is provided or collected in a buffer otherwise
+        self.stream = stream
+        self.chunks = []
+
+    def write(self, text):
+        if self.stream is not None:
+            self.stream.write(text)
+        else:
+            self.chunks.append(text)
+
+    def clear(self):
+        self.chunks = []
+
+    def getvalue(self):
+        return ''.join(self.chunks)
+
+
 class Layer:
+    __slots__ = ('mask',)
+
     # Default layer numbers
     CU_BACK     = 0
     CU_FRONT    = 15
@@ -86,7 +125,9 @@ class Layer:
     def to_mask(layer):
         result = 0
 
-        if isinstance(layer, int):
+        if isinstance(layer, Layer):
+            result = layer.mask
+        elif isinstance(layer, int):
             result = 1 << layer
         else:
             for i in layer:
@@ -98,13 +139,28 @@ class Layer:
         return hash(self.mask)
 
 
-class Circle:
+class Primitive:
+    __slots__ = ('digest',)
+
+    def __hash__(self):
+        # Primitives are not modified after construction, hash of the key defined by each
+        # subclass is calculated only once
+        try:
+            return self.digest
+        except AttributeError:
+            self.digest = hash(self.key())
+            return self.digest
+
+
+class Circle(Primitive):
+    __slots__ = ('position', 'part', 'closed', 'fill', 'radius', 'thickness', 'layer')
+
     def __init__(self, position, radius, thickness, fill, part=None, layer=Layer.SILK_FRONT):
         if not isinstance(radius, float):
             raise TypeError()
         if not isinstance(thickness, float):
             raise TypeError()
-        if not isinstance(layer, int):
+        if not isinstance(layer, (int, Layer)):
             raise TypeError()
 
         self.position = make_vector(position)
@@ -116,11 +172,15 @@ class Circle:
         self.thickness = thickness
         self.layer = Layer.to_mask(layer)
 
-    def __hash__(self):
-        return hash((self.position, self.radius, self.thickness, self.part, self.layer))
+    def key(self):
+        # Hash of None depends on its address, empty tuple is used for closed circles instead
+        part = self.part if self.part is not None else ()
+        return (self.position, self.radius, self.thickness, part, self.layer)
+
 
+class Label(Primitive):
+    __slots__ = ('position', 'text', 'font', 'thickness', 'layer')
 
-class Label:
     def __init__(self, text, position, thickness, font, layer=Layer.SILK_FRONT):
         if not isinstance(text, str):
             raise TypeError()
@@ -138,17 +198,19 @@ class Label:
         self.thickness = thickness
         self.layer = Layer.to_mask(layer)
 
-    def __hash__(self):
-        return hash((
+    def key(self):
+        return (
             self.position,
             int(hashlib.md5(self.text.encode()).hexdigest(), 16),
             self.font,
             self.thickness,
             self.layer
-        ))
+        )
 
 
-class String:
+class String(Primitive):
+    __slots__ = ('position', 'text', 'font', 'thickness', 'layer', 'name', 'hidden')
+
     def __init__(self, text, position, thickness, font, name, layer=Layer.SILK_FRONT,
                  hidden=False):
         if not isinstance(text, str):
@@ -174,8 +236,8 @@ class String:
         self.name = name
         self.hidden = hidden
 
-    def __hash__(self):
-        return hash((
+    def key(self):
+        return (
             self.position,
             int(hashlib.md5(self.text.encode()).hexdigest(), 16),
             self.font,
@@ -183,14 +245,16 @@ class String:
             self.layer,
             int(hashlib.md5(self.name.encode()).hexdigest(), 16),
             self.hidden
-        ))
+        )
+
 
+class Line(Primitive):
+    __slots__ = ('start', 'end', 'thickness', 'layer')
 
-class Line:
     def __init__(self, start, end, thickness, layer=Layer.SILK_FRONT):
         if not isinstance(thickness, float):
             raise TypeError()
-        if not isinstance(layer, int):
+        if not isinstance(layer, (int, Layer)):
             raise TypeError()
 
         self.start = make_vector(start)
@@ -199,15 +263,17 @@ class Line:
         self.thickness = thickness
         self.layer = Layer.to_mask(layer)
 
-    def __hash__(self):
-        return hash((self.start, self.end, self.thickness, self.layer))
+    def key(self):
+        return (self.start, self.end, self.thickness, self.layer)
 
 
-class Rect:
+class Rect(Primitive):
+    __slots__ = ('lines',)
+
     def __init__(self, top, bottom, thickness, layer=Layer.SILK_FRONT):
         if not isinstance(thickness, float):
             raise TypeError()
-        if not isinstance(layer, int):
+        if not isinstance(layer, (int, Layer)):
             raise TypeError()
 
         top_converted = make_vector(top)
@@ -224,11 +290,14 @@ class Rect:
                  thickness, layer)
         )
 
-    def __hash__(self):
-        return hash(self.lines)
+    def key(self):
+        return self.lines
+
 
+class AbstractPad(Primitive):
+    __slots__ = ('size', 'position', 'diameter', 'text', 'style', 'family', 'copper', 'mask',
+                 'paste')
 
-class AbstractPad:
     FAMILY_SMD, FAMILY_TH, FAMILY_NPTH, FAMILY_CONNECT = range(4)
     LAYERS_NONE, LAYERS_FRONT, LAYERS_BACK, LAYERS_BOTH = range(4)
     STYLE_CIRCLE, STYLE_RECT, STYLE_OVAL, STYLE_TRAPEZOID = range(4)
@@ -278,8 +347,8 @@ class AbstractPad:
         if paste in (AbstractPad.LAYERS_BOTH, AbstractPad.LAYERS_BACK):
             self.paste += Layer.PASTE_BACK
 
-    def __hash__(self):
-        return hash((
+    def key(self):
+        return (
             int(hashlib.md5(self.text.encode()).hexdigest(), 16),
             self.size,
             self.position,
@@ -289,31 +358,39 @@ class AbstractPad:
             self.copper,
             self.mask,
             self.paste
-        ))
+        )
 
 
 class HolePad(AbstractPad):
+    __slots__ = ()
+
     def __init__(self, number, size, position, diameter, style=AbstractPad.STYLE_CIRCLE):
         super().__init__(number, size, position, diameter, style, AbstractPad.FAMILY_TH,
                          AbstractPad.LAYERS_BOTH, AbstractPad.LAYERS_NONE)
 
 
 class SmdPad(AbstractPad):
+    __slots__ = ()
+
     def __init__(self, number, size, position):
         super().__init__(number, size, position, 0.0, AbstractPad.STYLE_RECT,
                          AbstractPad.FAMILY_SMD, AbstractPad.LAYERS_FRONT, AbstractPad.LAYERS_FRONT)
 
 
-class Cutout:
+class Cutout(Primitive):
+    __slots__ = ('size', 'position')
+
     def __init__(self, size, position):
         self.size = make_vector(size)
         self.position = make_vector(position)
 
-    def __hash__(self):
-        return hash((self.size, self.position))
+    def key(self):
+        return (self.size, self.position)
+
 
+class Poly(Primitive):
+    __slots__ = ('vertices', 'thickness', 'fill', 'layer')
 
-class Poly:
     LAYER_COPPER, LAYER_SILK = range(2)
 
     def __init__(self, vertices, thickness, fill, layer):
@@ -329,8 +406,109 @@ class Poly:
         self.layer = Layer.to_mask(layer)
         self.fill = fill
 
-    def __hash__(self):
-        return hash((*self.vertices, self.thickness, self.layer))
+    def key(self):
+        return (*self.vertices, self.thickness, self.layer)
+
+
+class PadArray:
+    def __init__(self, names, sizes, positions, diameter=None, styles=AbstractPad.STYLE_CIRCLE):
+        # SMD pads are created when drill diameter is not set, through-hole pads otherwise
+        self.names = [str(name) for name in names]
+        self.positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        self.sizes = np.broadcast_to(np.asarray(sizes, dtype=np.float64), self.positions.shape)
+        self.styles = np.broadcast_to(np.asarray(styles, dtype=int), (len(self.positions),))
+        self.diameter = diameter
+
+        if len(self.names) != len(self.positions):
+            raise ValueError()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        sizes, positions = self.sizes.tolist(), self.positions.tolist()
+
+        if self.diameter is None:
+            for name, size, position in zip(self.names, sizes, positions):
+                yield SmdPad(name, tuple(size), tuple(position))
+        else:
+            for name, size, position, style in zip(self.names, sizes, positions,
+                                                   self.styles.tolist()):
+                yield HolePad(name, tuple(size), tuple(position), self.diameter, style)
+
+    def rects(self):
+        half = self.sizes / 2.0
+        return np.concatenate((self.positions - half, self.positions + half), axis=1)
+
+
+def make_pad_row(offsets, size, y_offset=0.0, first=1):
+    offsets = np.asarray(offsets, dtype=np.float64)
+    positions = np.stack((offsets, np.full(len(offsets), y_offset)), axis=1)
+    return PadArray(range(first, first + len(offsets)), size, positions)
+
+def make_pad_grid(count, pitch, size, offset=(0.0, 0.0), diameter=None,
+                  styles=AbstractPad.STYLE_CIRCLE, first=1):
+    # Pads are numbered column by column, rows are placed downwards
+    columns, rows = np.meshgrid(np.arange(count[0]), np.arange(count[1]), indexing='ij')
+    positions = np.stack((columns.ravel().astype(np.float64),
+                          -rows.ravel().astype(np.float64)), axis=1) * pitch
+    positions += np.asarray(offset)
+    return PadArray(range(first, first + len(positions)), size, positions, diameter, styles)
+
+def make_pad_perimeter(x_offsets, y_offsets, x_sizes, y_sizes, border, first=1):
+    # Pads are numbered along the perimeter, opposite sides are symmetric about the center
+    x_offsets = np.asarray(x_offsets, dtype=np.float64)
+    y_offsets = np.asarray(y_offsets, dtype=np.float64)
+    x_sizes = np.broadcast_to(np.asarray(x_sizes, dtype=np.float64), (len(x_offsets), 2))
+    y_sizes = np.broadcast_to(np.asarray(y_sizes, dtype=np.float64), (len(y_offsets), 2))
+    x_border = np.full(len(y_offsets), border[0])
+    y_border = np.full(len(x_offsets), border[1])
+
+    positions = np.concatenate((
+        np.stack((x_offsets, y_border), axis=1),
+        np.stack((x_border, -y_offsets), axis=1),
+        np.stack((-x_offsets, -y_border), axis=1),
+        np.stack((-x_border, y_offsets), axis=1)))
+    sizes = np.concatenate((x_sizes, y_sizes, x_sizes, y_sizes))
+    return PadArray(range(first, first + len(positions)), sizes, positions)
+
+
+class ObjectIndex:
+    TYPES = (Label, String, Line, Rect, Circle, Poly, AbstractPad, Cutout)
+
+    def __init__(self, objects):
+        # Objects are distributed between type buckets in a single pass, pad arrays are expanded
+        self.objects = []
+        for obj in objects:
+            if isinstance(obj, PadArray):
+                self.objects.extend(obj)
+            else:
+                self.objects.append(obj)
+        self.buckets = {entry: [] for entry in ObjectIndex.TYPES}
+
+        resolved = {}
+        for obj in self.objects:
+            kind = type(obj)
+            if kind not in resolved:
+                resolved[kind] = next((entry for entry in ObjectIndex.TYPES
+                                       if issubclass(kind, entry)), None)
+            if resolved[kind] is not None:
+                self.buckets[resolved[kind]].append(obj)
+
+    def __getitem__(self, kind):
+        return self.buckets[kind]
+
+    def __iter__(self):
+        return iter(self.objects)
+
+    def __len__(self):
+        return len(self.objects)
+
+
+def make_object_index(objects):
+    if isinstance(objects, ObjectIndex):
+        return objects
+    return ObjectIndex(objects)
 
 
 class Footprint:
@@ -345,98 +523,208 @@ class Footprint:
             self.thickness = spec['thickness']
 
 
-def collide_line(line, pads, thickness, gap):
-    min_width = thickness
-
-    def get_pad_segments(pad):
-        segments = []
-        pos, offset = pad.position, (pad.size[0] / 2.0, pad.size[1] / 2.0)
-        segments.append(((pos[0] - offset[0], pos[1] - offset[1]),
-            (pos[0] - offset[0], pos[1] + offset[1])))
-        segments.append(((pos[0] + offset[0], pos[1] - offset[1]),
-            (pos[0] + offset[0], pos[1] + offset[1])))
-        segments.append(((pos[0] - offset[0], pos[1] - offset[1]),
-            (pos[0] + offset[0], pos[1] - offset[1])))
-        segments.append(((pos[0] - offset[0], pos[1] + offset[1]),
-            (pos[0] + offset[0], pos[1] + offset[1])))
-        return segments
-
-    def shrink_line(line, shrink_start, shrink_end, value):
-        length = math.sqrt(math.pow(line[1][0] - line[0][0], 2.0)
-                           + math.pow(line[1][1] - line[0][1], 2.0))
-        x_coef, y_coef = (line[1][0] - line[0][0]) / length, (line[1][1] - line[0][1]) / length
-        start, end = line[0], line[1]
-        src_angle = math.atan2(end[1] - start[1], end[0] - start[0])
-        if shrink_start:
-            start = (start[0] + x_coef * value, start[1] + y_coef * value)
-        if shrink_end:
-            end = (end[0] - x_coef * value, end[1] - y_coef * value)
-
-        dst_angle = math.atan2(end[1] - start[1], end[0] - start[0])
-        if abs(dst_angle - src_angle) > math.pi / 2.0:
-            return None
+class PadIndex:
+    def __init__(self, pads):
+        # Pad rectangles are sorted by their left borders for interval queries
+        rects = [np.zeros((0, 4))]
+        for pad in pads:
+            if isinstance(pad, PadArray):
+                rects.append(pad.rects())
+            else:
+                rects.append([(pad.position[0] - pad.size[0] / 2.0,
+                               pad.position[1] - pad.size[1] / 2.0,
+                               pad.position[0] + pad.size[0] / 2.0,
+                               pad.position[1] + pad.size[1] / 2.0)])
+        rects = np.concatenate(rects)
+        self.rects = rects[np.argsort(rects[:, 0], kind='stable')]
+
+    def __len__(self):
+        return len(self.rects)
+
+    def query(self, lower, upper):
+        # Find pads overlapping a bounding box
+        count = np.searchsorted(self.rects[:, 0], upper[0], side='right')
+        rects = self.rects[:count]
+        return rects[(rects[:, 2] >= lower[0]) & (rects[:, 1] <= upper[1])
+                     & (rects[:, 3] >= lower[1])]
 
-        return (start, end)
+    @staticmethod
+    def contains(points, rects):
+        # Boolean matrix of points lying inside or on borders of rectangles
+        lower = points[:, None, :] >= rects[None, :, 0:2]
+        upper = points[:, None, :] <= rects[None, :, 2:4]
+        return np.all(lower & upper, axis=2)
 
-    def pad_rect_func(pad):
-        return ((pad.position[0] - pad.size[0] / 2.0, pad.position[1] - pad.size[1] / 2.0),
-                (pad.position[0] + pad.size[0] / 2.0, pad.position[1] + pad.size[1] / 2.0))
+    @staticmethod
+    def intersect(start, end, rects):
+        # Crossing points of a segment with all borders of rectangles
+        borders = np.concatenate((
+            np.stack((rects[:, [0, 1]], rects[:, [0, 3]]), axis=1),
+            np.stack((rects[:, [2, 1]], rects[:, [2, 3]]), axis=1),
+            np.stack((rects[:, [0, 1]], rects[:, [2, 1]]), axis=1),
+            np.stack((rects[:, [0, 3]], rects[:, [2, 3]]), axis=1)))
+        direction = end - start
+        edges = borders[:, 1] - borders[:, 0]
+        offsets = borders[:, 0] - start
+
+        denominators = direction[0] * edges[:, 1] - direction[1] * edges[:, 0]
+        valid = denominators != 0.0
+        denominators[~valid] = 1.0
+        line_pos = (offsets[:, 0] * edges[:, 1] - offsets[:, 1] * edges[:, 0]) / denominators
+        edge_pos = (offsets[:, 0] * direction[1] - offsets[:, 1] * direction[0]) / denominators
+        valid &= (line_pos >= 0.0) & (line_pos <= 1.0) & (edge_pos >= 0.0) & (edge_pos <= 1.0)
+        return start + line_pos[valid, None] * direction
+
+    def collide(self, line, thickness, gap):
+        min_width = thickness
+        start, end = np.array(line.start[0:2]), np.array(line.end[0:2])
+        rects = self.query(np.minimum(start, end), np.maximum(start, end))
+
+        # Generate crossing points sorted by distance from the start of the line
+        crosses = np.concatenate(([start, end], self.intersect(start, end, rects)))
+        distances = np.sqrt(np.sum((crosses - start) ** 2, axis=1))
+        crosses = crosses[np.argsort(distances, kind='stable')]
+
+        # Generate chunks and filter them by length
+        chunks = np.stack((crosses[:-1], crosses[1:]), axis=1)
+        chunks = chunks[np.sqrt(np.sum((chunks[:, 1] - chunks[:, 0]) ** 2, axis=1)) >= min_width]
+
+        # Exclude chunks lying inside pads
+        beg_inside = self.contains(chunks[:, 0], rects)
+        end_inside = self.contains(chunks[:, 1], rects)
+        chunks_free = ~np.any(beg_inside & end_inside, axis=1)
+        shrink_start = np.any(beg_inside, axis=1)[chunks_free].tolist()
+        shrink_end = np.any(end_inside, axis=1)[chunks_free].tolist()
+        chunks = chunks[chunks_free].tolist()
 
-    def check_point_collisions(point, pads):
-        collisions = [curves.is_point_in_rect(pad_rect_func(pad), point) for pad in pads]
-        return functools.reduce(lambda x, y: x or y, collisions)
+        result = []
+        for chunk, beg_shrink, end_shrink in zip(chunks, shrink_start, shrink_end):
+            # Reduce line width
+            chunk = shrink_line((tuple(chunk[0]), tuple(chunk[1])), beg_shrink, end_shrink,
+                                gap + thickness / 2)
+            # Remove broken and short lines
+            if chunk is not None and math.dist(chunk[0], chunk[1]) >= min_width:
+                result.append(Line(chunk[0], chunk[1], thickness, line.layer))
+        return result
 
-    def collision_func(chunk, pad):
-        return check_point_collisions(chunk[0], [pad]) and check_point_collisions(chunk[1], [pad])
+    def collide_arc(self, circle, thickness, gap):
+        center, radius = np.array(circle.position[0:2]), circle.radius
+        rects = self.query(center - radius, center + radius)
+
+        # Angles of crossing points with vertical and horizontal borders of pads
+        vertical = (rects[:, [0, 2]] - center[0]) / radius
+        vertical_valid = np.abs(vertical) <= 1.0
+        vertical_angles = np.arccos(np.clip(vertical, -1.0, 1.0))
+        vertical_angles = np.stack((vertical_angles, -vertical_angles), axis=2)
+        vertical_y = center[1] + radius * np.sin(vertical_angles)
+        vertical_valid = (vertical_valid[:, :, None]
+                          & (vertical_y >= rects[:, None, None, 1])
+                          & (vertical_y <= rects[:, None, None, 3]))
+
+        horizontal = (rects[:, [1, 3]] - center[1]) / radius
+        horizontal_valid = np.abs(horizontal) <= 1.0
+        horizontal_angles = np.arcsin(np.clip(horizontal, -1.0, 1.0))
+        horizontal_angles = np.stack((horizontal_angles, math.pi - horizontal_angles), axis=2)
+        horizontal_x = center[0] + radius * np.cos(horizontal_angles)
+        horizontal_valid = (horizontal_valid[:, :, None]
+                            & (horizontal_x >= rects[:, None, None, 0])
+                            & (horizontal_x <= rects[:, None, None, 2]))
+
+        crosses = np.rad2deg(np.concatenate((vertical_angles[vertical_valid],
+                                             horizontal_angles[horizontal_valid])))
+        if circle.part is not None:
+            start, stop = min(circle.part), max(circle.part)
+        elif crosses.size:
+            # Closed circle is unrolled starting from one of the crossing points
+            start = crosses[0] % 360.0
+            stop = start + 360.0
+        elif np.any(self.contains(center[None, :] + np.array([[radius, 0.0]]), rects)):
+            # Closed circle without crossing points lies entirely inside a pad
+            return []
+        else:
+            return [circle]
+
+        # Crossing points are found with a finite precision, borders are slightly extended
+        rects = rects + np.array([-1.0, -1.0, 1.0, 1.0]) * 1e-9
+        crosses = (crosses - start) % 360.0 + start
+        angles = np.unique(np.concatenate(([start, stop], crosses[crosses < stop])))
+        chunks = np.stack((angles[:-1], angles[1:]), axis=1)
+
+        def make_points(values):
+            values = np.deg2rad(values)
+            return center + radius * np.stack((np.cos(values), np.sin(values)), axis=1)
+
+        # Exclude chunks with middle points inside pads
+        chunks = chunks[~np.any(self.contains(make_points(chunks.mean(axis=1)), rects), axis=1)]
+
+        # Reduce arc length near pads
+        shrink = np.rad2deg((gap + thickness / 2.0) / radius)
+        chunks[:, 0] += np.any(self.contains(make_points(chunks[:, 0]), rects), axis=1) * shrink
+        chunks[:, 1] -= np.any(self.contains(make_points(chunks[:, 1]), rects), axis=1) * shrink
+
+        # Remove broken and short arcs
+        chunks = chunks[np.deg2rad(chunks[:, 1] - chunks[:, 0]) * radius >= thickness]
+        if circle.part is None:
+            chunks -= np.floor(chunks[:, 0:1] / 360.0) * 360.0
+        return [Circle(circle.position, radius, circle.thickness, False,
+                       (float(chunk[0]), float(chunk[1])), circle.layer)
+                for chunk in chunks]
+
+
+def make_pad_index(pads):
+    if isinstance(pads, PadIndex):
+        return pads
+    return PadIndex(pads)
+
+
+def shrink_line(line, shrink_start, shrink_end, value):
+    length = math.sqrt(math.pow(line[1][0] - line[0][0], 2.0)
+                       + math.pow(line[1][1] - line[0][1], 2.0))
+    x_coef, y_coef = (line[1][0] - line[0][0]) / length, (line[1][1] - line[0][1]) / length
+    start, end = line[0], line[1]
+    src_angle = math.atan2(end[1] - start[1], end[0] - start[0])
+    if shrink_start:
+        start = (start[0] + x_coef * value, start[1] + y_coef * value)
+    if shrink_end:
+        end = (end[0] - x_coef * value, end[1] - y_coef * value)
+
+    dst_angle = math.atan2(end[1] - start[1], end[0] - start[0])
+    if abs(dst_angle - src_angle) > math.pi / 2.0:
+        return None
 
-    def check_chunk_collisions(chunk, pads):
-        collisions = [collision_func(chunk, pad) for pad in pads]
-        return functools.reduce(lambda x, y: x or y, collisions)
+    return (start, end)
 
-    if len(pads) == 0:
-        return [line]
 
-    # Create common line function Ax + By + C = 0
-    seg_func = lambda x: curves.intersect_lines((line.start, line.end), x)
-
-    # Subdivide all pads into segments
-    segments = []
-    for pad in pads:
-        segments.extend(get_pad_segments(pad))
-
-    # Generate crossing points for the given line
-    crosses = [line.start, line.end]
-    crosses.extend([cross for cross in [seg_func(seg) for seg in segments] if cross is not None])
-
-    # Sort crossing points
-    def dist_func(point):
-        return math.sqrt(math.pow(point[0] - line.start[0], 2.0)
-                         + math.pow(point[1] - line.start[1], 2.0))
-    crosses = sorted(crosses, key=dist_func)
-
-    # Generate chunks
-    chunks = []
-    for i in range(len(crosses) - 1):
-        chunks.append((crosses[i], crosses[i + 1]))
-
-    # Filter chunks by length
-    def chunk_length(chunk):
-        return math.sqrt(math.pow(chunk[1][0] - chunk[0][0], 2.0)
-                         + math.pow(chunk[1][1] - chunk[0][1], 2.0))
-    chunks = [chunk for chunk in chunks if chunk_length(chunk) >= min_width]
-
-    # Exclude chunks intersected with pads
-    chunks = [chunk for chunk in chunks if not check_chunk_collisions(chunk, pads)]
-
-    # Reduce line width
-    def shrink_chunk(chunk):
-        return shrink_line(chunk,
-            check_point_collisions(chunk[0], pads),
-            check_point_collisions(chunk[1], pads),
-            gap + thickness / 2)
-    chunks = [shrink_chunk(chunk) for chunk in chunks]
-
-    # Remove broken and short lines
-    chunks = [chunk for chunk in chunks if chunk is not None and chunk_length(chunk) >= min_width]
-
-    return [Line(chunk[0], chunk[1], thickness) for chunk in chunks]
+def collide_line(line, pads, thickness, gap):
+    index = make_pad_index(pads)
+    if len(index) == 0:
+        return [line]
+    return index.collide(line, thickness, gap)
+
+
+def collide_lines(lines, pads, thickness, gap):
+    # Pad index is built once for all lines
+    index = make_pad_index(pads)
+    result = []
+    for line in lines:
+        result.extend(collide_line(line, index, thickness, gap))
+    return result
+
+
+def clip_silkscreen(objects, pads, thickness, gap):
+    # Lines, rectangle edges and arcs on silkscreen layers are clipped using a shared pad index
+    index = make_pad_index(pads)
+    silk = Layer.to_mask((Layer.SILK_BACK, Layer.SILK_FRONT)).mask
+
+    result = []
+    for obj in objects:
+        if isinstance(obj, Rect):
+            result.extend(clip_silkscreen(obj.lines, index, thickness, gap))
+        elif isinstance(obj, Line) and obj.layer.mask & silk and len(index) > 0:
+            result.extend(index.collide(obj, thickness, gap))
+        elif isinstance(obj, Circle) and not obj.fill and obj.layer.mask & silk \
+                and len(index) > 0:
+            result.extend(index.collide_arc(obj, thickness, gap))
+        else:
+            result.append(obj)
+    return result
@@ -6,159 +6,249 @@
 # Project is distributed under the terms of the GNU General Public License v3.0
 
 import datetime
+import hashlib
+import io
 import math
 import re
-import time
 import numpy as np
 
 import exporter
 
 
 class Converter:
-    def __init__(self, model_path, library_path=None, library_name=None, model_type='wrl'):
+    MODULE_PATTERN = re.compile(r'^\$MODULE (.+?)\s*$', re.M)
+
+    def __init__(self, model_path, library_path=None, library_name=None, model_type='wrl',
+                 epoch=None):
         if model_type not in ('wrl', 'x3d'):
             raise KeyError()
         self.model_path = model_path
         self.model_type = model_type
+        self.epoch = exporter.make_epoch(epoch)
         self.library_path = library_path if library_name is not None else None
         self.library_name = library_name if library_path is not None else None
 
     @staticmethod
-    def circle_to_text(circle):
+    def write_circle(writer, circle):
         if circle.part is not None:
             # Arc
             angle = np.deg2rad(circle.part[0])
             start = (circle.position[0] + math.cos(angle) * circle.radius,
                      circle.position[1] + math.sin(angle) * circle.radius)
-            return f'DA {circle.position[0]:g} {circle.position[1]:g} {start[0]:g} {start[1]:g}' \
-                   f' {int(abs(circle.part[1] - circle.part[0]) * 10.0)} {circle.thickness:g} 21\n'
-
-        # Circle
-        return f'DC {circle.position[0]:g} {circle.position[1]:g} {circle.position[0]:g}'\
-               f' {(circle.position[1] + circle.radius):g} {circle.thickness:g} 21\n'
+            writer.write(f'DA {circle.position[0]:g} {circle.position[1]:g}'
+                         f' {start[0]:g} {start[1]:g}'
+                         f' {int(abs(circle.part[1] - circle.part[0]) * 10.0)}'
+                         f' {circle.thickness:g} 21\n')
+        else:
+            # Circle
+            writer.write(f'DC {circle.position[0]:g} {circle.position[1]:g} {circle.position[0]:g}'
+                         f' {(circle.position[1] + circle.radius):g} {circle.thickness:g} 21\n')
 
     @staticmethod
-    def label_to_text(label):
+    def write_label(writer, label):
         if label is None:
-            return ''
+            return
 
-        out = ''
-        out += f'T0 {label.position[0]:g} {label.position[1]:g} {label.font:g} {label.font:g} 0' \
-               f' {label.thickness:g} N V 21 N "{label.text}"\n'
-        out += f'T1 {label.position[0]:g} {label.position[1]:g} {label.font:g} {label.font:g} 0' \
-               f' {label.thickness:g} N I 21 N "VAL*"'
-        return out + '\n'
+        writer.write(f'T0 {label.position[0]:g} {label.position[1]:g} {label.font:g}'
+                     f' {label.font:g} 0 {label.thickness:g} N V 21 N "{label.text}"\n')
+        writer.write(f'T1 {label.position[0]:g} {label.position[1]:g} {label.font:g}'
+                     f' {label.font:g} 0 {label.thickness:g} N I 21 N "VAL*"\n')
 
     @staticmethod
-    def string_to_text(string):
-        return f'T2 {string.position[0]:g} {string.position[1]:g} {string.font:g}' \
-               f' {string.font:g} 0 {string.thickness:g} N V 21 N "{string.text}"\n'
+    def write_string(writer, string):
+        writer.write(f'T2 {string.position[0]:g} {string.position[1]:g} {string.font:g}'
+                     f' {string.font:g} 0 {string.thickness:g} N V 21 N "{string.text}"\n')
 
     @staticmethod
-    def line_to_text(line):
-        return f'DS {line.start[0]:g} {line.start[1]:g}' \
-               f' {line.end[0]:g} {line.end[1]:g} {line.thickness:g} 21\n'
+    def write_line(writer, line):
+        writer.write(f'DS {line.start[0]:g} {line.start[1]:g}'
+                     f' {line.end[0]:g} {line.end[1]:g} {line.thickness:g} 21\n')
 
     @staticmethod
-    def rect_to_text(rect):
-        return ''.join([Converter.line_to_text(line) for line in rect.lines])
+    def write_rect(writer, rect):
+        for line in rect.lines:
+            Converter.write_line(writer, line)
 
     @staticmethod
-    def pad_to_text(pad):
+    def write_pad(writer, pad):
         style = 'R' if pad.style == exporter.AbstractPad.STYLE_RECT else 'C'
 
-        out = '$PAD\n'
-        out += f'Sh "{pad.text}" {style} {pad.size[0]:g} {pad.size[1]:g} 0 0 0\n'
+        writer.write('$PAD\n')
+        writer.write(f'Sh "{pad.text}" {style} {pad.size[0]:g} {pad.size[1]:g} 0 0 0\n')
         if pad.family == exporter.AbstractPad.FAMILY_SMD:
-            out += 'Dr 0 0 0\n'
-            out += f'At SMD N {(pad.copper.mask | pad.mask.mask | pad.paste.mask):08X}\n'
+            writer.write('Dr 0 0 0\n')
+            writer.write(f'At SMD N {(pad.copper.mask | pad.mask.mask | pad.paste.mask):08X}\n')
         else:
             if pad.style == exporter.AbstractPad.STYLE_OVAL:
-                out += f'Dr {pad.diameter[0]:g} 0 0 O {pad.diameter[0]:g} {pad.diameter[1]:g}\n'
+                writer.write(f'Dr {pad.diameter[0]:g} 0 0 O'
+                             f' {pad.diameter[0]:g} {pad.diameter[1]:g}\n')
             else:
-                out += f'Dr {pad.diameter:g} 0 0\n'
+                writer.write(f'Dr {pad.diameter:g} 0 0\n')
             if pad.copper.mask == 0:
-                out += f'At HOLE N {(0xFFFF | pad.mask.mask | pad.paste.mask):08X}\n'
+                writer.write(f'At HOLE N {(0xFFFF | pad.mask.mask | pad.paste.mask):08X}\n')
             else:
-                out += f'At STD N {(pad.copper.mask | pad.mask.mask | pad.paste.mask):08X}\n'
-        out += 'Ne 0 ""\n'
-        out += f'Po {pad.position[0]:g} {pad.position[1]:g}\n'
-        out += '$EndPAD'
-        return out + '\n'
+                writer.write(f'At STD N {(pad.copper.mask | pad.mask.mask | pad.paste.mask):08X}\n')
+        writer.write('Ne 0 ""\n')
+        writer.write(f'Po {pad.position[0]:g} {pad.position[1]:g}\n')
+        writer.write('$EndPAD\n')
 
     @staticmethod
-    def poly_to_text(poly):
-        out = f'DP 0 0 0 0 {len(poly.vertices)} {poly.thickness:g} {poly.layer.mask}'
+    def write_poly(writer, poly):
+        writer.write(f'DP 0 0 0 0 {len(poly.vertices)} {poly.thickness:g} {poly.layer.mask}')
         for vertex in poly.vertices:
-            out += f'\nDl {vertex[0]:g} {vertex[1]:g}'
-        return out + '\n'
-
-    def footprint_to_text(self, footprint):
-        timestamp = time.time()
+            writer.write(f'\nDl {vertex[0]:g} {vertex[1]:g}')
+        writer.write('\n')
+
+    def write_footprint(self, writer, footprint, objects=None):
+        if objects is None:
+            objects = footprint.generate()
+        objects = exporter.make_object_index(objects)
+
+        writer.write(f'$MODULE {footprint.name}\n')
+        if self.epoch == exporter.EPOCH_DIGEST:
+            # Module body is needed to calculate the timestamp
+            body = exporter.TextWriter()
+            self.write_module(body, footprint, objects)
+            body = body.getvalue()
+
+            timestamp = exporter.make_timestamp(self.epoch, body)
+            writer.write(f'Po 0 0 0 15 {timestamp:08X} 00000000 ~~\n')
+            writer.write(body)
+        else:
+            timestamp = exporter.make_timestamp(self.epoch)
+            writer.write(f'Po 0 0 0 15 {timestamp:08X} 00000000 ~~\n')
+            self.write_module(writer, footprint, objects)
 
-        out = f'$MODULE {footprint.name}\n'
-        out += f'Po 0 0 0 15 {int(timestamp):08X} 00000000 ~~\n'
-        out += f'Li {footprint.name}\n'
+    def write_module(self, writer, footprint, objects):
+        writer.write(f'Li {footprint.name}\n')
         if footprint.description is not None:
-            out += f'Cd {footprint.description}\n'
-        out += 'Sc 0\n'
-        out += 'AR\n'
-        out += 'Op 0 0 0\n'
-        out += 'At SMD\n'
-
-        objects = footprint.generate()
-
-        for obj in filter(lambda x: isinstance(x, exporter.Label), objects):
-            out += Converter.label_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.String), objects):
-            out += Converter.string_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.Circle), objects):
-            out += Converter.circle_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.Line), objects):
-            out += Converter.line_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.Rect), objects):
-            out += Converter.rect_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.Poly), objects):
-            out += Converter.poly_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.AbstractPad), objects):
-            out += Converter.pad_to_text(obj)
-
-        out += '$SHAPE3D\n'
-        out += f'Na "{self.model_path}/{footprint.model}.{self.model_type}"\n'
-        out += 'Sc 1 1 1\n'
-        out += 'Of 0 0 0\n'
-        out += 'Ro 0 0 0\n'
-        out += '$EndSHAPE3D\n'
-        out += f'$EndMODULE {footprint.name}\n'
-
-        return out
+            writer.write(f'Cd {footprint.description}\n')
+        writer.write('Sc 0\n')
+        writer.write('AR\n')
+        writer.write('Op 0 0 0\n')
+        writer.write('At SMD\n')
+
+        for obj in objects[exporter.Label]:
+            Converter.write_label(writer, obj)
+        for obj in objects[exporter.String]:
+            Converter.write_string(writer, obj)
+        for obj in objects[exporter.Circle]:
+            Converter.write_circle(writer, obj)
+        for obj in objects[exporter.Line]:
+            Converter.write_line(writer, obj)
+        for obj in objects[exporter.Rect]:
+            Converter.write_rect(writer, obj)
+        for obj in objects[exporter.Poly]:
+            Converter.write_poly(writer, obj)
+        for obj in objects[exporter.AbstractPad]:
+            Converter.write_pad(writer, obj)
+
+        writer.write('$SHAPE3D\n')
+        writer.write(f'Na "{self.model_path}/{footprint.model}.{self.model_type}"\n')
+        writer.write('Sc 1 1 1\n')
+        writer.write('Of 0 0 0\n')
+        writer.write('Ro 0 0 0\n')
+        writer.write('$EndSHAPE3D\n')
+        writer.write(f'$EndMODULE {footprint.name}\n')
+
+    def footprint_to_text(self, footprint):
+        writer = exporter.TextWriter()
+        self.write_footprint(writer, footprint)
+        return writer.getvalue()
 
     def generate(self, part):
         return self.footprint_to_text(part)
 
     @staticmethod
     def extract_part_name(part):
-        return re.sub(re.compile(r'^.*\$MODULE (CP.*?)\n.*$', re.M | re.S), r'\1', part)
+        # Only the module header is parsed, part body is not scanned
+        match = Converter.MODULE_PATTERN.search(part)
+        if match is None:
+            raise ValueError()
+        return match.group(1)
 
     @staticmethod
-    def archive(parts):
-        timestring = datetime.datetime.fromtimestamp(time.time()).strftime('%d.%m.%Y %H:%M:%S')
+    def index_part(path):
+        with open(path, 'rb') as file:
+            for line in file:
+                if line.startswith(b'$MODULE '):
+                    return line[8:].decode('utf-8').strip(), (path, 0, None)
+        raise ValueError()
 
-        footprints = {}
-        for part in parts:
-            footprints.update({Converter.extract_part_name(part): part})
-        names = list(footprints.keys())
-        names.sort()
+    @staticmethod
+    def index_archive(path):
+        # Modules of an existing library are referenced by their file ranges
+        parts = {}
+        with open(path, 'rb') as file:
+            name, offset, start = None, 0, 0
+            for line in file:
+                if line.startswith(b'$MODULE '):
+                    name, start = line[8:].decode('utf-8').strip(), offset
+                offset += len(line)
+                if name is not None and line.startswith(b'$EndMODULE'):
+                    parts[name] = (path, start, offset - start)
+                    name = None
+        return parts
 
-        out = f'PCBNEW-LibModule-V1 {timestring}\n'
-        out += '# encoding utf-8\n'
-        out += 'Units mm\n'
-        out += '$INDEX\n'
+    @staticmethod
+    def read_part(source, block=65536):
+        # Source is either a part text or a file range with an optional size
+        if isinstance(source, str):
+            yield source.encode('utf-8')
+            return
+
+        path, offset, size = source
+        with open(path, 'rb') as file:
+            file.seek(offset)
+            while size is None or size > 0:
+                chunk = file.read(block if size is None else min(block, size))
+                if not chunk:
+                    break
+                if size is not None:
+                    size -= len(chunk)
+                yield chunk
+
+    @staticmethod
+    def write_archive(stream, parts, epoch=None):
+        names = sorted(parts.keys())
+        epoch = exporter.make_epoch(epoch)
+
+        if epoch == exporter.EPOCH_DIGEST:
+            # Parts are read twice, digest is needed before the header is written
+            digest = hashlib.md5()
+            for name in names:
+                for chunk in Converter.read_part(parts[name]):
+                    digest.update(chunk)
+            timestamp = int(digest.hexdigest()[:8], 16)
+        else:
+            timestamp = exporter.make_timestamp(epoch)
+
+        if epoch is None:
+            timestring = datetime.datetime.fromtimestamp(timestamp)
+        else:
+            timestring = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+        timestring = timestring.strftime('%d.%m.%Y %H:%M:%S')
+
+        header = f'PCBNEW-LibModule-V1 {timestring}\n'
+        header += '# encoding utf-8\n'
+        header += 'Units mm\n'
+        header += '$INDEX\n'
         for name in names:
-            out += name + '\n'
-        out += '$EndINDEX\n'
+            header += name + '\n'
+        header += '$EndINDEX\n'
+        stream.write(header.encode('utf-8'))
+
         for name in names:
-            out += footprints[name]
-        out += '$EndLIBRARY\n'
+            for chunk in Converter.read_part(parts[name]):
+                stream.write(chunk)
+        stream.write(b'$EndLIBRARY\n')
+
+    @staticmethod
+    def archive(parts, epoch=None):
+        footprints = {}
+        for part in parts:
+            footprints.update({Converter.extract_part_name(part): part})
 
-        return out
+        stream = io.BytesIO()
+        Converter.write_archive(stream, footprints, epoch)
+        return stream.getvalue().decode('utf-8')
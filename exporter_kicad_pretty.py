@@ -6,7 +6,6 @@
 # Project is distributed under the terms of the GNU General Public License v3.0
 
 import math
-import time
 import numpy as np
 
 import exporter
@@ -14,11 +13,12 @@ import exporter
 
 # Default precision for :g format is 6
 class Converter:
-    def __init__(self, model_path, model_type='wrl'):
+    def __init__(self, model_path, model_type='wrl', epoch=None):
         if model_type not in ('wrl', 'x3d'):
             raise KeyError()
         self.model_path = model_path
         self.model_type = model_type
+        self.epoch = exporter.make_epoch(epoch)
 
     @staticmethod
     def layers_to_text(layer):
@@ -81,7 +81,7 @@ class Converter:
     @staticmethod
     def get_module_type_str(objects):
         family = exporter.AbstractPad.FAMILY_SMD
-        for pad in filter(lambda x: isinstance(x, exporter.AbstractPad), objects):
+        for pad in exporter.make_object_index(objects)[exporter.AbstractPad]:
             if pad.family != exporter.AbstractPad.FAMILY_SMD:
                 family = exporter.AbstractPad.FAMILY_TH
                 break
@@ -91,7 +91,7 @@ class Converter:
         return 'smd'
 
     @staticmethod
-    def circle_to_text(circle):
+    def write_circle(writer, circle):
         if circle.part is not None:
             # Arc
             angle = np.deg2rad(circle.part[0])
@@ -99,117 +99,135 @@ class Converter:
                      circle.position[1] + math.sin(angle) * circle.radius)
             rotation = abs(circle.part[1] - circle.part[0])
 
-            out = '  (fp_arc'
-            out += f' (start {circle.position[0]:g} {circle.position[1]:g})'
-            out += f' (end {start[0]:g} {start[1]:g})'
-            out += f' (angle {rotation:g})'
+            writer.write('  (fp_arc')
+            writer.write(f' (start {circle.position[0]:g} {circle.position[1]:g})')
+            writer.write(f' (end {start[0]:g} {start[1]:g})')
+            writer.write(f' (angle {rotation:g})')
         else:
             # Circle
-            out = '  (fp_circle'
-            out += f' (center {circle.position[0]:g} {circle.position[1]:g})'
-            out += f' (end {circle.position[0]:g} {circle.position[1] + circle.radius:g})'
+            writer.write('  (fp_circle')
+            writer.write(f' (center {circle.position[0]:g} {circle.position[1]:g})')
+            writer.write(f' (end {circle.position[0]:g} {circle.position[1] + circle.radius:g})')
 
-        out += f' (layer {Converter.layers_to_text(circle.layer)})'
-        out += f' (width {circle.thickness:g})'
-        out += ')\n'
-        return out
+        writer.write(f' (layer {Converter.layers_to_text(circle.layer)})')
+        writer.write(f' (width {circle.thickness:g})')
+        writer.write(')\n')
 
     @staticmethod
-    def label_to_text(label):
+    def write_label(writer, label):
         if label is None:
-            return ''
-
-        out = f'  (fp_text reference REF (at {label.position[0]:g} {label.position[1]:g})' \
-              f' (layer {Converter.layers_to_text(label.layer)})\n'
-        out += f'    (effects (font (size {label.font:g} {label.font:g})' \
-               f' (thickness {label.thickness:g})))\n'
-        out += '  )\n'
-        out += f'  (fp_text value {label.text}' \
-               f' (at {label.position[0]:g} {label.position[1]:g}) (layer F.Fab)\n'
-        out += f'    (effects (font (size {label.font:g} {label.font:g})' \
-               f' (thickness {label.thickness:g})))\n'
-        out += '  )\n'
-        return out
+            return
+
+        writer.write(f'  (fp_text reference REF (at {label.position[0]:g} {label.position[1]:g})'
+                     f' (layer {Converter.layers_to_text(label.layer)})\n')
+        writer.write(f'    (effects (font (size {label.font:g} {label.font:g})'
+                     f' (thickness {label.thickness:g})))\n')
+        writer.write('  )\n')
+        writer.write(f'  (fp_text value {label.text}'
+                     f' (at {label.position[0]:g} {label.position[1]:g}) (layer F.Fab)\n')
+        writer.write(f'    (effects (font (size {label.font:g} {label.font:g})'
+                     f' (thickness {label.thickness:g})))\n')
+        writer.write('  )\n')
 
     @staticmethod
-    def string_to_text(string):
-        out = f'  (fp_text user {string.text} (at {string.position[0]:g} {string.position[1]:g})' \
-              f' (layer {Converter.layers_to_text(string.layer)})\n'
-        out += f'    (effects (font (size {string.font:g} {string.font:g})' \
-              f' (thickness {string.thickness:g})))\n'
-        out += '  )\n'
-        return out
+    def write_string(writer, string):
+        writer.write(f'  (fp_text user {string.text}'
+                     f' (at {string.position[0]:g} {string.position[1]:g})'
+                     f' (layer {Converter.layers_to_text(string.layer)})\n')
+        writer.write(f'    (effects (font (size {string.font:g} {string.font:g})'
+                     f' (thickness {string.thickness:g})))\n')
+        writer.write('  )\n')
 
     @staticmethod
-    def line_to_text(line):
-        return f'  (fp_line (start {line.start[0]:g} {line.start[1]:g})' \
-               f' (end {line.end[0]:g} {line.end[1]:g})' \
-               f' (layer {Converter.layers_to_text(line.layer)}) (width {line.thickness:g}))\n'
+    def write_line(writer, line):
+        writer.write(f'  (fp_line (start {line.start[0]:g} {line.start[1]:g})'
+                     f' (end {line.end[0]:g} {line.end[1]:g})'
+                     f' (layer {Converter.layers_to_text(line.layer)})'
+                     f' (width {line.thickness:g}))\n')
 
     @staticmethod
-    def rect_to_text(rect):
-        return ''.join([Converter.line_to_text(line) for line in rect.lines])
+    def write_rect(writer, rect):
+        for line in rect.lines:
+            Converter.write_line(writer, line)
 
     @staticmethod
-    def pad_to_text(pad):
+    def write_pad(writer, pad):
         if len(pad.text) > 0:
-            out = f'  (pad {pad.text}'
+            writer.write(f'  (pad {pad.text}')
         else:
-            out = '  (pad ""'
+            writer.write('  (pad ""')
 
-        out += f' {Converter.pad_type_to_text(pad.family)} {Converter.pad_style_to_text(pad.style)}'
-        out += f' (at {pad.position[0]:g} {pad.position[1]:g})'
-        out += f' (size {pad.size[0]:g} {pad.size[1]:g})'
+        writer.write(f' {Converter.pad_type_to_text(pad.family)}'
+                     f' {Converter.pad_style_to_text(pad.style)}')
+        writer.write(f' (at {pad.position[0]:g} {pad.position[1]:g})')
+        writer.write(f' (size {pad.size[0]:g} {pad.size[1]:g})')
         if pad.family in (exporter.AbstractPad.FAMILY_TH, exporter.AbstractPad.FAMILY_NPTH):
             if pad.style == exporter.AbstractPad.STYLE_OVAL:
-                out += f' (drill oval {pad.diameter[0]:g} {pad.diameter[1]:g})'
+                writer.write(f' (drill oval {pad.diameter[0]:g} {pad.diameter[1]:g})')
             else:
-                out += f' (drill {pad.diameter:g})'
-        out += f' (layers {Converter.layers_to_text(pad.copper + pad.mask + pad.paste)})'
-        out += ')\n'
-        return out
+                writer.write(f' (drill {pad.diameter:g})')
+        writer.write(f' (layers {Converter.layers_to_text(pad.copper + pad.mask + pad.paste)})')
+        writer.write(')\n')
 
     @staticmethod
-    def poly_to_text(poly):
-        out = '  (fp_poly (pts'
+    def write_poly(writer, poly):
+        writer.write('  (fp_poly (pts')
         for vertex in poly.vertices:
-            out += f' (xy {vertex[0]:g} {vertex[1]:g})'
-        out += f') (layer {Converter.layers_to_text(poly.layer)}) (width {poly.thickness:g}))\n'
-        return out
-
-    def footprint_to_text(self, footprint):
-        objects = footprint.generate()
-        timestamp = time.time()
-
-        out = f'(module {footprint.name} (layer F.Cu) (tedit {int(timestamp):08X})\n'
+            writer.write(f' (xy {vertex[0]:g} {vertex[1]:g})')
+        writer.write(f') (layer {Converter.layers_to_text(poly.layer)})'
+                     f' (width {poly.thickness:g}))\n')
+
+    def write_footprint(self, writer, footprint, objects=None):
+        if objects is None:
+            objects = footprint.generate()
+        objects = exporter.make_object_index(objects)
+
+        if self.epoch == exporter.EPOCH_DIGEST:
+            # Module body is needed to calculate the timestamp
+            body = exporter.TextWriter()
+            self.write_module(body, footprint, objects)
+            body = body.getvalue()
+
+            timestamp = exporter.make_timestamp(self.epoch, f'{footprint.name}\n{body}')
+            writer.write(f'(module {footprint.name} (layer F.Cu) (tedit {timestamp:08X})\n')
+            writer.write(body)
+        else:
+            timestamp = exporter.make_timestamp(self.epoch)
+            writer.write(f'(module {footprint.name} (layer F.Cu) (tedit {timestamp:08X})\n')
+            self.write_module(writer, footprint, objects)
 
-        out += f'  (attr {self.get_module_type_str(objects)})\n'
+    def write_module(self, writer, footprint, objects):
+        writer.write(f'  (attr {self.get_module_type_str(objects)})\n')
         if footprint.description is not None:
-            out += f'  (descr "{footprint.description}")\n'
-
-        for obj in filter(lambda x: isinstance(x, exporter.Label), objects):
-            out += Converter.label_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.String), objects):
-            out += Converter.string_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.Circle), objects):
-            out += Converter.circle_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.Line), objects):
-            out += Converter.line_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.Rect), objects):
-            out += Converter.rect_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.Poly), objects):
-            out += Converter.poly_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.AbstractPad), objects):
-            out += Converter.pad_to_text(obj)
-
-        out += f'  (model {self.model_path}/{footprint.model}.{self.model_type}\n'
-        out += '    (at (xyz 0 0 0))\n'
-        out += '    (scale (xyz 1 1 1))\n'
-        out += '    (rotate (xyz 0 0 0))\n'
-        out += '  )\n'
-
-        out += ')\n'
-        return out
+            writer.write(f'  (descr "{footprint.description}")\n')
+
+        for obj in objects[exporter.Label]:
+            Converter.write_label(writer, obj)
+        for obj in objects[exporter.String]:
+            Converter.write_string(writer, obj)
+        for obj in objects[exporter.Circle]:
+            Converter.write_circle(writer, obj)
+        for obj in objects[exporter.Line]:
+            Converter.write_line(writer, obj)
+        for obj in objects[exporter.Rect]:
+            Converter.write_rect(writer, obj)
+        for obj in objects[exporter.Poly]:
+            Converter.write_poly(writer, obj)
+        for obj in objects[exporter.AbstractPad]:
+            Converter.write_pad(writer, obj)
+
+        writer.write(f'  (model {self.model_path}/{footprint.model}.{self.model_type}\n')
+        writer.write('    (at (xyz 0 0 0))\n')
+        writer.write('    (scale (xyz 1 1 1))\n')
+        writer.write('    (rotate (xyz 0 0 0))\n')
+        writer.write('  )\n')
+
+        writer.write(')\n')
+
+    def footprint_to_text(self, footprint):
+        writer = exporter.TextWriter()
+        self.write_footprint(writer, footprint)
+        return writer.getvalue()
 
     def generate(self, part):
         return self.footprint_to_text(part)
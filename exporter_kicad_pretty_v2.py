@@ -102,7 +102,7 @@ class Converter:
     @staticmethod
     def get_module_type_str(objects):
         family = exporter.AbstractPad.FAMILY_SMD
-        for pad in filter(lambda x: isinstance(x, exporter.AbstractPad), objects):
+        for pad in exporter.make_object_index(objects)[exporter.AbstractPad]:
             if pad.family == exporter.AbstractPad.FAMILY_TH:
                 family = pad.family
                 break
@@ -112,7 +112,7 @@ class Converter:
         return 'smd'
 
     @staticmethod
-    def circle_to_text(circle):
+    def write_circle(writer, circle):
         if circle.part is not None:
             # Arc
             rotation = abs(circle.part[1] - circle.part[0])
@@ -127,175 +127,178 @@ class Converter:
             end = (circle.position[0] + math.cos(end_angle) * circle.radius,
                    circle.position[1] + math.sin(end_angle) * circle.radius)
 
-            out = '\t(fp_arc\n'
-            out += f'\t\t(start {round(beg[0], 6):g} {round(beg[1], 6):g})\n'
-            out += f'\t\t(mid {round(mid[0], 6):g} {round(mid[1], 6):g})\n'
-            out += f'\t\t(end {round(end[0], 6):g} {round(end[1], 6):g})\n'
+            writer.write('\t(fp_arc\n')
+            writer.write(f'\t\t(start {round(beg[0], 6):g} {round(beg[1], 6):g})\n')
+            writer.write(f'\t\t(mid {round(mid[0], 6):g} {round(mid[1], 6):g})\n')
+            writer.write(f'\t\t(end {round(end[0], 6):g} {round(end[1], 6):g})\n')
         else:
             # Circle
-            out = '\t(fp_circle\n'
-            out += f'\t\t(center {circle.position[0]:g} {circle.position[1]:g})\n'
-            out += f'\t\t(end {circle.position[0]:g} {circle.position[1] + circle.radius:g})\n'
+            writer.write('\t(fp_circle\n')
+            writer.write(f'\t\t(center {circle.position[0]:g} {circle.position[1]:g})\n')
+            writer.write(f'\t\t(end {circle.position[0]:g}'
+                         f' {circle.position[1] + circle.radius:g})\n')
 
-        out += '\t\t(stroke\n'
-        out += f'\t\t\t(width {circle.thickness:g})\n'
-        out += '\t\t\t(type solid)\n' # TODO Non-solid line types
-        out += '\t\t)\n'
+        writer.write('\t\t(stroke\n')
+        writer.write(f'\t\t\t(width {circle.thickness:g})\n')
+        writer.write('\t\t\t(type solid)\n') # TODO Non-solid line types
+        writer.write('\t\t)\n')
 
         if circle.closed:
-            out += f'\t\t(fill {"yes" if circle.fill else "no"})\n'
+            writer.write(f'\t\t(fill {"yes" if circle.fill else "no"})\n')
 
-        out += f'\t\t(layer {Converter.layers_to_text(circle.layer)})\n'
-        out += f'\t\t(uuid "{Converter.make_uuid()}")\n'
-        out += '\t)\n'
-        return out
+        writer.write(f'\t\t(layer {Converter.layers_to_text(circle.layer)})\n')
+        writer.write(f'\t\t(uuid "{Converter.make_uuid()}")\n')
+        writer.write('\t)\n')
 
     @staticmethod
-    def label_to_text(label):
+    def write_label(writer, label):
         if label is None:
-            return ''
+            return
 
-        out = ''
-        out += Converter.string_to_text(exporter.String('REF', label.position, label.thickness,
+        Converter.write_string(writer, exporter.String('REF', label.position, label.thickness,
             label.font, 'Reference', label.layer.layers(), False))
-        out += Converter.string_to_text(exporter.String(label.text, label.position, label.thickness,
+        Converter.write_string(writer, exporter.String(label.text, label.position, label.thickness,
             label.font, 'Value', exporter.Layer.FAB, False))
-        out += Converter.string_to_text(exporter.String('', label.position, label.thickness,
+        Converter.write_string(writer, exporter.String('', label.position, label.thickness,
             label.font, 'Datasheet', exporter.Layer.FAB, True))
-        out += Converter.string_to_text(exporter.String('', label.position, label.thickness,
+        Converter.write_string(writer, exporter.String('', label.position, label.thickness,
             label.font, 'Description', exporter.Layer.FAB, True))
-        return out
 
     @staticmethod
-    def string_to_text(string):
-        out = f'\t(property "{string.name}" "{string.text}"\n'
-        out += f'\t\t(at {string.position[0]:g} {string.position[1]:g} {string.position[2]:g})\n'
-        out += f'\t\t(layer {Converter.layers_to_text(string.layer)})\n'
+    def write_string(writer, string):
+        writer.write(f'\t(property "{string.name}" "{string.text}"\n')
+        writer.write(f'\t\t(at {string.position[0]:g} {string.position[1]:g}'
+                     f' {string.position[2]:g})\n')
+        writer.write(f'\t\t(layer {Converter.layers_to_text(string.layer)})\n')
         if string.hidden:
-            out += '\t\t(hide yes)\n'
-        out += f'\t\t(uuid "{Converter.make_uuid()}")\n'
-        out += '\t\t(effects\n'
-        out += '\t\t\t(font\n'
-        out += f'\t\t\t\t(size {string.font:g} {string.font:g})\n'
-        out += f'\t\t\t\t(thickness {string.thickness:g})\n'
-        out += '\t\t\t)\n'
-        out += '\t\t)\n'
-        out += '\t)\n'
-        return out
+            writer.write('\t\t(hide yes)\n')
+        writer.write(f'\t\t(uuid "{Converter.make_uuid()}")\n')
+        writer.write('\t\t(effects\n')
+        writer.write('\t\t\t(font\n')
+        writer.write(f'\t\t\t\t(size {string.font:g} {string.font:g})\n')
+        writer.write(f'\t\t\t\t(thickness {string.thickness:g})\n')
+        writer.write('\t\t\t)\n')
+        writer.write('\t\t)\n')
+        writer.write('\t)\n')
 
     @staticmethod
-    def line_to_text(line):
-        out = '\t(fp_line\n'
-        out += f'\t\t(start {line.start[0]:g} {line.start[1]:g})\n'
-        out += f'\t\t(end {line.end[0]:g} {line.end[1]:g})\n'
-        out += '\t\t(stroke\n'
-        out += f'\t\t\t(width {line.thickness:g})\n'
-        out += '\t\t\t(type solid)\n' # TODO Non-solid line types
-        out += '\t\t)\n'
-        out += f'\t\t(layer {Converter.layers_to_text(line.layer)})\n'
-        out += f'\t\t(uuid "{Converter.make_uuid()}")\n'
-        out += '\t)\n'
-        return out
+    def write_line(writer, line):
+        writer.write('\t(fp_line\n')
+        writer.write(f'\t\t(start {line.start[0]:g} {line.start[1]:g})\n')
+        writer.write(f'\t\t(end {line.end[0]:g} {line.end[1]:g})\n')
+        writer.write('\t\t(stroke\n')
+        writer.write(f'\t\t\t(width {line.thickness:g})\n')
+        writer.write('\t\t\t(type solid)\n') # TODO Non-solid line types
+        writer.write('\t\t)\n')
+        writer.write(f'\t\t(layer {Converter.layers_to_text(line.layer)})\n')
+        writer.write(f'\t\t(uuid "{Converter.make_uuid()}")\n')
+        writer.write('\t)\n')
 
     @staticmethod
-    def rect_to_text(rect):
-        return ''.join([Converter.line_to_text(line) for line in rect.lines])
+    def write_rect(writer, rect):
+        for line in rect.lines:
+            Converter.write_line(writer, line)
 
     @staticmethod
-    def pad_to_text(pad):
-        out = f'\t(pad "{pad.text}"'
-        out += f' {Converter.pad_type_to_text(pad.family)}'
-        out += f' {Converter.pad_style_to_text(pad.style)}\n'
+    def write_pad(writer, pad):
+        writer.write(f'\t(pad "{pad.text}"')
+        writer.write(f' {Converter.pad_type_to_text(pad.family)}')
+        writer.write(f' {Converter.pad_style_to_text(pad.style)}\n')
 
-        out += f'\t\t(at {pad.position[0]:g} {pad.position[1]:g})\n'
-        out += f'\t\t(size {pad.size[0]:g} {pad.size[1]:g})\n'
+        writer.write(f'\t\t(at {pad.position[0]:g} {pad.position[1]:g})\n')
+        writer.write(f'\t\t(size {pad.size[0]:g} {pad.size[1]:g})\n')
 
         if pad.family in (exporter.AbstractPad.FAMILY_TH, exporter.AbstractPad.FAMILY_NPTH):
             if pad.style == exporter.AbstractPad.STYLE_OVAL:
-                out += f'\t\t(drill oval {pad.diameter[0]:g} {pad.diameter[1]:g})\n'
+                writer.write(f'\t\t(drill oval {pad.diameter[0]:g} {pad.diameter[1]:g})\n')
             else:
-                out += f'\t\t(drill {pad.diameter:g})\n'
+                writer.write(f'\t\t(drill {pad.diameter:g})\n')
 
-        out += f'\t\t(layers {Converter.layers_to_text(pad.copper + pad.mask + pad.paste)})\n'
+        layers = Converter.layers_to_text(pad.copper + pad.mask + pad.paste)
+        writer.write(f'\t\t(layers {layers})\n')
 
         if pad.family == exporter.AbstractPad.FAMILY_TH:
-            out += '\t\t(remove_unused_layers no)\n'
+            writer.write('\t\t(remove_unused_layers no)\n')
 
-        out += f'\t\t(uuid "{Converter.make_uuid()}")\n'
-        out += '\t)\n'
-        return out
+        writer.write(f'\t\t(uuid "{Converter.make_uuid()}")\n')
+        writer.write('\t)\n')
 
     @staticmethod
-    def poly_to_text(poly):
-        out = '\t(fp_poly\n'
-        out += '\t\t(pts\n'
-
-        out += '\t\t\t'
-        out += ' '.join([f'(xy {vertex[0]:g} {vertex[1]:g})' for vertex in poly.vertices])
-        out += '\n'
-        out += '\t\t)\n'
-
-        out += '\t\t(stroke\n'
-        out += f'\t\t\t(width {poly.thickness:g})\n'
-        out += '\t\t\t(type solid)\n' # TODO Non-solid line types
-        out += '\t\t)\n'
-
-        out += f'\t\t(fill {"yes" if poly.fill else "no"})\n'
-        out += f'\t\t(layer {Converter.layers_to_text(poly.layer)})\n'
-        out += f'\t\t(uuid "{Converter.make_uuid()}")\n'
-        out += '\t)\n'
-        return out
-
-    def footprint_to_text(self, footprint):
-        objects = footprint.generate()
+    def write_poly(writer, poly):
+        writer.write('\t(fp_poly\n')
+        writer.write('\t\t(pts\n')
+
+        writer.write('\t\t\t')
+        writer.write(' '.join([f'(xy {vertex[0]:g} {vertex[1]:g})' for vertex in poly.vertices]))
+        writer.write('\n')
+        writer.write('\t\t)\n')
+
+        writer.write('\t\t(stroke\n')
+        writer.write(f'\t\t\t(width {poly.thickness:g})\n')
+        writer.write('\t\t\t(type solid)\n') # TODO Non-solid line types
+        writer.write('\t\t)\n')
+
+        writer.write(f'\t\t(fill {"yes" if poly.fill else "no"})\n')
+        writer.write(f'\t\t(layer {Converter.layers_to_text(poly.layer)})\n')
+        writer.write(f'\t\t(uuid "{Converter.make_uuid()}")\n')
+        writer.write('\t)\n')
+
+    def write_footprint(self, writer, footprint, objects=None):
+        if objects is None:
+            objects = footprint.generate()
+        objects = exporter.make_object_index(objects)
         footprint_hash = hash(tuple(objects))
         footprint_layer = exporter.Layer.to_mask(exporter.Layer.CU_FRONT)
         Converter.reset_uuid(footprint.name, footprint_hash)
 
-        out = f'(footprint "{footprint.name}"\n'
-        out += f'\t(version {Converter.VERSION})\n'
-        out += f'\t(generator "{Converter.GENERATOR}")\n'
-        out += f'\t(generator_version "{Converter.GENERATOR_VERSION}")\n'
-        out += f'\t(layer {Converter.layers_to_text(footprint_layer)})\n'
+        writer.write(f'(footprint "{footprint.name}"\n')
+        writer.write(f'\t(version {Converter.VERSION})\n')
+        writer.write(f'\t(generator "{Converter.GENERATOR}")\n')
+        writer.write(f'\t(generator_version "{Converter.GENERATOR_VERSION}")\n')
+        writer.write(f'\t(layer {Converter.layers_to_text(footprint_layer)})\n')
         if footprint.description is not None:
-            out += f'\t(descr "{footprint.description}")\n'
-
-        for obj in filter(lambda x: isinstance(x, exporter.Label), objects):
-            out += Converter.label_to_text(obj)
-
-        out += f'\t(attr {self.get_module_type_str(objects)})\n'
-
-        for obj in filter(lambda x: isinstance(x, exporter.String), objects):
-            out += Converter.string_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.Line), objects):
-            out += Converter.line_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.Rect), objects):
-            out += Converter.rect_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.Circle), objects):
-            out += Converter.circle_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.Poly), objects):
-            out += Converter.poly_to_text(obj)
-        for obj in filter(lambda x: isinstance(x, exporter.AbstractPad), objects):
-            out += Converter.pad_to_text(obj)
+            writer.write(f'\t(descr "{footprint.description}")\n')
+
+        for obj in objects[exporter.Label]:
+            Converter.write_label(writer, obj)
+
+        writer.write(f'\t(attr {self.get_module_type_str(objects)})\n')
+
+        for obj in objects[exporter.String]:
+            Converter.write_string(writer, obj)
+        for obj in objects[exporter.Line]:
+            Converter.write_line(writer, obj)
+        for obj in objects[exporter.Rect]:
+            Converter.write_rect(writer, obj)
+        for obj in objects[exporter.Circle]:
+            Converter.write_circle(writer, obj)
+        for obj in objects[exporter.Poly]:
+            Converter.write_poly(writer, obj)
+        for obj in objects[exporter.AbstractPad]:
+            Converter.write_pad(writer, obj)
 
         # Fonts
-        out += '\t(embedded_fonts no)\n'
+        writer.write('\t(embedded_fonts no)\n')
 
         # 3D model
-        out += f'\t(model "{self.model_path}/{footprint.model}.{self.model_type}"\n'
-        out += '\t\t(offset\n'
-        out += '\t\t\t(xyz 0 0 0)\n'
-        out += '\t\t)\n'
-        out += '\t\t(scale\n'
-        out += '\t\t\t(xyz 1 1 1)\n'
-        out += '\t\t)\n'
-        out += '\t\t(rotate\n'
-        out += '\t\t\t(xyz 0 0 0)\n'
-        out += '\t\t)\n'
-        out += '\t)\n'
-
-        out += ')\n'
-        return out
+        writer.write(f'\t(model "{self.model_path}/{footprint.model}.{self.model_type}"\n')
+        writer.write('\t\t(offset\n')
+        writer.write('\t\t\t(xyz 0 0 0)\n')
+        writer.write('\t\t)\n')
+        writer.write('\t\t(scale\n')
+        writer.write('\t\t\t(xyz 1 1 1)\n')
+        writer.write('\t\t)\n')
+        writer.write('\t\t(rotate\n')
+        writer.write('\t\t\t(xyz 0 0 0)\n')
+        writer.write('\t\t)\n')
+        writer.write('\t)\n')
+
+        writer.write(')\n')
+
+    def footprint_to_text(self, footprint):
+        writer = exporter.TextWriter()
+        self.write_footprint(writer, footprint)
+        return writer.getvalue()
 
     def generate(self, part):
         return self.footprint_to_text(part)
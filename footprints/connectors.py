@@ -69,9 +69,8 @@ class FFC(exporter.Footprint):
                                           self.thickness, True))
 
         # Signal pads
-        for i in range(self.count):
-            x_offset = (total_pads_width / 2.0 - i * self.pitch) * self.inversion
-            pads.append(exporter.SmdPad(str(i + 1), self.signal_pad_size, (x_offset, 0.0)))
+        x_offsets = (total_pads_width / 2.0 - np.arange(self.count) * self.pitch) * self.inversion
+        pads.append(exporter.make_pad_row(x_offsets, self.signal_pad_size))
 
         # Mounting pads
         if self.mount_pad_size is not None:
@@ -86,10 +85,8 @@ class FFC(exporter.Footprint):
             outline = exporter.Rect(self.body_size / 2.0 + self.body_offset,
                 self.body_size / -2.0 + self.body_offset, self.thickness)
 
-            process_func = lambda x: exporter.collide_line(x, pads + cutouts, self.thickness,
-                self.gap)
-            for line in outline.lines:
-                silkscreen.extend(process_func(line))
+            silkscreen.extend(exporter.clip_silkscreen([outline], pads + cutouts, self.thickness,
+                                                       self.gap))
 
         return silkscreen + pads
 
@@ -136,9 +133,7 @@ class IpxFootprint(exporter.Footprint):
             self.body_size[1] / 2.0])
         outline = exporter.Rect(outline_size, outline_size * -1.0, self.thickness)
 
-        process_func = lambda x: exporter.collide_line(x, pads, self.thickness, self.gap)
-        for line in outline.lines:
-            silkscreen.extend(process_func(line))
+        silkscreen.extend(exporter.clip_silkscreen([outline], pads, self.thickness, self.gap))
 
         return silkscreen + pads
 
@@ -152,6 +147,8 @@ class IPX(IpxFootprint):
 
 class MemoryCard(exporter.Footprint):
     class MountHole(exporter.AbstractPad):
+        __slots__ = ()
+
         def __init__(self, number, position, diameter):
             super().__init__(number, (diameter, diameter), position, diameter,
                              exporter.AbstractPad.STYLE_CIRCLE, exporter.AbstractPad.FAMILY_NPTH,
@@ -209,9 +206,7 @@ class MemoryCard(exporter.Footprint):
         outline = exporter.Rect(top_corner + self.body_offset, -top_corner + self.body_offset,
             self.thickness)
 
-        process_func = lambda x: exporter.collide_line(x, pads, self.thickness, self.gap)
-        for line in outline.lines:
-            silkscreen.extend(process_func(line))
+        silkscreen.extend(exporter.clip_silkscreen([outline], pads, self.thickness, self.gap))
 
         return silkscreen + pads
 
@@ -222,6 +217,8 @@ class MemoryCard(exporter.Footprint):
 
 class AngularSmaFootprint(exporter.Footprint):
     class SidePad(exporter.AbstractPad):
+        __slots__ = ()
+
         def __init__(self, number, size, position, layer):
             super().__init__(number, size, position, 0.0,
                              exporter.AbstractPad.STYLE_RECT, exporter.AbstractPad.FAMILY_SMD,
@@ -302,6 +299,8 @@ class SMA:
 
 class MiniUSB(exporter.Footprint):
     class MountHole(exporter.AbstractPad):
+        __slots__ = ()
+
         def __init__(self, number, position, diameter):
             super().__init__(number, (diameter, diameter), position, diameter,
                              exporter.AbstractPad.STYLE_CIRCLE, exporter.AbstractPad.FAMILY_NPTH,
@@ -360,9 +359,7 @@ class MiniUSB(exporter.Footprint):
         outline = exporter.Rect(top_corner - self.body_offset,
             edge_margin - top_corner - self.body_offset, self.thickness)
 
-        process_func = lambda x: exporter.collide_line(x, pads, self.thickness, self.gap)
-        for line in outline.lines:
-            silkscreen.extend(process_func(line))
+        silkscreen.extend(exporter.clip_silkscreen([outline], pads, self.thickness, self.gap))
 
         return silkscreen + pads
 
@@ -373,6 +370,8 @@ class MiniUSB(exporter.Footprint):
 
 class USBTypeC(exporter.Footprint):
     class MountHole(exporter.AbstractPad):
+        __slots__ = ()
+
         def __init__(self, number, position, size, hole):
             super().__init__(number, size, position, hole,
                              exporter.AbstractPad.STYLE_OVAL, exporter.AbstractPad.FAMILY_TH,
@@ -448,9 +447,7 @@ class USBTypeC(exporter.Footprint):
         outline = exporter.Rect(top_corner - self.body_offset,
             edge_margin - top_corner - self.body_offset, self.thickness)
 
-        process_func = lambda x: exporter.collide_line(x, pads, self.thickness, self.gap)
-        for line in outline.lines:
-            silkscreen.extend(process_func(line))
+        silkscreen.extend(exporter.clip_silkscreen([outline], pads, self.thickness, self.gap))
 
         return silkscreen + pads
 
@@ -478,6 +475,8 @@ class USB:
 
 class XT(exporter.Footprint):
     class MountHole(exporter.AbstractPad):
+        __slots__ = ()
+
         def __init__(self, number, position, diameter):
             super().__init__(number, (diameter, diameter), position, diameter,
                              exporter.AbstractPad.STYLE_CIRCLE, exporter.AbstractPad.FAMILY_NPTH,
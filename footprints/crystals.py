@@ -57,9 +57,7 @@ class CrystalSMD(exporter.Footprint):
         # Body outline
         outline = exporter.Rect(self.body_size / 2.0, -self.body_size / 2.0, self.thickness)
 
-        process_func = lambda x: exporter.collide_line(x, pads, self.thickness, self.gap)
-        for line in outline.lines:
-            silkscreen.extend(process_func(line))
+        silkscreen.extend(exporter.clip_silkscreen([outline], pads, self.thickness, self.gap))
 
         return silkscreen + pads
 
@@ -55,22 +55,12 @@ class PinHeader(exporter.Footprint):
         return objects
 
     def generate_pads(self):
-        objects = []
-
-        for x_offset in range(self.count[0]):
-            for y_offset in range(self.count[1]):
-                number = 1 + x_offset * self.count[1] + y_offset
-                if number == 1:
-                    style = exporter.AbstractPad.STYLE_RECT
-                else:
-                    style = exporter.AbstractPad.STYLE_CIRCLE
+        # First pad is rectangular
+        styles = np.full(self.count[0] * self.count[1], exporter.AbstractPad.STYLE_CIRCLE)
+        styles[0:1] = exporter.AbstractPad.STYLE_RECT
 
-                offset = np.array([float(x_offset), -float(y_offset)]) * self.pitch
-                offset += np.array([0.0, self.pad_offset])
-                objects.append(exporter.HolePad(str(number), self.pad_size, offset, self.pad_drill,
-                                                style))
-
-        return objects
+        return [exporter.make_pad_grid(self.count, self.pitch, self.pad_size,
+                                       (0.0, self.pad_offset), self.pad_drill, styles)]
 
     @staticmethod
     def describe(descriptor):
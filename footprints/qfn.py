@@ -88,36 +88,21 @@ class QFN(exporter.Footprint):
         silkscreen.append(exporter.Circle(dot_mark_position, self.thickness / 2.0,
                                           self.thickness, True))
 
-        # Horizontal pads
-        y_offset = self.body_size[1] / 2.0 + self.margin
-        pad = lambda x: self.pad(False)
-        for i in range(self.count[0]):
-            x_offset = i * self.pitch - first_pin_offset[0]
-            pads.append(exporter.SmdPad(str(1 + i), pad(i),
-                                        np.array([x_offset, y_offset])))
-            pads.append(exporter.SmdPad(str(1 + i + self.count[0] + self.count[1]), pad(i),
-                                        np.array([-x_offset, -y_offset])))
-
-        # Vertical pads
-        x_offset = self.body_size[0] / 2.0 + self.margin
-        pad = lambda x: self.pad(True)
-        for j in range(self.count[1]):
-            y_offset = j * self.pitch - first_pin_offset[1]
-            pads.append(exporter.SmdPad(str(1 + j + self.count[0]), pad(j),
-                                        np.array([x_offset, -y_offset])))
-            pads.append(exporter.SmdPad(str(1 + j + 2 * self.count[0] + self.count[1]), pad(j),
-                                        np.array([-x_offset, y_offset])))
+        # Pads on all sides, offsets are rounded to float32 like in the original per-pad loop,
+        # where a float product was combined with a float32 offset of the first pin
+        x_offsets = (np.arange(self.count[0]) * self.pitch).astype(np.float32) - first_pin_offset[0]
+        y_offsets = (np.arange(self.count[1]) * self.pitch).astype(np.float32) - first_pin_offset[1]
+        border = self.body_size[0:2] / 2.0 + self.margin
+        pads.append(exporter.make_pad_perimeter(x_offsets, y_offsets, self.pad(False),
+                                                self.pad(True), border))
 
         # Central pad
         if self.heatsink_size is not None:
             pads.append(exporter.SmdPad(str(sum(self.count) * 2 + 1), self.heatsink_size,
                                         (0.0, 0.0)))
 
-        process_func = lambda x: exporter.collide_line(x, pads, self.thickness, self.gap)
-        for line in silkscreen_raw:
-            silkscreen.extend(process_func(line))
+        silkscreen.extend(exporter.collide_lines(silkscreen_raw, pads, self.thickness, self.gap))
 
-        pads.sort(key=lambda x: int(x.text))
         return silkscreen + pads
 
     @staticmethod
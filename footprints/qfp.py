@@ -32,18 +32,16 @@ class QFP(exporter.Footprint):
         self.side_pitch = self.pitch + (self.side_pad_size[0] - self.pad_size[0]) / 2.0
         self.title = 'QFP-{:d}'.format(sum(self.count) * 2)
 
-    def pad(self, position, count, rev):
-        x_offset, y_offset = self.side_pad_size if position in (0, count - 1) else self.pad_size
-        return np.array([x_offset, y_offset]) if not rev else np.array([y_offset, x_offset])
-
-    def spacing(self, position, count):
-        res = 0.0
-        if position > 0:
-            res += self.pitch * (position - 1)
-        if position >= 1:
-            res += self.side_pitch
-        if position == count - 1:
-            res += self.side_pitch - self.pitch
+    def pads(self, count, rev):
+        sizes = np.repeat([self.pad_size], count, axis=0)
+        sizes[[0, -1]] = self.side_pad_size
+        return sizes if not rev else sizes[:, ::-1]
+
+    def spacing(self, count):
+        res = np.zeros(count)
+        res[1:] += self.pitch * (np.arange(1, count) - 1)
+        res[1:] += self.side_pitch
+        res[count - 1] += self.side_pitch - self.pitch
         return res
 
     def generate(self):
@@ -54,11 +52,20 @@ class QFP(exporter.Footprint):
         first_pin_offset = np.asarray(self.count, dtype=np.float32) - 3.0
         first_pin_offset = first_pin_offset * self.pitch / 2.0 + self.side_pitch
 
+        # Pads on all sides
+        x_offsets = self.spacing(self.count[0]) - first_pin_offset[0]
+        y_offsets = self.spacing(self.count[1]) - first_pin_offset[1]
+        border = (self.body_size[0:2] + self.pad_size[1]) / 2.0 + self.margin
+        pads.append(exporter.make_pad_perimeter(x_offsets, y_offsets,
+                                                self.pads(self.count[0], False),
+                                                self.pads(self.count[1], True), border))
+
         # Body outline
         outline_margin = (self.margin - self.gap) * 2.0 - self.thickness
         outline_size = np.minimum(self.body_size, self.body_size + outline_margin)
         top_corner = outline_size / 2.0
-        silkscreen.append(exporter.Rect(top_corner, -top_corner, self.thickness))
+        outline = exporter.Rect(top_corner, -top_corner, self.thickness)
+        silkscreen.extend(exporter.clip_silkscreen([outline], pads, self.thickness, self.gap))
 
         # Outer first pin mark
         dot_mark_position = np.array([
@@ -78,27 +85,6 @@ class QFP(exporter.Footprint):
         silkscreen.append(exporter.Poly(tri_mark_points, self.thickness, True,
                                         exporter.Layer.SILK_FRONT))
 
-        # Horizontal pads
-        y_offset = (self.body_size[1] + self.pad_size[1]) / 2.0 + self.margin
-        pad = lambda x: self.pad(x, self.count[0], False)
-        for i in range(self.count[0]):
-            x_offset = self.spacing(i, self.count[0]) - first_pin_offset[0]
-            pads.append(exporter.SmdPad(str(1 + i), pad(i),
-                                        np.array([x_offset, y_offset])))
-            pads.append(exporter.SmdPad(str(1 + i + self.count[0] + self.count[1]), pad(i),
-                                        np.array([-x_offset, -y_offset])))
-
-        # Vertical pads
-        x_offset = (self.body_size[0] + self.pad_size[1]) / 2.0 + self.margin
-        pad = lambda x: self.pad(x, self.count[1], True)
-        for j in range(self.count[1]):
-            y_offset = self.spacing(j, self.count[1]) - first_pin_offset[1]
-            pads.append(exporter.SmdPad(str(1 + j + self.count[0]), pad(j),
-                                        np.array([x_offset, -y_offset])))
-            pads.append(exporter.SmdPad(str(1 + j + 2 * self.count[0] + self.count[1]), pad(j),
-                                        np.array([-x_offset, y_offset])))
-
-        pads.sort(key=lambda x: int(x.text))
         return silkscreen + pads
 
     @staticmethod
@@ -82,9 +82,7 @@ class Chip(exporter.Footprint):
             lines.append(exporter.Line(np.array([-horiz, vert]),
                                        np.array([-horiz, -vert]), self.thickness))
 
-            process_func = lambda x: exporter.collide_line(x, pads, self.thickness, self.gap)
-            for line in lines:
-                objects.extend(process_func(line))
+            objects.extend(exporter.collide_lines(lines, pads, self.thickness, self.gap))
 
         if self.mark_dot and self.verification:
             dot_mark_offset = center + self.pad_size[0] / 2.0 + self.gap + self.thickness
@@ -144,7 +142,6 @@ class Chip(exporter.Footprint):
         pads = []
         pads.append(exporter.SmdPad(self.mapping[0], self.pad_size, (-center, 0)))
         pads.append(exporter.SmdPad(self.mapping[1], self.pad_size, (center, 0)))
-        process_func = lambda x: exporter.collide_line(x, pads, self.thickness, self.gap)
 
         lines = []
         # Right lines
@@ -159,9 +156,7 @@ class Chip(exporter.Footprint):
             lines.append(exporter.Line((-horiz2, vert), (-horiz2, -vert), self.thickness))
         lines.append(exporter.Line((-horiz1, vert), (-horiz1, -vert), self.thickness))
 
-        for line in lines:
-            objects.extend(process_func(line))
-
+        objects.extend(exporter.collide_lines(lines, pads, self.thickness, self.gap))
         objects.extend(pads)
         return objects
 
@@ -308,10 +303,8 @@ class DPAK(exporter.Footprint):
             pads.append(exporter.SmdPad(entry.name, entry.size, entry.position))
 
         pads.sort(key=lambda x: x.text)
-        process_func = lambda x: exporter.collide_line(x, pads, self.thickness, self.gap)
 
-        for line in outline.lines:
-            objects.extend(process_func(line))
+        objects.extend(exporter.clip_silkscreen([outline], pads, self.thickness, self.gap))
         objects.extend(pads)
 
         return objects
@@ -38,17 +38,16 @@ class SOP(exporter.Footprint):
         self.title = '{:s}-{:d}'.format(descriptor['package']['subtype'],
             descriptor['pins']['count'])
 
-    def pad(self, position, count):
-        return self.side_pad_size if position in (0, count - 1) else self.pad_size
-
-    def spacing(self, position, count):
-        res = 0.0
-        if position > 0:
-            res += self.pitch * (position - 1)
-        if position >= 1:
-            res += self.side_pitch
-        if position == count - 1:
-            res += self.side_pitch - self.pitch
+    def pads(self, count):
+        sizes = np.repeat([self.pad_size], count, axis=0)
+        sizes[[0, -1]] = self.side_pad_size
+        return sizes
+
+    def spacing(self, count):
+        res = np.zeros(count)
+        res[1:] += self.pitch * (np.arange(1, count) - 1)
+        res[1:] += self.side_pitch
+        res[count - 1] += self.side_pitch - self.pitch
         return res
 
     def generate(self):
@@ -82,20 +81,16 @@ class SOP(exporter.Footprint):
         silkscreen.append(exporter.Poly(tri_mark_points, self.thickness, True,
                                         exporter.Layer.SILK_FRONT))
 
-        # Horizontal pads
-        y_offset = (self.body_size[1] + self.pad_size[1]) / 2.0 + self.margin
-        for i in range(self.rows):
-            x_offset = self.spacing(i, self.rows) - first_pin_offset
-            pads.append(exporter.SmdPad(str(i + 1), self.pad(i, self.rows),
-                                        np.array([x_offset, y_offset])))
-            pads.append(exporter.SmdPad(str(i + 1 + self.rows), self.pad(i, self.rows),
-                                        np.array([-x_offset, -y_offset])))
+        # Pads on both sides
+        x_offsets = self.spacing(self.rows) - first_pin_offset
+        border = (0.0, (self.body_size[1] + self.pad_size[1]) / 2.0 + self.margin)
+        pads.append(exporter.make_pad_perimeter(x_offsets, [], self.pads(self.rows),
+                                                self.pad_size, border))
 
         # Central pad
         if self.heatsink_size is not None:
             pads.append(exporter.SmdPad(str(self.rows * 2 + 1), self.heatsink_size, (0.0, 0.0)))
 
-        pads.sort(key=lambda x: int(x.text))
         return silkscreen + pads
 
     @staticmethod
@@ -40,9 +40,7 @@ class Button(exporter.Footprint):
         outline_size = np.maximum(self.body_size, bounding_box)
         outline = exporter.Rect(outline_size / 2.0, -outline_size / 2.0, self.thickness)
 
-        process_func = lambda x: exporter.collide_line(x, pads, self.thickness, self.gap)
-        for line in outline.lines:
-            silkscreen.extend(process_func(line))
+        silkscreen.extend(exporter.clip_silkscreen([outline], pads, self.thickness, self.gap))
 
         # Central circle
         circle_radius = min(self.body_size) / 4.0
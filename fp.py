@@ -12,6 +12,7 @@ import os
 import re
 import sys
 
+import exporter
 import exporter_kicad
 import exporter_kicad_pretty
 import exporter_kicad_pretty_v2
@@ -25,8 +26,10 @@ class Generator:
     FORMAT_SEXPRESSION        = 2
 
     def __init__(self, library_name=None, library_path=None, output_format=FORMAT_SEXPRESSION,
-                 use_vrml=True):
-        self.format = output_format
+                 use_vrml=True, epoch=None):
+        # Several formats may be requested at once, footprints are generated only once
+        formats = output_format if isinstance(output_format, (list, tuple)) else [output_format]
+        self.formats = sorted(set(formats))
         self.types = Generator.load()
 
         self.library_path = library_path
@@ -35,17 +38,33 @@ class Generator:
         model_path = self.library_name
         model_type = 'wrl' if use_vrml else 'x3d'
 
-        if self.format == Generator.FORMAT_SEXPRESSION:
-            self.converter = exporter_kicad_pretty_v2.Converter(model_path, model_type)
-        elif self.format == Generator.FORMAT_SEXPRESSION_LEGACY:
-            self.converter = exporter_kicad_pretty.Converter(model_path, model_type)
-        else:
-            self.converter = exporter_kicad.Converter(model_path, model_type)
+        self.converters = {}
+        for entry in self.formats:
+            if entry == Generator.FORMAT_SEXPRESSION:
+                converter = exporter_kicad_pretty_v2.Converter(model_path, model_type)
+            elif entry == Generator.FORMAT_SEXPRESSION_LEGACY:
+                converter = exporter_kicad_pretty.Converter(model_path, model_type, epoch)
+            elif entry == Generator.FORMAT_LEGACY:
+                converter = exporter_kicad.Converter(model_path, model_type=model_type,
+                                                     epoch=epoch)
+            else:
+                raise ValueError()
+            self.converters[entry] = converter
+
+    def make_library_path(self, output_format):
+        dir_extension = '.obj' if output_format == Generator.FORMAT_LEGACY else '.pretty'
+        path = self.library_path
+
+        # Both s-expression formats use the same extension, old one is moved to a subdirectory
+        if output_format == Generator.FORMAT_SEXPRESSION_LEGACY \
+                and Generator.FORMAT_SEXPRESSION in self.formats:
+            path = os.path.join(path, 'legacy')
+        return os.path.join(path, self.library_name + dir_extension)
 
     def load_footprints(self, specs, parts, pattern):
         footprints = []
         for part in parts:
-            if pattern.search(part['title']) is not None:
+            if pattern is None or pattern.search(part['title']) is not None:
                 for package in self.types:
                     if package.__name__ == part['package']['type']:
                         footprints.append(package(specs[part['package']['spec']], part))
@@ -53,30 +72,42 @@ class Generator:
         return footprints
 
     def generate(self, specs, parts, pattern, verbose):
-        footprints = self.load_footprints(specs, parts, pattern)
+        self.write_footprints(self.load_footprints(specs, parts, pattern), verbose)
 
+    def write_footprints(self, footprints, verbose):
+        paths = {}
         if self.library_path is not None:
-            dir_extension = '.obj' if self.format == Generator.FORMAT_LEGACY else '.pretty'
-            file_extension = '.mod.obj' if self.format == Generator.FORMAT_LEGACY else '.kicad_mod'
-
-            lib_dir_path = os.path.join(self.library_path, self.library_name + dir_extension)
-            make_file_path = lambda entry: os.path.join(lib_dir_path, entry.name + file_extension)
-            if not os.path.exists(lib_dir_path):
-                try:
-                    os.makedirs(lib_dir_path)
-                except FileExistsError:
-                    pass
-
+            for entry in self.formats:
+                paths[entry] = self.make_library_path(entry)
+                if not os.path.exists(paths[entry]):
+                    try:
+                        os.makedirs(paths[entry])
+                    except FileExistsError:
+                        pass
+
+        buffer = exporter.TextWriter()
         for footprint in footprints:
-            footprint_data = self.converter.generate(footprint)
-
-            if self.library_path is not None:
-                with open(make_file_path(footprint), 'wb') as file:
-                    file.write(footprint_data.encode('utf-8'))
-                if verbose:
-                    print(f'Footprint {self.library_name}:{footprint.name} was exported')
-            else:
-                print(footprint_data)
+            objects = exporter.make_object_index(footprint.generate())
+
+            for entry in self.formats:
+                converter = self.converters[entry]
+
+                if self.library_path is not None:
+                    extension = '.mod.obj' if entry == Generator.FORMAT_LEGACY else '.kicad_mod'
+                    file_path = os.path.join(paths[entry], footprint.name + extension)
+
+                    # Footprint is streamed to a temporary file without intermediate strings,
+                    # existing file is replaced only after the footprint was written completely
+                    temporary_path = file_path + '.tmp'
+                    with open(temporary_path, 'w', encoding='utf-8', newline='') as file:
+                        converter.write_footprint(exporter.TextWriter(file), footprint, objects)
+                    os.replace(temporary_path, file_path)
+                    if verbose:
+                        print(f'Footprint {self.library_name}:{footprint.name} was exported')
+                else:
+                    buffer.clear()
+                    converter.write_footprint(buffer, footprint, objects)
+                    print(buffer.getvalue())
 
     @staticmethod
     def load():
@@ -88,14 +119,34 @@ class Generator:
         return types
 
 
-def main():
+def make_model_names(footprints):
+    # Models are named after the references of footprints
+    return {footprint.name: footprint.model for footprint in footprints}
+
+def load_model_names(specs, parts):
+    return make_model_names(Generator(output_format=[]).load_footprints(specs, parts, None))
+
+def load_specs(config_file):
+    # Silkscreen specifications are taken from the default configuration when missing
     config_path = f'{os.path.dirname(os.path.realpath(__file__))}/config.json'
+
+    if config_file is not None:
+        config = json.load(open(config_file, 'rb'))
+        if 'specs' in config:
+            return config['specs']
+    config = json.load(open(config_path, 'rb'))
+    return config['specs']
+
+def main():
     parser = argparse.ArgumentParser()
 
     parser.add_argument('-c', dest='config', help='path to a configuration file',
                         default=None)
     parser.add_argument('-d', dest='debug', help='show debug information',
                         default=False, action='store_true')
+    parser.add_argument('-e', dest='epoch',
+                        help='use fixed timestamp or \'digest\' for timestamps based on contents',
+                        default=os.environ.get('SOURCE_DATE_EPOCH'))
     parser.add_argument('-f', dest='pattern', help='filter parts by name',
                         default='.*')
     parser.add_argument('-l', dest='library', help='add footprints to a specified library',
@@ -106,6 +157,9 @@ def main():
                         default=False, action='store_true')
     parser.add_argument('--legacy-pretty', dest='legacy_pretty', help='use old s-expression format',
                         default=False, action='store_true')
+    parser.add_argument('--pretty', dest='pretty',
+                        help='use s-expression format together with other selected formats',
+                        default=False, action='store_true')
     parser.add_argument('--specs', dest='specs', help='override silkscreen specifications',
                         default=None)
     parser.add_argument('--vrml', dest='vrml', help='use VRML model format',
@@ -113,29 +167,23 @@ def main():
     parser.add_argument(dest='files', nargs='*')
     options = parser.parse_args()
 
+    output_formats = []
     if options.legacy:
-        if options.legacy_pretty:
-            raise ValueError()
-        output_format = Generator.FORMAT_LEGACY
-    elif options.legacy_pretty:
-        output_format = Generator.FORMAT_SEXPRESSION_LEGACY
-    else:
-        output_format = Generator.FORMAT_SEXPRESSION
-
-    specs_default = None
-    if options.config is not None:
-        config = json.load(open(options.config, 'rb'))
-        if 'specs' in config:
-            specs_default = config['specs']
-    if specs_default is None:
-        config = json.load(open(config_path, 'rb'))
-        specs_default = config['specs']
+        output_formats.append(Generator.FORMAT_LEGACY)
+    if options.legacy_pretty:
+        output_formats.append(Generator.FORMAT_SEXPRESSION_LEGACY)
+    if options.pretty or not output_formats:
+        output_formats.append(Generator.FORMAT_SEXPRESSION)
+
+    specs_default = load_specs(options.config)
+
+    generator = Generator(options.library, options.output, output_formats, options.vrml,
+                          options.epoch)
+    pattern = re.compile(options.pattern, re.S)
 
     for filename in options.files:
         desc = json.load(open(filename, 'rb'))
         spec = desc['specs'] if 'specs' in desc else specs_default
-        pattern = re.compile(options.pattern, re.S)
-        generator = Generator(options.library, options.output, output_format, options.vrml)
         generator.generate(spec, desc['parts'], pattern, options.debug)
 
 if __name__ == '__main__':
@@ -10,7 +10,7 @@ import inspect
 import json
 import sys
 
-def list_entries(files):
+def list_entries(files, references=False):
     for filename in files:
         description = json.loads(open(filename, 'rb').read())
         if 'parts' not in description:
@@ -18,7 +18,19 @@ def list_entries(files):
         for part in description['parts']:
             if 'title' not in part or 'package' not in part or 'type' not in part['package']:
                 raise KeyError()
-            print(part['package']['type'] + ' ' + part['title'])
+
+        if references:
+            # Model names are the same as the model references of footprints
+            import fp
+            specs = description['specs'] if 'specs' in description else fp.load_specs(None)
+            names = fp.load_model_names(specs, description['parts'])
+
+        for part in description['parts']:
+            if references:
+                name = names.get(part['title'], part['title'])
+                print(part['package']['type'] + ' ' + part['title'] + ' ' + name)
+            else:
+                print(part['package']['type'] + ' ' + part['title'])
 
 def list_footprints():
     builders = [entry[1] for entry in inspect.getmembers(sys.modules['footprints'])
@@ -47,6 +59,8 @@ def parse_args():
                         default=False, action='store_true')
     parser.add_argument('-m', dest='models', help='print available models',
                         default=False, action='store_true')
+    parser.add_argument('-r', dest='references', help='print model names of parts',
+                        default=False, action='store_true')
     parser.add_argument(dest='files', nargs='*')
 
     return parser.parse_args()
@@ -66,4 +80,4 @@ if __name__ == '__main__':
         from packages import *
         list_models()
     else:
-        list_entries(parsed_options.files)
+        list_entries(parsed_options.files, parsed_options.references)
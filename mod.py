@@ -6,12 +6,19 @@
 # Project is distributed under the terms of the GNU General Public License v3.0
 
 import argparse
+import copy
+import hashlib
 import inspect
 import json
+import math
 import os
 import re
 import sys
+from xml.etree import ElementTree
+import numpy as np
 
+import fp
+import primitives
 from wrlconv import model, vrml_export, vrml_export_kicad, vrml_import, x3d_export, x3d_import
 from packages import *
 
@@ -20,81 +27,195 @@ def capitalize(name):
         return name
     return name[0].upper() + name[1:]
 
-def load_materials(config, extension={}):
-    materials = {}
+MATERIAL_CONTEXTS = {}
+RESOLUTION_CONTEXTS = {}
 
-    # First pass to load complete descriptions
-    for key in config['materials']:
-        entry = config['materials'][key]
-        if not isinstance(entry, str):
-            materials.update({key: model.Material(entry, capitalize(key))})
-    # Second pass to process aliases
-    for key in config['materials']:
-        entry = config['materials'][key]
-        if isinstance(entry, str):
-            materials[key] = materials[entry]
+class ReadOnlyDict(dict):
+    # Unlike mapping proxies, read-only dictionaries can be pickled
+    def reject(self, *_1, **_2):
+        raise TypeError()
 
+    __setitem__ = __delitem__ = __ior__ = reject
+    clear = pop = popitem = setdefault = update = reject
+
+    def __reduce__(self):
+        return (ReadOnlyDict, (dict(self),))
+
+def make_context_key(*entries):
+    return tuple(json.dumps(entry, sort_keys=True) for entry in entries)
+
+def append_materials(materials, entries):
     # First pass to load complete descriptions
-    for key in extension:
-        entry = extension[key]
+    for key in entries:
+        entry = entries[key]
         if not isinstance(entry, str):
             materials.update({key: model.Material(entry, capitalize(key))})
     # Second pass to process aliases
-    for key in extension:
-        entry = extension[key]
+    for key in entries:
+        entry = entries[key]
         if isinstance(entry, str):
             materials[key] = materials[entry]
 
-    return materials
-
-def load_models(config, files, pattern):
+def load_materials(config, extension={}):
+    # Contexts are read-only and shared between all descriptions with the same overrides
+    base_key = make_context_key(config['materials'])
+    if base_key not in MATERIAL_CONTEXTS:
+        materials = {}
+        append_materials(materials, config['materials'])
+        MATERIAL_CONTEXTS[base_key] = ReadOnlyDict(materials)
+    if not extension:
+        return MATERIAL_CONTEXTS[base_key]
+
+    key = base_key + make_context_key(extension)
+    if key not in MATERIAL_CONTEXTS:
+        # Overridden entries are replaced with new materials, base materials are not modified
+        materials = dict(MATERIAL_CONTEXTS[base_key])
+        append_materials(materials, extension)
+        MATERIAL_CONTEXTS[key] = ReadOnlyDict(materials)
+    return MATERIAL_CONTEXTS[key]
+
+def load_package_types():
     builders = [entry[1] for entry in inspect.getmembers(sys.modules['packages'])
         if inspect.ismodule(entry[1]) and entry[1].__name__.startswith('packages.')]
     types = []
     for entry in builders:
         types.extend(entry.__dict__['types'])
+    return types
+
+def load_description_models(config, types, desc, path, parts, lods=None, names=None):
+    presets = [None] if lods is None else lods
+    models = {preset: [] for preset in presets}
+
+    # Models are stored under the names referenced by footprints, each name is written once,
+    # parts without footprints keep their titles
+    if names is None:
+        if 'specs' in desc:
+            specs = desc['specs']
+        else:
+            specs = config['specs'] if 'specs' in config else fp.load_specs(None)
+        names = fp.load_model_names(specs, parts)
+
+    materials = load_materials(config, desc['materials'] if 'materials' in desc else {})
+    templates = load_templates(desc['templates'], path) if 'templates' in desc else []
+
+    # Parts of the same package type are generated in a single batch
+    batches = {}
+    for i, part in enumerate(parts):
+        batches.setdefault(part['package']['type'], []).append(i)
+
+    # Descriptions and templates are shared by all levels of detail
+    for preset in presets:
+        resolutions = load_resolutions(config,
+                                       desc['resolutions'] if 'resolutions' in desc else {},
+                                       preset)
+
+        groups = [None] * len(parts)
+        for package in types:
+            if package.__name__ not in batches:
+                continue
+            indices = batches[package.__name__]
+            results = generic.generate_batch(package(), materials, resolutions, templates,
+                                             [parts[i] for i in indices])
+            for i, group in zip(indices, results):
+                groups[i] = group
+
+        written = set()
+        for part, group in zip(parts, groups):
+            name = names.get(part['title'], part['title'])
+            if group is None or name in written:
+                continue
+            for entry in group:
+                # Enable back-face culling
+                entry.appearance().solid = True
+            models[preset].append((group, name))
+            written.add(name)
 
-    models = []
+    return models
+
+def load_models(config, files, pattern, lods=None):
+    types = load_package_types()
+    presets = [None] if lods is None else lods
+    models = {preset: [] for preset in presets}
     pattern_re = re.compile(pattern, re.S)
 
     for filename in files:
         desc = json.load(open(filename, 'rb'))
-
-        materials = load_materials(config, desc['materials'] if 'materials' in desc else {})
-        resolutions = load_resolutions(config, desc['resolutions'] if 'resolutions' in desc else {})
-        templates = load_templates(desc['templates'],
-                                   os.path.dirname(filename)) if 'templates' in desc else []
-
-        for part in filter(lambda x: pattern_re.search(x['title']) is not None, desc['parts']):
-            for package in types:
-                if package.__name__ == part['package']['type']:
-                    group = package().generate(materials, resolutions, templates, part)
-                    for entry in group:
-                        # Enable back-face culling
-                        entry.appearance().solid = True
-                    models.append((group, part['title']))
-
-    return models
-
-def load_resolutions(config, entries):
-    resolutions = config['resolutions']
-
-    for key in resolutions:
-        if key in entries:
-            resolutions[key] = entries[key]
-
-    return resolutions
-
-def load_templates(entries, path):
-    templates = []
-    for entry in entries:
-        script_path = path + '/' + entry
+        parts = [part for part in desc['parts'] if pattern_re.search(part['title']) is not None]
+        entries = load_description_models(config, types, desc, os.path.dirname(filename), parts,
+                                          lods)
+        for preset in presets:
+            models[preset].extend(entries[preset])
+
+    return models[None] if lods is None else models
+
+def load_resolutions(config, entries, lod=None):
+    # Only entries overriding known resolutions are taken into account
+    defaults = config['resolutions']
+    overrides = {name: entries[name] for name in defaults if name in entries}
+    preset = config['lods'][lod] if lod is not None else {}
+    key = make_context_key(defaults, overrides, preset)
+    if key not in RESOLUTION_CONTEXTS:
+        resolutions = dict(defaults)
+        resolutions.update(preset)
+        # Description overrides are scaled by the ratio of the preset to the default value
+        for name, value in overrides.items():
+            if name in preset and defaults[name]:
+                value = max(1, round(value * preset[name] / defaults[name]))
+            resolutions[name] = value
+        RESOLUTION_CONTEXTS[key] = ReadOnlyDict(resolutions)
+    return RESOLUTION_CONTEXTS[key]
+
+TEMPLATE_FILES = {}
+TEMPLATE_SETS = {}
+
+def load_template_file(script_path):
+    key = os.path.abspath(script_path)
+    if key not in TEMPLATE_FILES:
         extension = os.path.splitext(script_path)[1][1:].lower()
         if extension == 'wrl':
-            templates.extend(vrml_import.load(script_path))
+            TEMPLATE_FILES[key] = vrml_import.load(script_path)
         elif extension == 'x3d':
-            templates.extend(x3d_import.load(script_path))
-    return templates
+            TEMPLATE_FILES[key] = x3d_import.load(script_path)
+        else:
+            TEMPLATE_FILES[key] = []
+    return TEMPLATE_FILES[key]
+
+def load_templates(entries, path):
+    key = tuple(os.path.abspath(path + '/' + entry) for entry in entries)
+    if key not in TEMPLATE_SETS:
+        templates = []
+        for entry in entries:
+            templates.extend(load_template_file(path + '/' + entry))
+        TEMPLATE_SETS[key] = generic.TemplateIndex(templates)
+    return TEMPLATE_SETS[key]
+
+def add_export_arguments(parser):
+    # Options of model post-processing and export are shared with library builder
+    parser.add_argument('--decimate', dest='budget', help='limit triangle count of each part',
+                        default=None, type=int)
+    parser.add_argument('--decimate-error', dest='error',
+                        help='limit geometric error of mesh decimation',
+                        default=None, type=float)
+    parser.add_argument('--lod', dest='lods',
+                        help='generate comma-separated levels of detail into subdirectories',
+                        default=None)
+    parser.add_argument('--merge', dest='merge',
+                        help='merge meshes with the same material in each part',
+                        default=False, action='store_true')
+    parser.add_argument('--merge-exclude', dest='exclusions',
+                        help='do not merge meshes of parts matching a pattern',
+                        default=None)
+    parser.add_argument('--no-sharing', dest='isolated',
+                        help='do not share pin meshes between parts',
+                        default=False, action='store_true')
+    parser.add_argument('--quantize', dest='quantum',
+                        help='snap vertices to a grid with a specified step in millimeters',
+                        default=None, type=float)
+    parser.add_argument('--shared', dest='shared',
+                        help='write geometry used by several parts to shared files',
+                        default=False, action='store_true')
+    parser.add_argument('--vrml', dest='vrml', help='use VRML model format',
+                        default=False, action='store_true')
 
 def parse_args():
     config_path = f'{os.path.dirname(os.path.realpath(__file__))}/config.json'
@@ -120,12 +241,144 @@ def parse_args():
                         default=False, action='store_true')
     parser.add_argument('--smooth', dest='smooth', help='use smooth shading',
                         default=False, action='store_true')
-    parser.add_argument('--vrml', dest='vrml', help='use VRML model format',
-                        default=False, action='store_true')
+    add_export_arguments(parser)
     parser.add_argument(dest='files', nargs='*')
 
     return parser.parse_args()
 
+def merge_meshes(meshes, name):
+    # Meshes with the same material are flattened into a single mesh, textured meshes are
+    # merged separately to keep texture coordinates of all polygons
+    groups = {}
+    for mesh in meshes:
+        source = mesh.parent if mesh.parent is not None else mesh
+        key = (id(source.appearance().material), bool(source.tex_polygons))
+        groups.setdefault(key, []).append(mesh)
+
+    merged, names = [], set()
+    for entries in groups.values():
+        appearance = (entries[0].parent if entries[0].parent is not None
+                      else entries[0]).appearance()
+        material = appearance.material
+        suffix = material.color.ident if material is not None else str(len(merged))
+
+        # Different materials may have the same name
+        ident, count = name + suffix, 1
+        while ident in names:
+            ident, count = f'{name}{suffix}{count}', count + 1
+        names.add(ident)
+        result = model.Mesh(name=ident)
+
+        for mesh in entries:
+            source = mesh.parent if mesh.parent is not None else mesh
+            matrix = calc_mesh_matrix(mesh)
+            offset = len(result.geo_vertices)
+            tex_offset = len(result.tex_vertices)
+            vertices = np.asarray(source.geo_vertices, dtype=float).reshape(-1, 3)
+            result.geo_vertices.extend(vertices @ matrix[0:3, 0:3].T + matrix[0:3, 3])
+            result.tex_vertices.extend(source.tex_vertices)
+
+            # Mirroring transformations change the winding order
+            is_mirrored = np.linalg.det(matrix[0:3, 0:3]) < 0.0
+            for polygon in source.geo_polygons:
+                polygon = [offset + index for index in polygon]
+                result.geo_polygons.append(polygon[::-1] if is_mirrored else polygon)
+            for polygon in source.tex_polygons:
+                polygon = [tex_offset + index for index in polygon]
+                result.tex_polygons.append(polygon[::-1] if is_mirrored else polygon)
+
+        result.appearance().material = material
+        result.appearance().solid = appearance.solid
+        merged.append(result)
+    return merged
+
+def merge_models(models, exclusions):
+    exclusion_re = re.compile(exclusions, re.S) if exclusions is not None else None
+    merged = []
+    for group in models:
+        if exclusion_re is not None and exclusion_re.search(group[1]) is not None:
+            merged.append(group)
+        else:
+            merged.append((merge_meshes(group[0], group[1]), group[1]))
+    return merged
+
+def detach_meshes(meshes):
+    # Meshes and their geometry sources are copied, geometry lists are replaced by later passes
+    sources = {}
+    detached = []
+    for mesh in meshes:
+        entry = copy.copy(mesh)
+        if mesh.parent is not None:
+            if id(mesh.parent) not in sources:
+                sources[id(mesh.parent)] = copy.copy(mesh.parent)
+            entry.parent = sources[id(mesh.parent)]
+        detached.append(entry)
+    return detached
+
+def decimate_models(models, budget, error, is_debug=False):
+    decimated = []
+    for group in models:
+        meshes = detach_meshes(group[0])
+
+        # Triangle budget of the part is distributed between geometry sources proportionally,
+        # each instance of a source is taken into account
+        sources, uses = {}, {}
+        for mesh in meshes:
+            source = mesh.parent if mesh.parent is not None else mesh
+            sources[id(source)] = source
+            uses[id(source)] = uses.get(id(source), 0) + 1
+        counts = {key: sum(len(polygon) - 2 for polygon in source.geo_polygons)
+                  for key, source in sources.items()}
+        total = sum(counts[key] * uses[key] for key in sources)
+
+        for key, source in sources.items():
+            if source.tex_polygons:
+                if is_debug:
+                    print(f'Model {group[1]}: textured mesh {source.ident} was not decimated')
+                continue
+
+            limit = None
+            if budget is not None:
+                limit = max(int(budget * counts[key] / total), 1) if total > 0 else counts[key]
+            primitives.decimate_mesh(source, limit, error)
+        decimated.append((meshes, group[1]))
+    return decimated
+
+def quantize_models(models, step):
+    # Each geometry source is quantized once in its own coordinate space, so that instances
+    # and geometry shared between parts stay shared, merged meshes are already in world space
+    sources = {}
+    quantized = []
+    for group in models:
+        meshes = []
+        for mesh in group[0]:
+            entry = copy.copy(mesh)
+            if mesh.parent is not None:
+                if id(mesh.parent) not in sources:
+                    sources[id(mesh.parent)] = primitives.quantize_mesh(copy.copy(mesh.parent),
+                                                                        step)
+                entry.parent = sources[id(mesh.parent)]
+            else:
+                primitives.quantize_mesh(entry, step)
+            meshes.append(entry)
+        quantized.append((meshes, group[1]))
+    return quantized
+
+def process_models(models, options):
+    if options.budget is not None or options.error is not None:
+        models = decimate_models(models, options.budget, options.error, options.debug)
+    if options.merge:
+        models = merge_models(models, options.exclusions)
+    if options.quantum is not None:
+        models = quantize_models(models, primitives.hmils(options.quantum))
+    return models
+
+def make_lod_library(library, lod):
+    # Levels of detail are written into subdirectories of the library
+    if lod is None:
+        return library
+    return os.path.join(library, lod) if library is not None else lod
+
 def render_models(models, is_fast, is_simple, is_debug):
     if not models:
         print('Empty set of models')
@@ -142,7 +395,130 @@ def render_models(models, is_fast, is_simple, is_debug):
     render = render_ogl41.Render(helper_objects + export_list, effects)
     render.run()
 
-def write_models(models, library, output, is_vrml, is_debug=False):
+def update_digest(digest, value):
+    # Values are tagged with their types, so that different structures produce different digests
+    if isinstance(value, np.ndarray) and value.dtype.kind in 'biuf':
+        digest.update(f'a{value.shape}'.encode('utf-8'))
+        digest.update(np.round(value.astype(float), 6).tobytes())
+    elif isinstance(value, (list, tuple, np.ndarray)):
+        digest.update(f'l{len(value)}'.encode('utf-8'))
+        for entry in value:
+            update_digest(digest, entry)
+    elif isinstance(value, dict):
+        digest.update(f'd{len(value)}'.encode('utf-8'))
+        for key in sorted(value, key=str):
+            update_digest(digest, str(key))
+            update_digest(digest, value[key])
+    elif hasattr(value, '__dict__') and not callable(value):
+        digest.update(f'o{type(value).__name__}'.encode('utf-8'))
+        update_digest(digest, vars(value))
+    else:
+        digest.update(f'v{value!r}'.encode('utf-8'))
+
+def calc_geometry_digest(mesh):
+    source = mesh.parent if mesh.parent is not None else mesh
+    digest = hashlib.sha1()
+
+    digest.update(np.round(np.asarray(source.geo_vertices, dtype=float), 6).tobytes())
+    for polygon in source.geo_polygons:
+        digest.update(np.asarray([len(polygon), *polygon], dtype=np.int64).tobytes())
+
+    # Texture coordinates and complete material definitions, including textures, are compared
+    update_digest(digest, np.asarray(source.tex_vertices, dtype=float))
+    for polygon in source.tex_polygons:
+        digest.update(np.asarray([len(polygon), *polygon], dtype=np.int64).tobytes())
+    update_digest(digest, source.appearance().material)
+    return digest.hexdigest()[:16]
+
+def calc_mesh_matrix(mesh):
+    matrix = np.identity(4)
+    if mesh.transform is not None:
+        matrix = mesh.transform.matrix
+    if mesh.parent is not None and mesh.parent.transform is not None:
+        matrix = np.matmul(matrix, mesh.parent.transform.matrix)
+    return matrix
+
+def decompose_matrix(matrix):
+    # Only translation, rotation and scale are supported, None is returned otherwise
+    translation = matrix[0:3, 3]
+    scale = np.linalg.norm(matrix[0:3, 0:3], axis=0)
+    if np.any(np.isclose(scale, 0.0)):
+        return None
+    rotation = matrix[0:3, 0:3] / scale
+    if np.linalg.det(rotation) < 0.0 or not np.allclose(rotation.T @ rotation, np.identity(3)):
+        return None
+
+    # Angle is calculated from both sine and cosine to keep precision near half turn
+    vector = np.array([
+        rotation[2, 1] - rotation[1, 2],
+        rotation[0, 2] - rotation[2, 0],
+        rotation[1, 0] - rotation[0, 1]])
+    angle = math.atan2(np.linalg.norm(vector) / 2.0, (np.trace(rotation) - 1.0) / 2.0)
+    if math.isclose(angle, 0.0, abs_tol=1e-9):
+        axis = np.array([0.0, 0.0, 1.0])
+    elif math.isclose(angle, math.pi, abs_tol=1e-6):
+        # Axis is parallel to the columns of R + I for half-turn rotations
+        symmetric = rotation + np.identity(3)
+        major = np.argmax(np.linalg.norm(symmetric, axis=0))
+        axis = symmetric[:, major] / np.linalg.norm(symmetric[:, major])
+    else:
+        axis = vector / np.linalg.norm(vector)
+    return (translation, np.array([*axis, angle]), scale)
+
+def format_vector(values):
+    return ' '.join(f'{value:.6g}' for value in values)
+
+def make_x3d_reference(parent, name, transform):
+    translation, rotation, scale = transform
+    node = ElementTree.SubElement(parent, 'Transform', translation=format_vector(translation),
+                                  rotation=format_vector(rotation), scale=format_vector(scale))
+    ElementTree.SubElement(node, 'Inline', url=f'"shared/{name}.x3d"')
+    return node
+
+def make_vrml_reference(name, transform):
+    translation, rotation, scale = transform
+    return (f'Transform {{\n  translation {format_vector(translation)}\n'
+            f'  rotation {format_vector(rotation)}\n  scale {format_vector(scale)}\n'
+            f'  children [ Inline {{ url "shared/{name}.wrl" }} ]\n}}\n')
+
+def write_shared_resource(mesh, path, is_vrml):
+    # Geometry is stored without transformation of the original mesh
+    source = copy.copy(mesh.parent if mesh.parent is not None else mesh)
+    source.transform = model.Transform()
+
+    if is_vrml:
+        vrml_export_kicad.store([source], path)
+    else:
+        x3d_export.store([source], path)
+
+def write_shared_part(meshes, references, path, is_vrml):
+    if is_vrml:
+        # Inline nodes are placed after the embedded meshes, no declarations are needed
+        if meshes:
+            vrml_export_kicad.store(meshes, path)
+        else:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('#VRML V2.0 utf8\n')
+        with open(path, 'a', encoding='utf-8') as file:
+            for reference in references:
+                file.write(make_vrml_reference(*reference))
+    else:
+        if meshes:
+            x3d_export.store(meshes, path)
+            tree = ElementTree.parse(path)
+        else:
+            root = ElementTree.Element('X3D', version='3.0', profile='Immersive')
+            ElementTree.SubElement(root, 'Scene')
+            tree = ElementTree.ElementTree(root)
+
+        scene = tree.getroot().find('Scene')
+        if scene is None:
+            raise ValueError()
+        for reference in references:
+            make_x3d_reference(scene, *reference)
+        tree.write(path, encoding='UTF-8', xml_declaration=True)
+
+def write_models(models, library, output, is_vrml, is_debug=False, is_shared=False):
     if library is not None:
         library_path = os.path.join(output, library)
     else:
@@ -155,17 +531,67 @@ def write_models(models, library, output, is_vrml, is_debug=False):
 
     extension = '.wrl' if is_vrml else '.x3d'
     export_func = vrml_export_kicad.store if is_vrml else x3d_export.store
+
+    if not is_shared:
+        for group in models:
+            export_func(group[0], os.path.join(library_path, group[1] + extension))
+            if is_debug:
+                print(f'Model {group[1]}:{extension} was exported')
+        return
+
+    # Geometry used by several parts is written once and referenced from part files
+    digests, usage = [], {}
     for group in models:
-        export_func(group[0], os.path.join(library_path, group[1] + extension))
+        group_digests = [calc_geometry_digest(mesh) for mesh in group[0]]
+        for digest in set(group_digests):
+            usage[digest] = usage.get(digest, 0) + 1
+        digests.append(group_digests)
+
+    shared_path = os.path.join(library_path, 'shared')
+    written = set()
+    for group, group_digests in zip(models, digests):
+        meshes, references = [], []
+        for mesh, digest in zip(group[0], group_digests):
+            transform = decompose_matrix(calc_mesh_matrix(mesh)) if usage[digest] > 1 else None
+            if transform is None:
+                # Fall back to embedded geometry
+                meshes.append(mesh)
+                continue
+
+            if digest not in written:
+                os.makedirs(shared_path, exist_ok=True)
+                write_shared_resource(mesh, os.path.join(shared_path, digest + extension),
+                                      is_vrml)
+                written.add(digest)
+            references.append((digest, transform))
+
+        part_path = os.path.join(library_path, group[1] + extension)
+        if references:
+            write_shared_part(meshes, references, part_path, is_vrml)
+        else:
+            export_func(meshes, part_path)
         if is_debug:
             print(f'Model {group[1]}:{extension} was exported')
 
 def main(options):
     config = json.load(open(options.config, 'rb'))
-    models = load_models(config, options.files, options.pattern)
+    primitives.PATTERNS.enabled = not options.isolated
+    lods = options.lods.split(',') if options.lods is not None else None
+    if lods is None:
+        batches = {None: load_models(config, options.files, options.pattern)}
+    else:
+        batches = load_models(config, options.files, options.pattern, lods)
+
+    for lod, models in batches.items():
+        models = process_models(models, options)
+        batches[lod] = models
+
+        if options.output != '':
+            write_models(models, make_lod_library(options.library, lod), options.output,
+                         options.vrml, options.debug, options.shared)
 
-    if options.output != '':
-        write_models(models, options.library, options.output, options.vrml, options.debug)
+    # Only the first level of detail is rendered
+    models = next(iter(batches.values()))
 
     if options.normals or options.smooth:
         for group in models:
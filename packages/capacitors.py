@@ -10,7 +10,6 @@ import numpy as np
 
 import primitives
 from wrlconv import curves
-from wrlconv import geometry
 from wrlconv import model
 
 
@@ -39,42 +38,27 @@ class RadialCapacitor:
         depth = section_width / 4.0
         first_circle_radius = section_width / 4.0 / math.sin(2.0 * math.pi / float(2 * sections))
         second_circle_radius = section_width / 2.0 / math.sin(2.0 * math.pi / float(2 * sections))
-        first_circle_points, second_circle_points = [], []
-        outer_points = []
-        body_points = []
 
-        for i in range(sections):
-            direction = 2.0 * math.pi / float(sections) * float(i)
-            vector = np.array([math.cos(direction), math.sin(direction), 0.0])
-            first_circle_points.append(center + vector * first_circle_radius
-                + np.array([0.0, 0.0, -depth]))
-            second_circle_points.append(center + vector * second_circle_radius)
-
-            direction = 2.0 * math.pi / float(sections) * (float(i) + 0.5)
-            vector = np.array([
-                math.cos(direction),
-                math.sin(direction),
-                0.0])
-            normal = np.array([
-                math.cos(direction + math.pi / 2.0),
-                math.sin(direction + math.pi / 2.0),
-                0.0])
-            points = [
-                center + vector * cap_radius + normal * section_width / 2.0,
-                center + vector * cap_radius + normal * section_width / 4.0
-                    + np.array([0.0, 0.0, -depth]),
-                center + vector * cap_radius - normal * section_width / 4.0
-                    + np.array([0.0, 0.0, -depth]),
-                center + vector * cap_radius - normal * section_width / 2.0]
-            outer_points.append(points)
-            points = [
-                center + vector * body_radius + normal * section_width / 2.0,
-                center + vector * body_radius + normal * section_width / 4.0
-                    + np.array([0.0, 0.0, -depth]),
-                center + vector * body_radius - normal * section_width / 4.0
-                    + np.array([0.0, 0.0, -depth]),
-                center + vector * body_radius - normal * section_width / 2.0]
-            body_points.append(points)
+        # Directions to section centers and normals of section sides
+        unit_points = primitives.make_circle_table(sections)
+        half_step = math.pi / float(sections)
+        middle_points = primitives.make_circle_table(
+            sections, (half_step, half_step + 2.0 * math.pi))[:-1]
+        middle_normals = middle_points[:, [1, 0, 2]] * np.array([-1.0, 1.0, 0.0])
+
+        depth_offset = np.array([0.0, 0.0, -depth])
+        first_circle_points = list(center + unit_points * first_circle_radius + depth_offset)
+        second_circle_points = list(center + unit_points * second_circle_radius)
+
+        section_offsets = np.stack((
+            middle_normals * section_width / 2.0,
+            middle_normals * section_width / 4.0 + depth_offset,
+            -middle_normals * section_width / 4.0 + depth_offset,
+            -middle_normals * section_width / 2.0), axis=1)
+        outer_points = [list(points) for points
+                        in (center + middle_points * cap_radius)[:, None, :] + section_offsets]
+        body_points = [list(points) for points
+                       in (center + middle_points * body_radius)[:, None, :] + section_offsets]
 
         edge_points = []
         for i in range(sections):
@@ -83,12 +67,7 @@ class RadialCapacitor:
             inner = (angle(inner_range[0]), angle(inner_range[1]))
             outer = (angle(outer_range[0]), angle(outer_range[1]))
 
-            normal_angles = (
-                2.0 * math.pi / float(sections) * (float(i) + 0.5) + math.pi / 2.0,
-                2.0 * math.pi / float(sections) * (float(i) - 0.5) + math.pi / 2.0)
-            normals = (
-                np.array([math.cos(normal_angles[0]), math.sin(normal_angles[0]), 0.0]),
-                np.array([math.cos(normal_angles[1]), math.sin(normal_angles[1]), 0.0]))
+            normals = (middle_normals[i], middle_normals[i - 1])
 
             points = [v for v in vertices if belongs(angle(v), inner[0], inner[1])]
 
@@ -295,7 +274,7 @@ class RadialCapacitor:
     @staticmethod
     def build_capacitor_body(curve, edges, polarized, materials, name, cap_sections,
                              cap_inner_radius, cap_outer_radius, cap_section_width, _):
-        slices = curves.rotate(curve=curve, axis=np.array([0.0, 0.0, 1.0]), edges=edges)
+        slices = primitives.make_lathe(primitives.make_lathe_profile(curve), edges)
         meshes = []
 
         bottom_cap = primitives.make_rotation_cap_mesh(slices=slices, inversion=True)
@@ -318,18 +297,18 @@ class RadialCapacitor:
         meshes.append(top_cap)
 
         if polarized:
-            body = geometry.build_rotation_mesh(slices=slices[1:], wrap=False, invert=True)
+            body = primitives.make_lathe_mesh(grid=slices[1:], wrap=False, inversion=True)
             body.appearance().material = RadialCapacitor.mat(materials, 'Body')
             body.ident = name + 'Body'
             meshes.append(body)
 
-            mark = geometry.build_rotation_mesh(slices=[slices[-1]] + slices[:2], wrap=False,
-                                                invert=True)
+            mark = primitives.make_lathe_mesh(grid=np.concatenate((slices[-1:], slices[:2])),
+                                              wrap=False, inversion=True)
             mark.appearance().material = RadialCapacitor.mat(materials, 'Mark')
             mark.ident = name + 'Mark'
             meshes.append(mark)
         else:
-            body = geometry.build_rotation_mesh(slices=slices, wrap=True, invert=True)
+            body = primitives.make_lathe_mesh(grid=slices, wrap=True, inversion=True)
             body.appearance().material = RadialCapacitor.mat(materials, 'Body')
             body.ident = name + 'Body'
             meshes.append(body)
@@ -338,9 +317,9 @@ class RadialCapacitor:
 
     @staticmethod
     def build_capacitor_pin(curve, edges):
-        slices = curves.rotate(curve=curve, axis=(0.0, 0.0, 1.0), edges=edges)
+        slices = primitives.make_lathe(primitives.make_lathe_profile(curve), edges)
 
-        pin = geometry.build_rotation_mesh(slices=slices, wrap=True, invert=True)
+        pin = primitives.make_lathe_mesh(grid=slices, wrap=True, inversion=True)
         pin.append(primitives.make_rotation_cap_mesh(slices=slices, inversion=True))
         pin.optimize()
 
@@ -14,6 +14,7 @@ import primitives
 from wrlconv import curves
 from wrlconv import geometry
 from wrlconv import model
+from packages import generic
 
 
 class ChipBase:
@@ -68,6 +69,14 @@ class ChipBase:
             meshes[1].appearance().material = materials[f'{self.material}.Lead']
         return meshes
 
+    def generate_batch(self, materials, resolutions, templates, descriptors):
+        return generic.generate_grouped(self, materials, resolutions, templates, descriptors,
+                                        ChipBase.make_geometry_key)
+
+    @staticmethod
+    def make_geometry_key(descriptor):
+        return [descriptor['body']['size'], descriptor['pins']['width']]
+
 
 class ChipLED:
     CHIP_CHAMFER = primitives.hmils(0.005)
@@ -1176,7 +1185,7 @@ class ChipResistor:
         mean /= len(mesh.geo_vertices)
 
         vertices = dict(zip(list(range(len(mesh.geo_vertices))), mesh.geo_vertices))
-        indices = [x[0] for x in primitives.sort_vertices_by_angle(vertices, mean, normal)]
+        indices = primitives.argsort_vertices_by_angle(mesh.geo_vertices, mean, normal).tolist()
         count = len(vertices)
 
         if pull is not None:
@@ -1616,6 +1625,10 @@ class ChipResistor:
 
         return meshes
 
+    def generate_batch(self, materials, resolutions, templates, descriptors):
+        return generic.generate_grouped(self, materials, resolutions, templates, descriptors,
+                                        ChipBase.make_geometry_key)
+
 
 class ChipShunt:
     DEFAULT_CHAMFER = primitives.hmils(0.1)
@@ -5,15 +5,108 @@
 # Copyright (C) 2018 xent
 # Project is distributed under the terms of the GNU General Public License v3.0
 
+import bisect
+import copy
+import json
 import re
 import numpy as np
 
+
+class TemplateIndex:
+    # Names without special characters of regular expressions are searched in sorted keys
+    PATTERN_SYMBOLS = re.compile(r'[\\^$.|?*+()\[\]{}]')
+
+    def __init__(self, meshes):
+        self.meshes = list(meshes)
+        self.positions = {id(mesh): i for i, mesh in enumerate(self.meshes)}
+        self.names = {}
+        for mesh in self.meshes:
+            if mesh.ident is not None:
+                self.names.setdefault(mesh.ident, []).append(mesh)
+        self.keys = sorted(self.names.keys())
+        self.matches = {}
+
+    def __getitem__(self, key):
+        return self.meshes[key]
+
+    def __iter__(self):
+        return iter(self.meshes)
+
+    def __len__(self):
+        return len(self.meshes)
+
+    def find_prefix(self, prefix):
+        found = []
+        for i in range(bisect.bisect_left(self.keys, prefix), len(self.keys)):
+            if not self.keys[i].startswith(prefix):
+                break
+            found.extend(self.names[self.keys[i]])
+        return sorted(found, key=lambda mesh: self.positions[id(mesh)])
+
+    def search(self, pattern):
+        # Results of regular expression queries are cached per pattern
+        if pattern not in self.matches:
+            expression = re.compile(pattern, re.S)
+            self.matches[pattern] = [mesh for mesh in self.meshes
+                                     if mesh.ident is not None
+                                     and expression.search(mesh.ident) is not None]
+        return list(self.matches[pattern])
+
+    def find(self, pattern):
+        found = self.search(pattern)
+        if not found:
+            raise KeyError()
+        return found[0]
+
+    def lookup(self, pattern):
+        if TemplateIndex.PATTERN_SYMBOLS.search(pattern) is None:
+            return self.find_prefix(pattern)
+        return self.search('^' + pattern)
+
+
+def make_template_index(meshes):
+    if isinstance(meshes, TemplateIndex):
+        return meshes
+    return TemplateIndex(meshes if meshes is not None else [])
+
+
+def make_template_copy(template, material=None):
+    # Copy shares geometry with the template but has its own appearance
+    mesh = copy.copy(template)
+    mesh.visual_appearance = copy.copy(template.appearance())
+    if material is not None:
+        mesh.visual_appearance.material = material
+    return mesh
+
+
 def lookup(mesh_list, mesh_name):
-    found = []
-    for entry in mesh_list:
-        if re.search('^{:s}'.format(mesh_name), entry.ident, re.S) is not None:
-            found.append(entry)
-    return found
+    return make_template_index(mesh_list).lookup(mesh_name)
+
+
+def generate_batch(package, materials, resolutions, templates, descriptors):
+    # Packages without batch support are generated part by part
+    if hasattr(package, 'generate_batch'):
+        return package.generate_batch(materials, resolutions, templates, descriptors)
+    return [package.generate(materials, resolutions, templates, descriptor)
+            for descriptor in descriptors]
+
+
+def generate_grouped(package, materials, resolutions, templates, descriptors, key):
+    # Parts with equal keys are generated once, other parts of the group get deep copies.
+    # Grouping only saves repeated generation, each part still owns its meshes.
+    groups, results = {}, []
+    for descriptor in descriptors:
+        entry = json.dumps(key(descriptor), sort_keys=True)
+        if entry not in groups:
+            groups[entry] = package.generate(materials, resolutions, templates, descriptor)
+            results.append(list(groups[entry]))
+        else:
+            # Materials and templates are shared by all parts
+            memo = {id(value): value for value in materials.values()}
+            if templates is not None:
+                memo.update({id(value): value for value in templates})
+            results.append(copy.deepcopy(groups[entry], memo))
+    return results
 
 
 class GenericModelFilter:
@@ -46,8 +139,11 @@ class GenericModelFilter:
 
                 pivot = coord_min + (coord_max - coord_min) * np.array([0.5, 0.5, 0.0])
 
-            # Move all objects in horizontal plane to the center of the scene
+            # Move all objects in horizontal plane to the center of the scene,
+            # templates are shared between parts and should stay unchanged
+            meshes = [copy.copy(mesh) for mesh in meshes]
             for mesh in meshes:
+                mesh.transform = copy.deepcopy(mesh.transform)
                 mesh.transform.translate(-pivot)
 
         return meshes
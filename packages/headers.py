@@ -7,54 +7,63 @@
 
 import copy
 import math
-import re
 
 import primitives
 from wrlconv import model
+from packages import generic
 
 def lookup(mesh_list, mesh_name):
-    for entry in mesh_list:
-        if re.search(mesh_name, entry.ident, re.S) is not None:
-            return entry
-    raise KeyError()
+    # Names are regular expressions searched anywhere in template names
+    return generic.make_template_index(mesh_list).find(mesh_name)
 
 
 class PinHeader:
     def __init__(self, material='PinHeader'):
         self.material = material
 
+    @staticmethod
+    def make_segment_matrix(template, angle, offset):
+        if template.transform is not None:
+            transform = copy.deepcopy(template.transform)
+        else:
+            transform = model.Transform()
+        if angle is not None:
+            transform.rotate([0.0, 0.0, 1.0], angle)
+        transform.translate(offset)
+        return transform.matrix
+
     def generate_header_body(self, materials, model_body, model_edge, model_pin, body_transform,
                              count, pitch, name):
         shift = pitch / 2.0 if count[1] > 1 else 0.0
 
-        body = model.Mesh(name='{:s}_{:d}Body'.format(name, count[0] * count[1]))
-        body.visual_appearance = model_body.appearance()
+        # Materials are assigned to copies, templates are shared by all parts
+        lead = generic.make_template_copy(model_pin, materials.get(f'{self.material}.Lead'))
 
+        instances = []
         pins = []
         for i in range(count[0]):
             if i == 0:
-                segment = copy.deepcopy(model_edge)
-                segment.rotate([0.0, 0.0, 1.0], math.pi)
+                template, angle = model_edge, math.pi
             elif i == count[0] - 1:
-                segment = copy.deepcopy(model_edge)
-                segment.rotate([0.0, 0.0, 1.0], 0.0)
+                template, angle = model_edge, 0.0
             else:
-                segment = copy.deepcopy(model_body)
-            segment.translate([float(i) * pitch, shift, 0.0])
-            body.append(segment)
+                template, angle = model_body, None
+            segment = PinHeader.make_segment_matrix(template, angle,
+                                                    [float(i) * pitch, shift, 0.0])
+            instances.append((template, segment))
 
-            pin = model.Mesh(parent=model_pin, name='{:s}_{:d}Pin{:d}'.format(name,
+            pin = model.Mesh(parent=lead, name='{:s}_{:d}Pin{:d}'.format(name,
                 count[0] * count[1], (i + 1)))
             pin.translate([float(i) * pitch, shift, 0.001])
-            if f'{self.material}.Lead' in materials:
-                pin.appearance().material = materials[f'{self.material}.Lead']
             pins.append(pin)
 
+        body = primitives.make_instanced_mesh(instances,
+            name='{:s}_{:d}Body'.format(name, count[0] * count[1]))
+        body.visual_appearance = copy.copy(model_body.appearance())
         body.transform = copy.deepcopy(body_transform)
         body.translate([0.0, 0.0, 0.001])
-        body.optimize()
         if f'{self.material}.Plastic' in materials:
-            body.appearance().material = materials[f'{self.material}.Plastic']
+            body.visual_appearance.material = materials[f'{self.material}.Plastic']
 
         return [body] + pins
 
@@ -101,13 +110,13 @@ class Jumper(PinHeader):
         pitch254 = math.isclose(descriptor['pins']['pitch'], 2.54, rel_tol=0.001)
 
         if pitch200:
-            body = lookup(templates, 'PatPLS2Jumper').parent
+            template = lookup(templates, 'PatPLS2Jumper').parent
         elif pitch254:
-            body = lookup(templates, 'PatPLSJumper').parent
+            template = lookup(templates, 'PatPLSJumper').parent
         else:
             raise ValueError()
 
-        return objects + [body]
+        return objects + [generic.make_template_copy(template)]
 
 
 class AngularPinHeader(PinHeader):
@@ -168,13 +177,13 @@ class BoxHeader:
         if 'BoxHeader.Plastic' in materials:
             body.appearance().material = materials['BoxHeader.Plastic']
 
+        lead = generic.make_template_copy(model_pin, materials.get('BoxHeader.Lead'))
+
         pins = []
         for i in range(count[0]):
-            pin = model.Mesh(parent=model_pin, name='{:s}_{:d}Pin{:d}'.format(name,
+            pin = model.Mesh(parent=lead, name='{:s}_{:d}Pin{:d}'.format(name,
                 count[0] * count[1], (i + 1)))
             pin.translate([float(i) * pitch, pitch / 2.0, 0.001])
-            if 'BoxHeader.Lead' in materials:
-                pin.appearance().material = materials['BoxHeader.Lead']
             pins.append(pin)
 
         return [body] + pins
@@ -11,7 +11,6 @@ import numpy as np
 
 import primitives
 from wrlconv import curves
-from wrlconv import geometry
 from wrlconv import model
 
 
@@ -423,18 +422,13 @@ class ChipOpenDrumInductor:
 
         # Wire winding
 
-        winding_current_angle = beg_angle
-        winding_current_v = winding_offset_v
-        winding_points = []
-        for _ in range(winding_steps):
-            position = np.array([
-                math.cos(winding_current_angle) * (winding_radius + wire_radius),
-                math.sin(winding_current_angle) * (winding_radius + wire_radius),
-                winding_current_v
-            ])
-            winding_current_angle += winding_step_ang
-            winding_current_v += winding_step_v
-            winding_points.append(position)
+        winding_steps_range = np.arange(winding_steps)
+        winding_angles = beg_angle + winding_steps_range * winding_step_ang
+        winding_points = np.stack((
+            np.cos(winding_angles) * (winding_radius + wire_radius),
+            np.sin(winding_angles) * (winding_radius + wire_radius),
+            winding_offset_v + winding_steps_range * winding_step_v
+        ), axis=1)
 
         # Bottom end of wire to the contact
 
@@ -470,16 +464,13 @@ class ChipOpenDrumInductor:
 
         # Full wire path
 
-        path_points = curves.connect_paths(beg_points, winding_points, end_points)
+        path_points = curves.connect_paths(beg_points, list(winding_points), end_points)
         path_points[0] = np.array([*path_points[0][:2], path_points[1][2]])
         path_points[-1] = np.array([*path_points[-1][:2], path_points[-2][2]])
 
         shape_points = primitives.make_circle_outline(np.zeros(3), wire_radius,
                                                       wire_segments)
-        shape_points.reverse()
-        shape_points.append(shape_points[0])
-
-        return curves.loft(path=path_points, shape=shape_points)
+        return primitives.make_tube(path=path_points, shape=shape_points)
 
     def generate(self, materials, resolutions, _, descriptor):
         body_size = primitives.hmils(np.array(descriptor['body']['size']))
@@ -513,7 +504,7 @@ class ChipOpenDrumInductor:
         right_contact.rotate(np.array([0.0, 0.0, 1.0]), math.pi)
         right_contact.rename()
 
-        wire = self.make_inductor_wire(
+        wire_mesh = self.make_inductor_wire(
             body_radius=body_radius,
             body_height=body_size[2],
             disc_thickness=disc_thickness,
@@ -527,7 +518,6 @@ class ChipOpenDrumInductor:
             circle_segments=resolutions['circle'],
             wire_segments=resolutions['wire']
         )
-        wire_mesh = geometry.build_loft_mesh(wire, False, False)
         wire_mesh.appearance().material = materials['Inductor.Copper']
         wire_mesh.optimize()
 
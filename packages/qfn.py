@@ -95,8 +95,10 @@ class QFN:
             ( body_region_corner[0],  body_region_corner[1],           0.0)
         )
         body_vertices = mesh.find_vertices([body_region])
-        body_indices = primitives.sort_vertices_by_angle(body_vertices, center, normal)
-        body_slice = [mesh.geo_vertices[number] for number, _ in body_indices]
+        body_keys = list(body_vertices.keys())
+        body_order = primitives.argsort_vertices_by_angle(list(body_vertices.values()), center,
+                                                          normal)
+        body_slice = [mesh.geo_vertices[body_keys[i]] for i in body_order]
 
         return primitives.slice_connect_nearest([body_slice, [center]], True)
 
@@ -111,8 +113,10 @@ class QFN:
             ( body_region_corner[0],  body_region_corner[1],           0.0)
         )
         body_vertices = mesh.find_vertices([body_region])
-        body_indices = primitives.sort_vertices_by_angle(body_vertices, center, normal)
-        body_slice = [mesh.geo_vertices[number] for number, _ in body_indices]
+        body_keys = list(body_vertices.keys())
+        body_order = primitives.argsort_vertices_by_angle(list(body_vertices.values()), center,
+                                                          normal)
+        body_slice = [mesh.geo_vertices[body_keys[i]] for i in body_order]
 
         # Make heatsink mesh
         heatsink_top_corner = heatsink_size / 2.0
@@ -133,8 +137,9 @@ class QFN:
             ( heatsink_region_corner[0],  heatsink_region_corner[1],           0.0)
         )
         heatsink_vertices = heatsink_part.find_vertices([heatsink_region], include=False)
-        heatsink_indices = primitives.sort_vertices_by_angle(heatsink_vertices, center, normal)
-        heatsink_slice = [heatsink_vertices[number] for number, _ in heatsink_indices]
+        heatsink_points = list(heatsink_vertices.values())
+        heatsink_order = primitives.argsort_vertices_by_angle(heatsink_points, center, normal)
+        heatsink_slice = [heatsink_points[i] for i in heatsink_order]
 
         # Make connection between body and heatsink
         body_part = primitives.slice_connect_nearest([body_slice, heatsink_slice], True)
@@ -89,7 +89,8 @@ class QFP:
         dot_mesh.translate(np.array([0.0, 0.0, body_size[2] / 2.0 + QFP.BODY_OFFSET_Z]))
         dot_mesh.rename('Dot')
 
-        pin_mesh = primitives.make_pin_mesh(
+        pin_mesh = primitives.PATTERNS.make(
+            'QFP', materials.get('QFP.Lead'), primitives.make_pin_mesh,
             pin_shape_size=pin_shape,
             pin_height=pin_height + pin_shape[1] * math.cos(body_slope) / 2.0,
             pin_length=primitives.hmils(descriptor['pins']['length']) + pin_offset,
@@ -99,8 +100,6 @@ class QFP:
             line_resolution=resolutions['line'],
             slope_resolution=resolutions['edge']
         )
-        if 'QFP.Lead' in materials:
-            pin_mesh.appearance().material = materials['QFP.Lead']
 
         pins = QFP.generate_package_pins(
             pattern=pin_mesh,
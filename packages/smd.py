@@ -251,9 +251,11 @@ class DPAK:
         pin_groups = set(pin_entries.values())
         pin_group_meshes = {}
 
+        material = materials.get('DPAK.Lead')
         for group in pin_groups:
             if group.flat:
-                mesh = primitives.make_pin_stub(
+                mesh = primitives.PATTERNS.make(
+                    'DPAK', material, primitives.make_pin_stub,
                     pin_shape_size=group.shape,
                     pin_length=group.length,
                     pin_offset=pin_height + group.vertical_offset,
@@ -262,7 +264,8 @@ class DPAK:
                     line_resolution=resolutions['line']
                 )
             else:
-                mesh = primitives.make_pin_mesh(
+                mesh = primitives.PATTERNS.make(
+                    'DPAK', material, primitives.make_pin_mesh,
                     pin_shape_size=group.shape,
                     pin_height=pin_height + group.vertical_offset,
                     pin_length=group.length,
@@ -273,8 +276,6 @@ class DPAK:
                     slope_resolution=resolutions['edge']
                 )
 
-            if 'DPAK.Lead' in materials:
-                mesh.appearance().material = materials['DPAK.Lead']
             pin_group_meshes[hash(group)] = mesh
 
         return DPAK.generate_pin_rows(
@@ -539,9 +540,11 @@ class SOT:
         pin_groups = set(pin_entries.values())
         pin_group_meshes = {}
 
+        material = materials.get(f'{self.material}.Lead')
         for group in pin_groups:
             if is_pin_flat:
-                mesh = primitives.make_flat_pin_mesh(
+                mesh = primitives.PATTERNS.make(
+                    'SOT', material, primitives.make_flat_pin_mesh,
                     pin_shape_size=group.shape,
                     pin_height=pin_height - group.vertical_offset,
                     pin_length=group.length,
@@ -551,7 +554,8 @@ class SOT:
                     slope_resolution=resolutions['edge']
                 )
             else:
-                mesh = primitives.make_pin_mesh(
+                mesh = primitives.PATTERNS.make(
+                    'SOT', material, primitives.make_pin_mesh,
                     pin_shape_size=group.shape,
                     pin_height=pin_height + group.vertical_offset,
                     pin_length=group.length,
@@ -562,9 +566,6 @@ class SOT:
                     slope_resolution=resolutions['edge']
                 )
 
-            if f'{self.material}.Lead' in materials:
-                mesh.appearance().material = materials[f'{self.material}.Lead']
-
             pin_group_meshes[hash(group)] = mesh
 
         return SOT.generate_pin_rows(
@@ -79,7 +79,8 @@ class SOP:
             body_mesh = box_meshes
             heatsink_mesh = None
 
-        pin_mesh = primitives.make_pin_mesh(
+        pin_mesh = primitives.PATTERNS.make(
+            'SOP', materials.get('SOP.Lead'), primitives.make_pin_mesh,
             pin_shape_size=pin_shape,
             pin_height=pin_height + pin_shape[1] * math.cos(body_slope) / 2.0,
             pin_length=primitives.hmils(descriptor['pins']['length']) + pin_offset,
@@ -89,8 +90,6 @@ class SOP:
             line_resolution=resolutions['line'],
             slope_resolution=resolutions['edge']
         )
-        if 'SOP.Lead' in materials:
-            pin_mesh.appearance().material = materials['SOP.Lead']
 
         pins = SOP.generate_package_pins(
             pattern=pin_mesh,
@@ -6,6 +6,8 @@
 # Project is distributed under the terms of the GNU General Public License v3.0
 
 import copy
+import heapq
+import itertools
 import math
 import numpy as np
 
@@ -34,6 +36,45 @@ def round2f(value):
     return f'{value:.2f}'
 
 
+def freeze_arguments(arguments):
+    output = []
+    for key, value in sorted(arguments.items()):
+        if isinstance(value, np.ndarray):
+            value = (value.shape, tuple(value.ravel().tolist()))
+        elif isinstance(value, list):
+            value = tuple(value)
+        output.append((key, value))
+    return tuple(output)
+
+
+class PatternRegistry:
+    # Meshes shared between parts of a whole build, e.g. pins of the same shape
+    def __init__(self):
+        self.enabled = False
+        self.patterns = {}
+
+    def clear(self):
+        self.patterns = {}
+
+    def make(self, family, material, builder, **kwargs):
+        key = (family, id(material), builder.__name__, freeze_arguments(kwargs))
+        if self.enabled and key in self.patterns:
+            return self.patterns[key]
+
+        mesh = builder(**kwargs)
+        if material is not None:
+            mesh.appearance().material = material
+        if self.enabled:
+            self.patterns[key] = mesh
+        return mesh
+
+    def shared(self):
+        return list(self.patterns.values())
+
+
+PATTERNS = PatternRegistry()
+
+
 class AsymmetricBezierQuad(curves.BezierQuad):
     def __init__(self, a, b, c, d, resolution, inversion=False): # pylint: disable=invalid-name
         self.swap = False
@@ -176,11 +217,13 @@ class CircularBezierQuad(curves.BezierQuad):
         mesh.geo_vertices.extend(vertices)
         mesh.geo_vertices.append(mean)
         mean_index = len(mesh.geo_vertices) - 1
-        for i in range(mean_index):
-            if self.inversion:
-                mesh.geo_polygons.append([i, mean_index, (i + 1) % mean_index])
-            else:
-                mesh.geo_polygons.append([(i + 1) % mean_index, mean_index, i])
+        indices = np.arange(mean_index)
+        means = np.full(mean_index, mean_index)
+        if self.inversion:
+            polygons = np.stack((indices, means, np.roll(indices, -1)), axis=1)
+        else:
+            polygons = np.stack((np.roll(indices, -1), means, indices), axis=1)
+        mesh.geo_polygons.extend(polygons.tolist())
         return mesh
 
 
@@ -206,38 +249,49 @@ def circular_face_functor(points, controls, resolution, inversion):
     return [patch]
 
 
-def make_circle_outline(center, radius, edges):
-    vertices = []
-    angle, delta = 0.0, math.pi * 2.0 / edges
+CIRCLE_TABLES = {}
 
-    for _ in range(edges):
-        # pylint: disable=invalid-name
-        x = radius * math.cos(angle)
-        y = radius * math.sin(angle)
-        # pylint: enable=invalid-name
+def make_circle_table(segments, angles=None):
+    # Unit circle without the closing point or an arc including both end points
+    key = (segments, angles)
+    if key not in CIRCLE_TABLES:
+        if angles is None:
+            angle, delta, count = 0.0, math.pi * 2.0 / segments, segments
+        else:
+            angle, delta, count = angles[0], (angles[1] - angles[0]) / segments, segments + 1
 
-        vertices.append(center + np.array([x, y, 0.0]))
-        angle += delta
+        table = np.zeros((count, 3))
+        for i in range(count):
+            table[i, 0:2] = math.cos(angle), math.sin(angle)
+            angle += delta
+        table.flags.writeable = False
+        CIRCLE_TABLES[key] = table
+    return CIRCLE_TABLES[key]
 
-    return vertices
 
+def make_circle_outline(center, radius, edges):
+    return list(center + make_circle_table(edges) * radius)
 
-def sort_vertices_by_angle(vertices, mean, normal, direction=None):
-    keys = list(vertices.keys())
 
+def calc_vertex_angles(points, mean, normal, direction=None):
+    vectors = np.asarray(points, dtype=float) - mean
     if direction is None:
-        direction = vertices[next(iter(vertices))] - mean
+        direction = vectors[0]
+
+    products = np.cross(direction, vectors)
+    angles = np.arctan2(np.linalg.norm(products, axis=1), vectors @ direction)
+    # Vectors on the negative side of the direction have negative angles
+    return np.where(products @ normal < 0.0, -angles, angles)
 
-    angles = []
-    for key in keys:
-        vector = vertices[key] - mean
-        angle = model.angle(direction, vector)
-        if np.linalg.det(np.array([direction, vector, normal])) < 0.0:
-            angle = -angle
-        angles.append((key, angle))
-    angles.sort(key=lambda pair: pair[1])
 
-    return angles
+def argsort_vertices_by_angle(points, mean, normal, direction=None):
+    return np.argsort(calc_vertex_angles(points, mean, normal, direction), kind='stable')
+
+
+def sort_vertices_by_angle(vertices, mean, normal, direction=None):
+    keys = list(vertices.keys())
+    angles = calc_vertex_angles([vertices[key] for key in keys], mean, normal, direction)
+    return [(keys[i], angles[i]) for i in np.argsort(angles, kind='stable')]
 
 
 def make_hollow_plane(points, controls, hollow_offset, hollow_radius,
@@ -328,16 +382,14 @@ def make_rotation_cap_mesh(slices, inversion):
     else:
         vertices = [slices[i][-1] for i in range(len(slices))]
 
-    indices = range(len(slices))
+    indices = np.arange(len(slices))
+    centers = np.full(len(slices), len(slices))
     geo_vertices = vertices + [sum(vertices) / len(slices)]
-    geo_polygons = []
 
     if not inversion:
-        for i, value in enumerate(indices):
-            geo_polygons.append([len(vertices), value, indices[i - 1]])
+        geo_polygons = np.stack((centers, indices, np.roll(indices, 1)), axis=1).tolist()
     else:
-        for i, value in enumerate(indices):
-            geo_polygons.append([indices[i - 1], value, len(vertices)])
+        geo_polygons = np.stack((np.roll(indices, 1), indices, centers), axis=1).tolist()
 
     # Generate object
     mesh = model.Mesh()
@@ -346,6 +398,442 @@ def make_rotation_cap_mesh(slices, inversion):
     return mesh
 
 
+def make_lathe_profile(curve):
+    points = []
+    for segment in curve:
+        points.extend(segment.tessellate())
+    points = np.array(points)
+
+    # Remove duplicated points at segment joints
+    unique = np.ones(len(points), dtype=bool)
+    unique[1:] = np.any(~np.isclose(points[1:], points[:-1]), axis=1)
+    return points[unique][:, [0, 2]]
+
+
+def make_lathe(profile, edges, sweep=None):
+    # Profile is an array of radius and height pairs, result is an array of slices
+    profile = np.asarray(profile, dtype=float)
+    table = make_circle_table(edges, sweep)
+
+    # Same direction of rotation as in curves.rotate
+    grid = np.empty((len(table), len(profile), 3))
+    grid[:, :, 0] = np.outer(table[:, 0], profile[:, 0])
+    grid[:, :, 1] = np.outer(-table[:, 1], profile[:, 0])
+    grid[:, :, 2] = profile[:, 1]
+    return grid
+
+
+def make_lathe_mesh(grid, wrap, inversion):
+    count, length = grid.shape[0:2]
+
+    current = np.arange(count if wrap else count - 1)
+    following = (current + 1) % count
+    columns = np.arange(length - 1)
+    a_start = current[:, None] * length + columns[None, :]
+    b_start = following[:, None] * length + columns[None, :]
+    quads = np.stack((b_start, a_start, a_start + 1, b_start + 1), axis=2).reshape(-1, 4)
+
+    # Points on the axis of rotation are shared between all slices
+    axial = np.all(np.isclose(grid[0, :, 0:2], 0.0), axis=1)
+    skipped = np.zeros((length - 1, 4), dtype=bool)
+    skipped[:, 1] = axial[:-1]
+    skipped[:, 2] = axial[1:]
+    skipped = np.tile(skipped, (len(current), 1))
+
+    geo_polygons = quads.tolist()
+    for i in np.flatnonzero(np.any(skipped, axis=1)):
+        geo_polygons[i] = [index for index, skip in zip(geo_polygons[i], skipped[i]) if not skip]
+    if not inversion:
+        geo_polygons = [polygon[::-1] for polygon in geo_polygons]
+
+    # Generate object
+    mesh = model.Mesh()
+    mesh.geo_vertices = list(grid.reshape(-1, 3))
+    mesh.geo_polygons = geo_polygons
+    return mesh
+
+
+def make_tube(path, shape, inversion=False):
+    # Closed cross-section in XY plane is swept along an (N,3) path
+    path = np.asarray(path, dtype=float)
+    shape = np.asarray(shape, dtype=float)
+
+    # Repeated points produce zero-length tangents and are removed
+    path = path[np.concatenate(([True], np.any(path[1:] != path[:-1], axis=1)))]
+    if len(path) < 2:
+        raise ValueError()
+    count, length = len(path), len(shape)
+
+    tangents = np.gradient(path, axis=0)
+    tangent_lengths = np.linalg.norm(tangents, axis=1)
+    if np.any(tangent_lengths == 0.0):
+        # Path turns back on itself
+        raise ValueError()
+    tangents /= tangent_lengths[:, None]
+
+    # Rotations between neighboring tangents for parallel transport of the frame
+    axes = np.cross(tangents[:-1], tangents[1:])
+    cosines = np.einsum('ij,ij->i', tangents[:-1], tangents[1:])
+
+    basis = np.eye(3)[np.argmin(np.abs(tangents[0]))]
+    normals = np.empty((count, 3))
+    normals[0] = basis - tangents[0] * np.dot(basis, tangents[0])
+    for i in range(1, count):
+        axis, normal = axes[i - 1], normals[i - 1]
+        normals[i] = (normal * cosines[i - 1] + np.cross(axis, normal)
+                      + axis * np.dot(axis, normal) / (1.0 + cosines[i - 1]))
+    normals -= tangents * np.einsum('ij,ij->i', normals, tangents)[:, None]
+    normals /= np.linalg.norm(normals, axis=1)[:, None]
+    binormals = np.cross(tangents, normals)
+
+    rings = (path[:, None, :]
+             + shape[None, :, 0, None] * normals[:, None, :]
+             + shape[None, :, 1, None] * binormals[:, None, :])
+
+    a_start = np.arange(count - 1)[:, None] * length + np.arange(length)[None, :]
+    a_end = np.arange(count - 1)[:, None] * length + (np.arange(length)[None, :] + 1) % length
+    quads = np.stack((a_start, a_end, a_end + length, a_start + length), axis=2).reshape(-1, 4)
+    if inversion:
+        quads = quads[:, ::-1]
+
+    # Generate object
+    mesh = model.Mesh()
+    mesh.geo_vertices = list(rings.reshape(-1, 3))
+    mesh.geo_polygons = quads.tolist()
+    return mesh
+
+
+def weld_vertices(vertices, epsilon=1e-6):
+    # Returns the index of the lowest coincident vertex for each vertex
+    count = len(vertices)
+    labels = np.arange(count)
+    if count < 2:
+        return labels
+
+    # Neighbors along each axis are neighbors along a skewed direction
+    weights = np.array([1.0, 0.6180339887, 0.3819660113])
+    projections = vertices @ weights
+    order = np.argsort(projections, kind='stable')
+    projections = projections[order]
+    ends = np.searchsorted(projections, projections + epsilon * np.sum(weights), side='right')
+    spans = ends - np.arange(count) - 1
+    first = np.repeat(np.arange(count), spans)
+    second = first + 1 + np.arange(len(first)) - np.repeat(np.cumsum(spans) - spans, spans)
+    first, second = order[first], order[second]
+    close = np.all(np.abs(vertices[first] - vertices[second]) <= epsilon, axis=1)
+    first, second = first[close], second[close]
+
+    # Propagate the lowest index through groups of coincident vertices
+    while True:
+        lowest = np.minimum(labels[first], labels[second])
+        updated = labels.copy()
+        np.minimum.at(updated, first, lowest)
+        np.minimum.at(updated, second, lowest)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def make_instanced_mesh(instances, epsilon=1e-6, name=None):
+    # Instances are pairs of template meshes and transformation matrices
+    groups = {}
+    for i, (template, _) in enumerate(instances):
+        groups.setdefault(id(template), (template, []))[1].append(i)
+
+    textured = [bool(template.tex_polygons) for template, _ in groups.values()]
+    if any(textured) and not all(textured):
+        raise ValueError()
+
+    blocks = [None] * len(instances)
+    indices = [None] * len(instances)
+    lengths = [None] * len(instances)
+    tex_blocks = [None] * len(instances)
+    tex_indices = [None] * len(instances)
+    for template, numbers in groups.values():
+        points = np.asarray(template.geo_vertices, dtype=float)
+        matrices = np.array([instances[i][1] for i in numbers])
+        transformed = (np.einsum('kij,nj->kni', matrices[:, 0:3, 0:3], points)
+                       + matrices[:, None, 0:3, 3])
+        polygons = template.geo_polygons
+        template_lengths = np.array([len(polygon) for polygon in polygons])
+        template_indices = np.concatenate([np.asarray(polygon) for polygon in polygons])
+        if template.tex_polygons:
+            template_tex = np.asarray(template.tex_vertices, dtype=float)
+            template_tex_indices = np.concatenate([np.asarray(polygon)
+                                                   for polygon in template.tex_polygons])
+        else:
+            template_tex, template_tex_indices = None, None
+        for i, block in zip(numbers, transformed):
+            blocks[i] = block
+            indices[i] = template_indices
+            lengths[i] = template_lengths
+            tex_blocks[i] = template_tex
+            tex_indices[i] = template_tex_indices
+
+    sizes = np.array([len(block) for block in blocks])
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    vertices = np.concatenate(blocks)
+    indices = np.concatenate([entry + offset for entry, offset in zip(indices, offsets)])
+    lengths = np.concatenate(lengths)
+    bounds = np.concatenate(([0], np.cumsum(lengths))).tolist()
+
+    # Merge coincident vertices of neighboring instances
+    used, remap = np.unique(weld_vertices(vertices, epsilon), return_inverse=True)
+    indices = remap.reshape(-1)[indices].tolist()
+
+    # Generate object
+    mesh = model.Mesh(name=name)
+    mesh.geo_vertices = list(vertices[used])
+    mesh.geo_polygons = [indices[bounds[i]:bounds[i + 1]] for i in range(len(lengths))]
+
+    if all(textured):
+        # Texture coordinates are not merged
+        tex_sizes = np.array([len(block) for block in tex_blocks])
+        tex_offsets = np.concatenate(([0], np.cumsum(tex_sizes)[:-1]))
+        tex_indices = np.concatenate([entry + offset
+                                      for entry, offset in zip(tex_indices, tex_offsets)]).tolist()
+        mesh.tex_vertices = list(np.concatenate(tex_blocks))
+        mesh.tex_polygons = [tex_indices[bounds[i]:bounds[i + 1]] for i in range(len(lengths))]
+    return mesh
+
+
+def calc_vertex_quadrics(vertices, triangles):
+    # Sum of squared distances to the planes of adjacent triangles
+    normals = np.cross(vertices[triangles[:, 1]] - vertices[triangles[:, 0]],
+                       vertices[triangles[:, 2]] - vertices[triangles[:, 0]])
+    lengths = np.linalg.norm(normals, axis=1)
+    normals = np.divide(normals, lengths[:, None], out=np.zeros_like(normals),
+                        where=lengths[:, None] > 0.0)
+    planes = np.hstack((normals, -np.sum(normals * vertices[triangles[:, 0]], axis=1)[:, None]))
+    planes = np.einsum('ni,nj->nij', planes, planes)
+
+    quadrics = np.zeros((len(vertices), 4, 4))
+    for i in range(3):
+        np.add.at(quadrics, triangles[:, i], planes)
+    return quadrics
+
+
+def find_locked_vertices(vertices, triangles, crease):
+    # Vertices on open boundaries, non-manifold and sharp edges are kept in place
+    normals = np.cross(vertices[triangles[:, 1]] - vertices[triangles[:, 0]],
+                       vertices[triangles[:, 2]] - vertices[triangles[:, 0]])
+    lengths = np.linalg.norm(normals, axis=1)
+    normals = np.divide(normals, lengths[:, None], out=np.zeros_like(normals),
+                        where=lengths[:, None] > 0.0)
+
+    edges = np.concatenate((triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]))
+    owners = np.tile(np.arange(len(triangles)), 3)
+    edges = np.sort(edges, axis=1)
+    order = np.lexsort((edges[:, 1], edges[:, 0]))
+    edges, owners = edges[order], owners[order]
+    _, first, counts = np.unique(edges, axis=0, return_index=True, return_counts=True)
+
+    locked = np.zeros(len(vertices), dtype=bool)
+    sharp = counts != 2
+    manifold = np.flatnonzero(counts == 2)
+    cosines = np.sum(normals[owners[first[manifold]]] * normals[owners[first[manifold] + 1]],
+                     axis=1)
+    sharp[manifold] = cosines < math.cos(crease)
+    locked[edges[first[sharp]].reshape(-1)] = True
+    return locked
+
+
+def decimate_triangles(vertices, triangles, budget=None, error=None,
+                       crease=math.radians(30.0)):
+    # Quadric error edge collapse, stops at a triangle budget or at an error bound
+    if budget is None and error is None:
+        raise ValueError()
+
+    vertices = np.array(vertices, dtype=float)
+    triangles = np.array(triangles, dtype=int).reshape(-1, 3)
+    quadrics = calc_vertex_quadrics(vertices, triangles)
+    locked = find_locked_vertices(vertices, triangles, crease)
+    versions = np.zeros(len(vertices), dtype=int)
+    alive = np.ones(len(triangles), dtype=bool)
+    count = len(triangles)
+
+    faces = [set() for _ in range(len(vertices))]
+    for i, triangle in enumerate(triangles.tolist()):
+        for vertex in triangle:
+            faces[vertex].add(i)
+
+    def neighbors(vertex):
+        return {entry for face in faces[vertex] for entry in triangles[face]} - {vertex}
+
+    def calc_collapse(first, second):
+        if locked[first] and locked[second]:
+            return None
+        if locked[first]:
+            candidates = [vertices[first]]
+        elif locked[second]:
+            candidates = [vertices[second]]
+        else:
+            candidates = [vertices[first], vertices[second],
+                          (vertices[first] + vertices[second]) / 2.0]
+        quadric = quadrics[first] + quadrics[second]
+        costs = [np.append(point, 1.0) @ quadric @ np.append(point, 1.0) for point in candidates]
+        best = int(np.argmin(costs))
+        return max(costs[best], 0.0), candidates[best]
+
+    heap, order = [], itertools.count()
+    def push_edge(first, second):
+        collapse = calc_collapse(first, second)
+        if collapse is not None:
+            heapq.heappush(heap, (collapse[0], next(order), first, second,
+                                  versions[first], versions[second], collapse[1]))
+
+    edges = np.sort(np.concatenate((triangles[:, [0, 1]], triangles[:, [1, 2]],
+                                    triangles[:, [2, 0]])), axis=1)
+    for first, second in np.unique(edges, axis=0).tolist():
+        push_edge(first, second)
+
+    while heap and (budget is None or count > budget):
+        cost, _, first, second, first_version, second_version, point = heapq.heappop(heap)
+        if versions[first] != first_version or versions[second] != second_version:
+            continue
+        if error is not None and cost > error * error:
+            break
+
+        shared = faces[first] & faces[second]
+        # Link condition keeps the surface manifold
+        if len(neighbors(first) & neighbors(second)) != len(shared):
+            continue
+
+        # Reject collapses that flip adjacent triangles
+        flipped = False
+        for face in (faces[first] | faces[second]) - shared:
+            corners = vertices[triangles[face]]
+            moved = corners.copy()
+            moved[(triangles[face] == first) | (triangles[face] == second)] = point
+            before = np.cross(corners[1] - corners[0], corners[2] - corners[0])
+            after = np.cross(moved[1] - moved[0], moved[2] - moved[0])
+            if np.dot(before, after) <= 0.0 and np.dot(before, before) > 0.0:
+                flipped = True
+                break
+        if flipped:
+            continue
+
+        for face in shared:
+            alive[face] = False
+            for vertex in triangles[face]:
+                faces[vertex].discard(face)
+        for face in faces[second]:
+            triangles[face][triangles[face] == second] = first
+        faces[first] |= faces[second]
+        faces[second] = set()
+        count -= len(shared)
+
+        vertices[first] = point
+        quadrics[first] += quadrics[second]
+        locked[first] = locked[first] or locked[second]
+        versions[first] += 1
+        versions[second] += 1
+        for vertex in neighbors(first):
+            push_edge(*sorted((first, vertex)))
+
+    # Remove unused vertices
+    triangles = triangles[alive]
+    used, remap = np.unique(triangles, return_inverse=True)
+    return vertices[used], remap.reshape(-1, 3)
+
+
+def triangulate_polygon(vertices, polygon, epsilon=1e-9):
+    # Convex polygons are split into triangle fans, concave polygons are clipped ear by ear
+    fan = [[polygon[0], polygon[i], polygon[i + 1]] for i in range(1, len(polygon) - 1)]
+    if len(polygon) <= 3:
+        return fan
+
+    points = np.asarray([vertices[index] for index in polygon], dtype=float)
+    normal = np.sum(np.cross(points, np.roll(points, -1, axis=0)), axis=0)
+    length = np.linalg.norm(normal)
+    if length == 0.0:
+        return fan
+
+    # Project points onto the polygon plane keeping counterclockwise order
+    normal /= length
+    tangent = np.cross(normal, [1.0, 0.0, 0.0] if abs(normal[0]) < 0.9 else [0.0, 1.0, 0.0])
+    tangent /= np.linalg.norm(tangent)
+    plane = np.stack((points @ tangent, points @ np.cross(normal, tangent)), axis=1)
+
+    def area(a, b, c):
+        return ((plane[b][0] - plane[a][0]) * (plane[c][1] - plane[a][1])
+                - (plane[b][1] - plane[a][1]) * (plane[c][0] - plane[a][0]))
+
+    count = len(polygon)
+    if all(area((i - 1) % count, i, (i + 1) % count) >= -epsilon for i in range(count)):
+        return fan
+
+    triangles = []
+    remaining = list(range(count))
+    while len(remaining) > 3:
+        for i in range(len(remaining)):
+            a, b, c = remaining[i - 1], remaining[i], remaining[(i + 1) % len(remaining)]
+            if area(a, b, c) <= epsilon:
+                continue
+            # Vertices lying on the borders of the ear also block it
+            if any(min(area(a, b, j), area(b, c, j), area(c, a, j)) >= -epsilon
+                   for j in remaining if j not in (a, b, c)):
+                continue
+            triangles.append([polygon[a], polygon[b], polygon[c]])
+            del remaining[i]
+            break
+        else:
+            # Self-intersecting remainder is split into a fan
+            break
+    triangles.extend([[polygon[remaining[0]], polygon[remaining[i]], polygon[remaining[i + 1]]]
+                      for i in range(1, len(remaining) - 1)])
+    return triangles
+
+
+def decimate_mesh(mesh, budget=None, error=None, crease=math.radians(30.0)):
+    # Texture coordinates are not decimated, textured meshes are left unchanged
+    if mesh.tex_polygons:
+        return mesh
+
+    triangles = [triangle for polygon in mesh.geo_polygons
+                 for triangle in triangulate_polygon(mesh.geo_vertices, polygon)]
+    if not triangles or (error is None and len(triangles) <= budget):
+        return mesh
+
+    vertices, triangles = decimate_triangles(mesh.geo_vertices, triangles, budget, error, crease)
+    if len(triangles) < sum(len(polygon) - 2 for polygon in mesh.geo_polygons):
+        mesh.geo_vertices = list(vertices)
+        mesh.geo_polygons = triangles.tolist()
+    return mesh
+
+
+def quantize_mesh(mesh, step):
+    # Snap vertices to a grid in the coordinate space of the mesh and merge vertices which become
+    # coincident, normals are calculated by exporters and are not stored in meshes
+    if not mesh.geo_vertices:
+        return mesh
+
+    vertices = np.round(np.asarray(mesh.geo_vertices, dtype=float) / step)
+    _, first, inverse = np.unique(vertices, axis=0, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    ranks = np.empty_like(order)
+    ranks[order] = np.arange(len(order))
+    remap = ranks[inverse.reshape(-1)].tolist()
+
+    textured = bool(mesh.tex_polygons)
+    polygons, tex_polygons = [], []
+    for number, polygon in enumerate(mesh.geo_polygons):
+        indices = [remap[index] for index in polygon]
+        kept = [i for i, index in enumerate(indices) if index != indices[i - 1]]
+        # Skip polygons collapsed into points or lines
+        if len(kept) >= 3:
+            polygons.append([indices[i] for i in kept])
+            if textured:
+                tex_polygons.append([mesh.tex_polygons[number][i] for i in kept])
+
+    mesh.geo_vertices = list(vertices[first[order]] * step)
+    mesh.geo_polygons = polygons
+    if textured:
+        mesh.tex_polygons = tex_polygons
+    return mesh
+
+
 def make_box_with_mark(size, chamfer, edge_resolution, line_resolution, plane_resolution=None,
                        band_size=None, band_offset=0.0, border_size=None,
                        mark_radius=None, mark_offset=np.zeros(3), mark_resolution=24):
@@ -882,3 +882,15 @@ class TestBezierHelpers:
         assert path is None
         path = bezier.find_shortest_path(graph, 0, 9)
         assert path is None
+
+    def test_shared_topology(self, tmp_path):
+        faces = [[0, 1, 2, 3], [0, 3, 4, 5], [0, 5, 6, 1], [0, 7, 8, 1]]
+
+        topology_a = bezier.make_topology([], faces)
+        topology_b = bezier.make_topology([], [list(face) for face in faces])
+        assert topology_a is topology_b
+        assert topology_a.graph == bezier.make_graph(sorted(bezier.unpack_faces(faces)))
+
+        sequence = topology_a.get_joint_sequence(0)
+        assert sorted(sequence) == sorted(topology_a.graph[0])
+        assert topology_b.get_joint_sequence(0) is sequence
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_build_lib.py
+# Copyright (C) 2026 xent
+# Project is distributed under the terms of the GNU General Public License v3.0
+
+import os
+
+import build_lib
+import exporter
+import fp
+import mod
+from wrlconv import model
+
+class TestBuildLib:
+    DESC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'descriptions/connectors/pin_headers.json')
+
+    class Part:
+        def generate(self, materials, resolutions, templates, descriptor):
+            return [model.Mesh(name=descriptor['title'])]
+
+    def test_model_names(self):
+        footprints = [
+            exporter.Footprint('QFN-16-EP', None, model='QFN-16'),
+            exporter.Footprint('QFN-16-NoEP', None, model='QFN-16'),
+            exporter.Footprint('SOIC-8', None)
+        ]
+        names = fp.make_model_names(footprints)
+        assert names == {'QFN-16-EP': 'QFN-16', 'QFN-16-NoEP': 'QFN-16', 'SOIC-8': 'SOIC-8'}
+
+        # Models are named after footprint references and each name is used once
+        config = {'materials': {}, 'resolutions': {}, 'specs': {}}
+        parts = [{'title': title, 'package': {'type': 'Part'}}
+                 for title in ('QFN-16-EP', 'QFN-16-NoEP', 'SOIC-8', 'Unused')]
+        models = mod.load_description_models(config, [TestBuildLib.Part], {'parts': parts}, '',
+                                             parts, None, names)
+        assert [group[1] for group in models[None]] == ['QFN-16', 'SOIC-8', 'Unused']
+        assert models[None][0][0][0].ident == 'QFN-16-EP'
+
+        # Parts without footprints keep their titles
+        models = mod.load_description_models(config, [TestBuildLib.Part], {'parts': parts}, '',
+                                             parts)
+        assert [group[1] for group in models[None]] == [part['title'] for part in parts]
+
+    def test_build_library(self, tmp_path):
+        options = build_lib.parse_args(['-o', str(tmp_path), '-l', 'headers', '-f', '^PLS-4$',
+                                        '-e', '0', '--vrml', '--lod', 'low,high',
+                                        TestBuildLib.DESC_PATH])
+        build_lib.main(options)
+
+        with open(tmp_path / 'headers.pretty' / 'PLS-4.kicad_mod', 'rb') as file:
+            footprint = file.read().decode('utf-8')
+        assert '(model "headers/PLS-4.wrl"' in footprint
+        assert os.path.isfile(tmp_path / 'headers' / 'low' / 'PLS-4.wrl')
+        assert os.path.isfile(tmp_path / 'headers' / 'high' / 'PLS-4.wrl')
+        assert not os.path.exists(tmp_path / 'headers' / 'PLS-5.wrl')
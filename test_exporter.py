@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_exporter.py
+# Copyright (C) 2026 xent
+# Project is distributed under the terms of the GNU General Public License v3.0
+
+import io
+import json
+import os
+import sys
+import numpy as np
+
+import archive_parts
+
+import exporter
+import exporter_kicad
+import exporter_kicad_pretty
+import exporter_kicad_pretty_v2
+import fp
+
+DESC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'descriptions')
+
+def load_footprints(path, pattern=None):
+    specs = fp.load_specs(None)
+    with open(os.path.join(DESC_DIR, path), 'rb') as file:
+        parts = json.load(file)['parts']
+    generator = fp.Generator()
+    return generator.load_footprints(specs, parts, pattern)
+
+def make_converters():
+    return [
+        exporter_kicad.Converter('lib', model_type='wrl', epoch=0),
+        exporter_kicad_pretty.Converter('lib', 'wrl', 0),
+        exporter_kicad_pretty_v2.Converter('lib', 'wrl')
+    ]
+
+
+class TestEpoch:
+    def test_make_epoch(self):
+        assert exporter.make_epoch(None) is None
+        assert exporter.make_epoch('') is None
+        assert exporter.make_epoch(' \n') is None
+        assert exporter.make_epoch('digest') == exporter.EPOCH_DIGEST
+        assert exporter.make_epoch(' 1700000000 ') == 1700000000
+        assert exporter.make_epoch(0) == 0
+
+        try:
+            exporter.make_epoch('now')
+            result = True
+        except ValueError:
+            result = False
+        assert result is False
+
+    def test_converters(self):
+        # Empty epoch falls back to the wall clock
+        assert exporter_kicad.Converter('lib', epoch='').epoch is None
+        assert exporter_kicad_pretty.Converter('lib', 'wrl', ' ').epoch is None
+
+
+class TestTextWriter:
+    def test_buffer(self):
+        writer = exporter.TextWriter()
+        writer.write('(module')
+        writer.write(')\n')
+        assert writer.getvalue() == '(module)\n'
+
+        writer.clear()
+        writer.write('(pad)')
+        assert writer.getvalue() == '(pad)'
+
+    def test_stream(self):
+        stream = io.StringIO()
+        writer = exporter.TextWriter(stream)
+        writer.write('(module')
+        writer.write(')\n')
+        assert stream.getvalue() == '(module)\n'
+        assert writer.getvalue() == ''
+
+    def test_converters(self):
+        footprints = load_footprints('smd_qfp/smd_qfp.json')[0:3]
+
+        for converter in make_converters():
+            buffer = exporter.TextWriter()
+            for footprint in footprints:
+                stream = io.StringIO()
+                converter.write_footprint(exporter.TextWriter(stream), footprint)
+
+                # Reused buffer and direct stream output are equal to the text output
+                buffer.clear()
+                converter.write_footprint(buffer, footprint)
+                assert stream.getvalue() == converter.footprint_to_text(footprint)
+                assert buffer.getvalue() == stream.getvalue()
+
+
+class TestObjectIndex:
+    def test_buckets(self):
+        objects = [
+            exporter.Line((0.0, 0.0), (1.0, 0.0), 0.1),
+            exporter.SmdPad('1', (0.5, 0.5), (0.0, 0.0)),
+            exporter.HolePad('2', (1.0, 1.0), (2.0, 0.0), 0.5),
+            exporter.Circle((0.0, 0.0), 1.0, 0.1, False),
+            exporter.PadArray(['3', '4'], [(0.5, 0.5)], [(3.0, 0.0), (4.0, 0.0)]),
+            exporter.Line((0.0, 1.0), (1.0, 1.0), 0.1)
+        ]
+        index = exporter.make_object_index(objects)
+
+        assert exporter.make_object_index(index) is index
+        assert len(index) == 7
+        assert index[exporter.Line] == [objects[0], objects[5]]
+        assert index[exporter.Circle] == [objects[3]]
+        assert not index[exporter.Poly]
+        assert [pad.text for pad in index[exporter.AbstractPad]] == ['1', '2', '3', '4']
+
+    def test_footprints(self):
+        # Buckets keep the order of objects filtered by type
+        for footprint in load_footprints('connectors/pin_headers.json')[0:4]:
+            objects = footprint.generate()
+            index = exporter.ObjectIndex(objects)
+            expanded = list(index)
+            for kind in exporter.ObjectIndex.TYPES:
+                assert index[kind] == [obj for obj in expanded if isinstance(obj, kind)]
+
+
+class TestPrimitives:
+    @staticmethod
+    def make_objects():
+        return [
+            exporter.Circle((0.0, 0.0), 1.0, 0.1, False, (0.0, 90.0)),
+            exporter.Label('U1', (0.0, 1.0), 0.1, 1.0),
+            exporter.String('REF', (0.0, 2.0), 0.1, 1.0, 'Reference'),
+            exporter.Line((0.0, 0.0), (1.0, 0.0), 0.1),
+            exporter.Rect((1.0, 1.0), (-1.0, -1.0), 0.1),
+            exporter.HolePad('1', (1.0, 1.0), (2.0, 0.0), 0.5),
+            exporter.SmdPad('2', (0.5, 0.5), (3.0, 0.0)),
+            exporter.Cutout((1.0, 1.0), (0.0, 0.0)),
+            exporter.Poly([(0.0, 0.0), (1.0, 0.0), (0.0, 1.0)], 0.1, True,
+                          exporter.Layer.SILK_FRONT)
+        ]
+
+    def test_slots(self):
+        for obj in TestPrimitives.make_objects() + [exporter.Layer()]:
+            assert not hasattr(obj, '__dict__')
+
+            try:
+                obj.unknown = None
+                result = True
+            except AttributeError:
+                result = False
+            assert result is False
+
+    def test_hash_cache(self):
+        for obj, copy in zip(TestPrimitives.make_objects(), TestPrimitives.make_objects()):
+            # Digest is calculated on the first call and reused afterwards
+            assert not hasattr(obj, 'digest')
+            digest = hash(obj)
+            assert obj.digest == digest == hash(obj.key())
+            assert hash(obj) == digest
+            assert hash(copy) == digest
+
+        line = exporter.Line((0.0, 0.0), (1.0, 0.0), 0.1)
+        assert hash(line) != hash(exporter.Line((0.0, 0.0), (1.0, 0.0), 0.2))
+        assert hash(line) != hash(exporter.Line((0.0, 0.0), (1.0, 0.0), 0.1,
+                                                exporter.Layer.SILK_BACK))
+
+    def test_pad_array_hash(self):
+        array = exporter.PadArray(['1', '2'], [(0.5, 1.0)], [(0.0, 0.0), (1.0, 0.0)], 0.3)
+        pads = [
+            exporter.HolePad('1', (0.5, 1.0), (0.0, 0.0), 0.3),
+            exporter.HolePad('2', (0.5, 1.0), (1.0, 0.0), 0.3)
+        ]
+        assert [hash(pad) for pad in array] == [hash(pad) for pad in pads]
+
+        # Footprint digest does not depend on the way pads were created
+        assert hash(tuple(exporter.ObjectIndex([array]))) == hash(tuple(pads))
+
+
+class TestGenerator:
+    FORMATS = [
+        fp.Generator.FORMAT_LEGACY,
+        fp.Generator.FORMAT_SEXPRESSION_LEGACY,
+        fp.Generator.FORMAT_SEXPRESSION
+    ]
+
+    def test_formats(self, tmp_path):
+        footprints = load_footprints('smd_qfp/smd_qfp.json')[0:2]
+
+        # Each footprint is generated once for all formats
+        calls = []
+        for footprint in footprints:
+            method = footprint.generate
+            footprint.generate = lambda method=method: calls.append(method) or method()
+
+        generator = fp.Generator('lib', str(tmp_path / 'all'), TestGenerator.FORMATS, True, 0)
+        generator.write_footprints(footprints, False)
+        assert len(calls) == len(footprints)
+
+        paths = {
+            fp.Generator.FORMAT_LEGACY: ('lib.obj', '.mod.obj'),
+            fp.Generator.FORMAT_SEXPRESSION_LEGACY: ('legacy/lib.pretty', '.kicad_mod'),
+            fp.Generator.FORMAT_SEXPRESSION: ('lib.pretty', '.kicad_mod')
+        }
+        for entry in TestGenerator.FORMATS:
+            # Output of a single format generator is written to a separate directory
+            single = fp.Generator('lib', str(tmp_path / str(entry)), entry, True, 0)
+            single.write_footprints(footprints, False)
+
+            for footprint in footprints:
+                with open(os.path.join(single.make_library_path(entry),
+                                       footprint.name + paths[entry][1]), 'rb') as file:
+                    expected = file.read()
+                with open(tmp_path / 'all' / paths[entry][0] / (footprint.name + paths[entry][1]),
+                          'rb') as file:
+                    assert file.read() == expected
+
+
+    def test_failed_write(self, tmp_path):
+        footprints = load_footprints('smd_qfp/smd_qfp.json')[0:1]
+        generator = fp.Generator('lib', str(tmp_path), fp.Generator.FORMAT_SEXPRESSION, True, 0)
+        generator.write_footprints(footprints, False)
+        path = tmp_path / 'lib.pretty' / (footprints[0].name + '.kicad_mod')
+        with open(path, 'rb') as file:
+            expected = file.read()
+
+        # Existing footprint is kept when the converter fails in the middle of the output
+        def write_footprint(writer, footprint, objects=None):
+            writer.write('(footprint')
+            raise ValueError()
+
+        generator.converters[fp.Generator.FORMAT_SEXPRESSION].write_footprint = write_footprint
+        try:
+            generator.write_footprints(footprints, False)
+            result = True
+        except ValueError:
+            result = False
+        assert result is False
+        with open(path, 'rb') as file:
+            assert file.read() == expected
+
+class TestPadArray:
+    @staticmethod
+    def to_tuples(pads):
+        return [(pad.text, pad.size, pad.position, pad.diameter, pad.style) for pad in pads]
+
+    def test_pad_row(self):
+        offsets = 1.5 - np.arange(7) * 0.5
+        pads = [exporter.SmdPad(str(i + 1), (0.3, 1.2), (offset, 0.0))
+                for i, offset in enumerate(offsets.tolist())]
+        array = exporter.make_pad_row(offsets, (0.3, 1.2))
+        assert TestPadArray.to_tuples(array) == TestPadArray.to_tuples(pads)
+
+    def test_pad_grid(self):
+        count, pitch, offset = (3, 2), 2.54, -1.27
+        pads = []
+        for x_offset in range(count[0]):
+            for y_offset in range(count[1]):
+                number = 1 + x_offset * count[1] + y_offset
+                style = exporter.AbstractPad.STYLE_RECT if number == 1 \
+                    else exporter.AbstractPad.STYLE_CIRCLE
+                position = np.array([float(x_offset), -float(y_offset)]) * pitch
+                position += np.array([0.0, offset])
+                pads.append(exporter.HolePad(str(number), (1.7, 1.7), position, 1.0, style))
+
+        styles = np.full(count[0] * count[1], exporter.AbstractPad.STYLE_CIRCLE)
+        styles[0:1] = exporter.AbstractPad.STYLE_RECT
+        array = exporter.make_pad_grid(count, pitch, (1.7, 1.7), (0.0, offset), 1.0, styles)
+        assert TestPadArray.to_tuples(array) == TestPadArray.to_tuples(pads)
+
+    def test_pad_perimeter(self):
+        count, pitch, size = (5, 3), 0.65, np.array([0.35, 0.8])
+        first_pin_offset = np.asarray(count, dtype=np.float32) - 1.0
+        first_pin_offset *= pitch / 2.0
+        border = np.array([2.4, 1.9])
+
+        # Per-pad loop with pads sorted by their numbers
+        pads = []
+        for i in range(count[0]):
+            x_offset = i * pitch - first_pin_offset[0]
+            pads.append(exporter.SmdPad(str(1 + i), size, np.array([x_offset, border[1]])))
+            pads.append(exporter.SmdPad(str(1 + i + count[0] + count[1]), size,
+                                        np.array([-x_offset, -border[1]])))
+        for j in range(count[1]):
+            y_offset = j * pitch - first_pin_offset[1]
+            pads.append(exporter.SmdPad(str(1 + j + count[0]), size[::-1],
+                                        np.array([border[0], -y_offset])))
+            pads.append(exporter.SmdPad(str(1 + j + 2 * count[0] + count[1]), size[::-1],
+                                        np.array([-border[0], y_offset])))
+        pads.sort(key=lambda x: int(x.text))
+
+        x_offsets = (np.arange(count[0]) * pitch).astype(np.float32) - first_pin_offset[0]
+        y_offsets = (np.arange(count[1]) * pitch).astype(np.float32) - first_pin_offset[1]
+        array = exporter.make_pad_perimeter(x_offsets, y_offsets, size, size[::-1], border)
+        assert TestPadArray.to_tuples(array) == TestPadArray.to_tuples(pads)
+
+    def test_footprints(self):
+        # Footprints built from pad arrays keep the pad order of the per-pad loops
+        for footprint in load_footprints('smd_qfn/smd_qfn.json'):
+            pads = exporter.ObjectIndex(footprint.generate())[exporter.AbstractPad]
+            numbers = [int(pad.text) for pad in pads]
+            assert numbers == list(range(1, len(numbers) + 1))
+
+
+class TestPadIndex:
+    class ExhaustiveIndex(exporter.PadIndex):
+        def query(self, lower, upper):
+            return self.rects
+
+    @staticmethod
+    def make_pads():
+        return [exporter.SmdPad(str(i + 1), (0.5, 1.0), (2.0 * i, 0.0)) for i in range(8)]
+
+    @staticmethod
+    def to_tuples(lines):
+        return [(round(line.start[0], 6), round(line.start[1], 6),
+                 round(line.end[0], 6), round(line.end[1], 6)) for line in lines]
+
+    def test_query(self):
+        index = exporter.PadIndex(TestPadIndex.make_pads())
+        assert len(index) == 8
+
+        rects = index.query(np.array([1.9, -2.0]), np.array([4.0, -0.5]))
+        assert np.allclose(rects[:, 0], [1.75, 3.75])
+        assert not index.query(np.array([0.3, -2.0]), np.array([1.7, 2.0])).size
+        assert not index.query(np.array([0.0, 0.6]), np.array([14.0, 2.0])).size
+
+        array = exporter.make_pad_row(np.arange(8) * 2.0, (0.5, 1.0))
+        assert np.array_equal(exporter.PadIndex([array]).rects, index.rects)
+
+    def test_collide(self):
+        index = exporter.PadIndex(TestPadIndex.make_pads())
+        line = exporter.Line((-2.0, 0.0), (3.0, 0.0), 0.2)
+
+        result = index.collide(line, 0.2, 0.25)
+        assert TestPadIndex.to_tuples(result) == [
+            (-2.0, 0.0, -0.6, 0.0),
+            (0.6, 0.0, 1.4, 0.0),
+            (2.6, 0.0, 3.0, 0.0)
+        ]
+        assert exporter.collide_line(line, [], 0.2, 0.25) == [line]
+
+    def test_collide_query(self):
+        # Results do not depend on pads pruned by the bounding box query
+        pads = TestPadIndex.make_pads()
+        index = exporter.PadIndex(pads)
+        exhaustive = TestPadIndex.ExhaustiveIndex(pads)
+
+        generator = np.random.default_rng(0)
+        for points in generator.uniform(-2.0, 16.0, (200, 2, 2)):
+            points[:, 1] /= 8.0
+            line = exporter.Line(tuple(points[0]), tuple(points[1]), 0.2)
+            assert TestPadIndex.to_tuples(index.collide(line, 0.2, 0.25)) \
+                == TestPadIndex.to_tuples(exhaustive.collide(line, 0.2, 0.25))
+
+    def test_collide_layer(self):
+        index = exporter.PadIndex(TestPadIndex.make_pads())
+        line = exporter.Line((-2.0, 0.0), (3.0, 0.0), 0.2, exporter.Layer.SILK_BACK)
+        circle = exporter.Circle((1.0, 0.0), 1.0, 0.2, False, None, exporter.Layer.SILK_BACK)
+
+        # Clipped lines and arcs stay on the layer of the source object
+        for obj in index.collide(line, 0.2, 0.25) + index.collide_arc(circle, 0.2, 0.25):
+            assert obj.layer.mask == line.layer.mask
+
+    def test_collide_arc(self):
+        index = exporter.PadIndex(TestPadIndex.make_pads())
+
+        # Arc crossing one pad is split around it
+        arc = exporter.Circle((-1.0, 0.0), 1.0, 0.1, False, (-90.0, 90.0))
+        result = index.collide_arc(arc, 0.1, 0.1)
+        assert len(result) == 2
+        assert result[0].part[0] == -90.0 and result[1].part[1] == 90.0
+        assert result[0].part[1] < result[1].part[0]
+        assert all(np.isclose(obj.radius, 1.0) for obj in result)
+
+        # Closed circle crossing two pads is split into two arcs between them
+        circle = exporter.Circle((1.0, 0.0), 1.0, 0.1, False)
+        result = index.collide_arc(circle, 0.1, 0.1)
+        assert len(result) == 2
+        assert all(obj.part is not None for obj in result)
+        for obj in result:
+            middle = np.deg2rad((obj.part[0] + obj.part[1]) / 2.0)
+            assert np.isclose(abs(np.sin(middle)), 1.0)
+
+        # Circles lying entirely inside or outside pads
+        assert not index.collide_arc(exporter.Circle((0.0, 0.0), 0.2, 0.1, False), 0.1, 0.1)
+        assert not index.collide_arc(exporter.Circle((0.0, 0.0), 0.2, 0.1, False, (0.0, 90.0)),
+                                     0.1, 0.1)
+        circle = exporter.Circle((1.0, 4.0), 1.0, 0.1, False)
+        assert index.collide_arc(circle, 0.1, 0.1) == [circle]
+
+    def test_clip_silkscreen(self):
+        pads = TestPadIndex.make_pads()
+        objects = [
+            exporter.Rect((-1.0, 0.2), (15.0, -0.2), 0.1),
+            exporter.Circle((1.0, 0.0), 1.0, 0.1, True),
+            exporter.Line((-2.0, 0.0), (3.0, 0.0), 0.1, exporter.Layer.CU_FRONT)
+        ]
+        result = exporter.clip_silkscreen(objects, pads, 0.1, 0.1)
+
+        # Filled circles and lines on other layers are not clipped
+        assert result[-2:] == objects[1:]
+        # Vertical edges are kept, horizontal edges are split by eight pads
+        assert len(result[:-2]) == 2 + 9 * 2
+
+
+class TestArchive:
+    @staticmethod
+    def write_parts(path, footprints):
+        converter = exporter_kicad.Converter('lib', model_type='wrl', epoch=0)
+        texts, paths = [], []
+        for footprint in footprints:
+            texts.append(converter.footprint_to_text(footprint))
+            paths.append(str(path / (footprint.name + '.mod.obj')))
+            with open(paths[-1], 'wb') as file:
+                file.write(texts[-1].encode('utf-8'))
+        return texts, paths
+
+    @staticmethod
+    def run(monkeypatch, args):
+        monkeypatch.setattr(sys, 'argv', ['archive_parts.py'] + args)
+        archive_parts.main()
+
+    def test_read_part(self, tmp_path):
+        path = str(tmp_path / 'part.bin')
+        with open(path, 'wb') as file:
+            file.write(bytes(range(16)))
+
+        # File ranges are streamed in blocks of limited size
+        chunks = list(exporter_kicad.Converter.read_part((path, 3, 10), 4))
+        assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+        assert b''.join(chunks) == bytes(range(3, 13))
+        chunks = list(exporter_kicad.Converter.read_part((path, 5, None), 4))
+        assert b''.join(chunks) == bytes(range(5, 16))
+        assert list(exporter_kicad.Converter.read_part('$MODULE')) == [b'$MODULE']
+
+    def test_write_archive(self, tmp_path):
+        footprints = load_footprints('smd_qfp/smd_qfp.json')[0:3]
+        texts, paths = TestArchive.write_parts(tmp_path, footprints)
+
+        # Streamed part files and part texts produce the same library
+        for epoch in (0, exporter.EPOCH_DIGEST):
+            parts = dict(exporter_kicad.Converter.index_part(path) for path in paths)
+            stream = io.BytesIO()
+            exporter_kicad.Converter.write_archive(stream, parts, epoch)
+            assert stream.getvalue() == exporter_kicad.Converter.archive(texts, epoch).encode()
+
+        # Archived parts are found at their original positions
+        library = str(tmp_path / 'lib.mod')
+        with open(library, 'wb') as file:
+            exporter_kicad.Converter.write_archive(file, parts, 0)
+        index = exporter_kicad.Converter.index_archive(library)
+        assert sorted(index.keys()) == sorted(footprint.name for footprint in footprints)
+        for footprint, text in zip(footprints, texts):
+            chunks = exporter_kicad.Converter.read_part(index[footprint.name], 64)
+            assert b''.join(chunks) == text.encode('utf-8')
+
+    def test_update(self, tmp_path, monkeypatch):
+        footprints = load_footprints('smd_qfp/smd_qfp.json')[0:4]
+        _, paths = TestArchive.write_parts(tmp_path, footprints)
+        library = str(tmp_path / 'lib.mod')
+        expected = str(tmp_path / 'expected.mod')
+
+        TestArchive.run(monkeypatch, ['-e', '0', '-l', expected] + paths)
+        with open(expected, 'rb') as file:
+            expected_data = file.read()
+
+        # Updated library is equal to the library built from all parts at once
+        TestArchive.run(monkeypatch, ['-e', '0', '-l', library] + paths[0:2])
+        TestArchive.run(monkeypatch, ['-e', '0', '-u', '-l', library] + paths[2:])
+        with open(library, 'rb') as file:
+            assert file.read() == expected_data
+
+        # Update without changed parts keeps the library unchanged
+        TestArchive.run(monkeypatch, ['-e', '0', '-u', '-l', library])
+        with open(library, 'rb') as file:
+            assert file.read() == expected_data
+        TestArchive.run(monkeypatch, ['-e', '0', '-u', '-l', library, paths[1]])
+        with open(library, 'rb') as file:
+            assert file.read() == expected_data
+        assert not os.path.exists(library + '.tmp')
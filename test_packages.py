@@ -5,12 +5,19 @@
 # Copyright (C) 2026 xent
 # Project is distributed under the terms of the GNU General Public License v3.0
 
+import copy
 import json
 import math
+import os
+import pickle
+import numpy as np
 
 import mod
+import primitives
 from packages import chip
 from packages import crystals
+from packages import generic
+from packages import headers
 from packages import inductors
 from packages import qfn
 from packages import qfp
@@ -18,6 +25,7 @@ from packages import smd
 from packages import sop
 from wrlconv import model
 from wrlconv import x3d_export
+from wrlconv import x3d_import
 
 def compare_models(source_file, destination_data):
     with open('tests/' + source_file, 'rb') as source:
@@ -428,3 +436,392 @@ class TestSOT:
         model.reset_allocator()
         meshes = TestSOT.make_package_strip()
         verify_models(meshes, tmp_path, TestSOT.FILE_PACKAGE_SOT_STRIP)
+
+
+class TestTemplates:
+    @staticmethod
+    def make_templates(names):
+        meshes = []
+        for name in names:
+            mesh = model.Mesh()
+            mesh.ident = name
+            meshes.append(mesh)
+        return meshes
+
+    def test_template_index(self):
+        meshes = TestTemplates.make_templates(['PatPLSBody', 'PatPLS2Body', 'PatPLSBodyEdge',
+                                               'HC49', 'HC49Pin'])
+        templates = generic.TemplateIndex(meshes)
+
+        assert templates.find('PatPLSBody') is meshes[0]
+        assert templates.find('PLS2') is meshes[1]
+        assert generic.lookup(templates, 'HC49') == [meshes[3], meshes[4]]
+        assert generic.lookup(meshes, 'PatPLSB') == [meshes[0], meshes[2]]
+        assert not generic.lookup(templates, 'SMA')
+        assert templates.find('PLS.?Body$') is meshes[0]
+        assert generic.lookup(templates, 'PatPLS(2)?Body') == [meshes[0], meshes[1], meshes[2]]
+
+        try:
+            templates.find('SMA')
+            found = True
+        except KeyError:
+            found = False
+        assert found is False
+
+
+class TestHeaders:
+    TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 'descriptions/connectors/headers.x3d')
+
+    def test_instanced_body(self):
+        templates = generic.TemplateIndex(x3d_import.load(TestHeaders.TEMPLATE_PATH))
+        model_body = templates.find('PatPLSBody').parent
+        model_edge = templates.find('PatPLSEdgeBody').parent
+        count, pitch = 8, 2.54
+
+        # Reference body is assembled from copies and optimized as a whole
+        reference = model.Mesh()
+        instances = []
+        for i in range(count):
+            if i == 0:
+                template, angle = model_edge, math.pi
+            elif i == count - 1:
+                template, angle = model_edge, 0.0
+            else:
+                template, angle = model_body, None
+            segment = copy.deepcopy(template)
+            if angle is not None:
+                segment.rotate([0.0, 0.0, 1.0], angle)
+            segment.translate([float(i) * pitch, 0.0, 0.0])
+            reference.append(segment)
+            instances.append((template, headers.PinHeader.make_segment_matrix(
+                template, angle, [float(i) * pitch, 0.0, 0.0])))
+        reference.optimize()
+
+        body = primitives.make_instanced_mesh(instances)
+        assert len(body.geo_vertices) == len(reference.geo_vertices)
+        assert len(body.geo_polygons) == len(reference.geo_polygons)
+        for polygon, expected in zip(body.geo_polygons, reference.geo_polygons):
+            assert np.allclose([body.geo_vertices[i] for i in polygon],
+                               [reference.geo_vertices[i] for i in expected], atol=1e-6)
+
+    def test_template_materials(self):
+        templates = generic.TemplateIndex(x3d_import.load(TestHeaders.TEMPLATE_PATH))
+        model_pin = templates.find('PatPLSPin').parent
+        default = model_pin.appearance().material
+        descriptor = {'title': 'PLS-4', 'pins': {'columns': 4, 'rows': 1, 'pitch': 2.54}}
+
+        parts = []
+        for name in ['Gold', 'Tin']:
+            materials = {'Jumper.Lead': model.Material(name=name)}
+            parts.append(headers.Jumper().generate(materials, {}, templates, descriptor))
+        assert model_pin.appearance().material is default
+        assert parts[0][1].appearance().material.color.ident == 'Gold'
+        assert parts[1][1].appearance().material.color.ident == 'Tin'
+        assert parts[0][-1] is not parts[1][-1]
+
+
+class TestContexts:
+    def test_resolution_context(self):
+        config = {'resolutions': {'line': 24, 'wire': 16}}
+        first = mod.load_resolutions(config, {'line': 12, 'edge': 3})
+        second = mod.load_resolutions(config, {})
+
+        assert first['line'] == 12 and 'edge' not in first
+        assert second['line'] == 24
+        assert config['resolutions']['line'] == 24
+        assert mod.load_resolutions(config, {'line': 12}) is first
+
+        try:
+            first['line'] = 8
+            mutable = True
+        except TypeError:
+            mutable = False
+        assert mutable is False
+
+    def test_material_context(self):
+        config = {'materials': {
+            'Plastic': {'diffuse': [0.1, 0.1, 0.1]},
+            'Body': 'Plastic'
+        }}
+        materials = mod.load_materials(config)
+        restored = pickle.loads(pickle.dumps(materials))
+
+        assert isinstance(restored, mod.ReadOnlyDict)
+        assert sorted(restored.keys()) == ['Body', 'Plastic']
+        assert restored['Body'] is restored['Plastic']
+        assert restored['Plastic'].color.ident == materials['Plastic'].color.ident
+        assert type(restored['Plastic']) is model.Material
+
+        for context in (materials, restored):
+            for mutate in (lambda: context.update({'Metal': None}),
+                           lambda: context.pop('Body')):
+                try:
+                    mutate()
+                    mutable = True
+                except TypeError:
+                    mutable = False
+                assert mutable is False
+
+        # Overrides of a description create new materials, other entries are shared
+        extended = mod.load_materials(config, {'Plastic': {'diffuse': [0.5, 0.5, 0.5]},
+                                               'Case': 'Body'})
+        assert extended['Plastic'] is not materials['Plastic']
+        assert extended['Body'] is materials['Plastic']
+        assert extended['Case'] is materials['Plastic']
+        assert mod.load_materials(config) is materials
+
+class TestBatch:
+    class Counter:
+        def __init__(self):
+            self.calls = 0
+
+        def generate(self, materials, _1, _2, descriptor):
+            self.calls += 1
+            mesh = model.Mesh()
+            mesh.ident = descriptor['title']
+            mesh.appearance().material = materials.get('Body')
+            return [mesh]
+
+    def test_generate_batch(self):
+        descriptors = [
+            {'title': 'A', 'body': {'size': [1.0, 0.5, 0.5]}},
+            {'title': 'B', 'body': {'size': [2.0, 1.0, 1.0]}},
+            {'title': 'C', 'body': {'size': [1.0, 0.5, 0.5]}}
+        ]
+
+        package = TestBatch.Counter()
+        groups = generic.generate_batch(package, {}, {}, None, descriptors)
+        assert package.calls == 3
+        assert [group[0].ident for group in groups] == ['A', 'B', 'C']
+
+        package = TestBatch.Counter()
+        materials = {'Body': model.Material()}
+        groups = generic.generate_grouped(package, materials, {}, None, descriptors,
+                                          lambda descriptor: descriptor['body']['size'])
+        assert package.calls == 2
+        assert groups[0][0] is not groups[2][0]
+        assert groups[2][0].ident == 'A'
+        assert groups[2][0].appearance().material is materials['Body']
+
+
+class TestLevelsOfDetail:
+    CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+
+    def test_lod_context(self):
+        with open(TestLevelsOfDetail.CONFIG_PATH, 'rb') as file:
+            config = json.load(file)
+        low = mod.load_resolutions(config, {'chamfer': 2}, 'low')
+        default = mod.load_resolutions(config, {})
+
+        assert low['circle'] == config['lods']['low']['circle']
+        assert low['chamfer'] == 2
+        assert default['circle'] == config['resolutions']['circle']
+
+    def test_lod_overrides(self):
+        config = {
+            'resolutions': {'circle': 24, 'edge': 3},
+            'lods': {'low': {'circle': 12, 'edge': 2}, 'high': {'circle': 48, 'edge': 6}}
+        }
+        low = mod.load_resolutions(config, {'circle': 36}, 'low')
+        high = mod.load_resolutions(config, {'circle': 36}, 'high')
+        default = mod.load_resolutions(config, {'circle': 36})
+
+        assert low['circle'] == 18 and low['edge'] == 2
+        assert high['circle'] == 72 and high['edge'] == 6
+        assert default['circle'] == 36 and default['edge'] == 3
+
+
+class TestMerge:
+    @staticmethod
+    def make_triangle(material):
+        mesh = model.Mesh()
+        mesh.geo_vertices = [np.array([0.0, 0.0, 0.0]), np.array([1.0, 0.0, 0.0]),
+                             np.array([0.0, 1.0, 0.0])]
+        mesh.geo_polygons = [[0, 1, 2]]
+        mesh.appearance().material = material
+        return mesh
+
+    def test_merge_meshes(self):
+        lead, plastic = model.Material(), model.Material()
+        lead.color.ident, plastic.color.ident = 'Lead', 'Plastic'
+
+        meshes = [TestMerge.make_triangle(lead) for _ in range(3)]
+        meshes.append(TestMerge.make_triangle(plastic))
+        meshes[1].translate(np.array([2.0, 0.0, 0.0]))
+        meshes[2].rotate(np.array([0.0, 0.0, 1.0]), math.pi)
+
+        merged = mod.merge_meshes(meshes, 'Part')
+        assert [mesh.ident for mesh in merged] == ['PartLead', 'PartPlastic']
+        assert len(merged[0].geo_vertices) == 9
+        assert merged[0].geo_polygons[1] == [3, 4, 5]
+        assert np.allclose(merged[0].geo_vertices[4], [3.0, 0.0, 0.0])
+        assert np.allclose(merged[0].geo_vertices[7], [-1.0, 0.0, 0.0])
+
+        models = mod.merge_models([(meshes, 'Part'), (meshes, 'Named')], 'Named')
+        assert len(models[0][0]) == 2
+        assert models[1][0] is meshes
+
+    def test_merge_textured(self):
+        lead, copied = model.Material(), model.Material()
+        lead.color.ident, copied.color.ident = 'Lead', 'Lead'
+
+        meshes = [TestMerge.make_triangle(lead) for _ in range(3)]
+        meshes.append(TestMerge.make_triangle(copied))
+        for mesh in meshes[1:3]:
+            mesh.tex_vertices = [np.array([0.0, 0.0]), np.array([1.0, 0.0]),
+                                 np.array([0.0, 1.0])]
+            mesh.tex_polygons = [[0, 1, 2]]
+        meshes[2].translate(np.array([0.0, 2.0, 0.0]))
+
+        # Textured meshes keep their mapping, materials with the same name get unique names
+        merged = mod.merge_meshes(meshes, 'Part')
+        assert [mesh.ident for mesh in merged] == ['PartLead', 'PartLead1', 'PartLead2']
+        assert not merged[0].tex_polygons
+        assert len(merged[1].tex_vertices) == 6
+        assert merged[1].tex_polygons == [[0, 1, 2], [3, 4, 5]]
+        assert merged[1].appearance().material is lead
+        assert merged[2].appearance().material is copied
+
+    def test_decimate_models(self):
+        # Closed tessellated sphere
+        rings, segments = 12, 24
+        sphere = model.Mesh(name='Sphere')
+        sphere.geo_vertices = [np.array([0.0, 0.0, 1.0])]
+        for i in range(1, rings):
+            theta = math.pi * i / rings
+            for j in range(segments):
+                phi = 2.0 * math.pi * j / segments
+                sphere.geo_vertices.append(np.array([math.cos(phi) * math.sin(theta),
+                                                     math.sin(phi) * math.sin(theta),
+                                                     math.cos(theta)]))
+        sphere.geo_vertices.append(np.array([0.0, 0.0, -1.0]))
+        last = len(sphere.geo_vertices) - 1
+        for j in range(segments):
+            k = (j + 1) % segments
+            sphere.geo_polygons.append([0, 1 + j, 1 + k])
+            sphere.geo_polygons.append([last, last - segments + k, last - segments + j])
+            for i in range(rings - 2):
+                a, b = 1 + i * segments + j, 1 + i * segments + k
+                sphere.geo_polygons.append([a, a + segments, b + segments, b])
+        count = len(sphere.geo_polygons)
+
+        single = [model.Mesh(parent=sphere)]
+        double = [model.Mesh(parent=sphere), model.Mesh(parent=sphere)]
+        models = mod.decimate_models([(single, 'Single'), (double, 'Double')], 100, None)
+
+        assert len(sphere.geo_polygons) == count
+        assert single[0].parent is sphere
+        assert models[0][0][0].parent is not models[1][0][0].parent
+        assert models[1][0][0].parent is models[1][0][1].parent
+        assert len(models[0][0][0].parent.geo_polygons) <= 100
+        assert len(models[1][0][0].parent.geo_polygons) <= 50
+
+    def test_quantize_models(self):
+        source = TestMerge.make_triangle(None)
+        source.geo_vertices[1] = np.array([1.0004, 0.0, 0.0])
+        first, second = model.Mesh(parent=source), model.Mesh(parent=source)
+        first.translate(np.array([0.0003, 0.0, 0.0]))
+        second.rotate(np.array([0.0, 0.0, 1.0]), 0.5)
+        third = model.Mesh(parent=source)
+        merged = TestMerge.make_triangle(None)
+        merged.geo_vertices[2] = np.array([0.0, 0.9996, 0.0])
+
+        models = mod.quantize_models([([first, second, merged], 'Part'), ([third], 'Other')],
+                                     0.001)
+        meshes = models[0][0] + models[1][0]
+        assert np.allclose(source.geo_vertices[1], [1.0004, 0.0, 0.0])
+        assert np.allclose(merged.geo_vertices[2], [0.0, 0.9996, 0.0])
+
+        # Instances in all parts keep sharing a single quantized source
+        assert meshes[0].parent is meshes[1].parent is meshes[3].parent
+        assert meshes[0].parent is not source
+        assert meshes[0].transform is first.transform
+        assert np.allclose(meshes[0].parent.geo_vertices[1], [1.0, 0.0, 0.0])
+        assert np.allclose(meshes[2].geo_vertices[2], [0.0, 1.0, 0.0])
+
+class TestSharedModels:
+    @staticmethod
+    def make_matrix(translation, axis, angle, scale):
+        axis = np.asarray(axis, dtype=float) / np.linalg.norm(axis)
+        cross = np.array([
+            [0.0, -axis[2], axis[1]],
+            [axis[2], 0.0, -axis[0]],
+            [-axis[1], axis[0], 0.0]
+        ])
+        matrix = np.identity(4)
+        matrix[0:3, 0:3] = (np.identity(3) + math.sin(angle) * cross
+                            + (1.0 - math.cos(angle)) * cross @ cross) * scale
+        matrix[0:3, 3] = translation
+        return matrix
+
+    @staticmethod
+    def make_triangle(name):
+        mesh = model.Mesh(name=name)
+        mesh.geo_vertices = [np.array([0.0, 0.0, 0.0]), np.array([1.0, 0.0, 0.0]),
+                             np.array([0.0, 1.0, 0.0])]
+        mesh.geo_polygons = [[0, 1, 2]]
+        return mesh
+
+    def test_decompose_matrix(self):
+        rotations = [
+            ([0.0, 0.0, 1.0], 0.0),
+            ([1.0, 2.0, 3.0], 0.7),
+            ([0.0, 1.0, 1.0], math.pi),
+            ([1.0, 0.0, 0.0], -2.0)
+        ]
+        for axis, angle in rotations:
+            matrix = TestSharedModels.make_matrix([1.0, -2.0, 0.5], axis, angle, [1.0, 2.0, 0.5])
+            translation, rotation, scale = mod.decompose_matrix(matrix)
+            restored = TestSharedModels.make_matrix(translation, rotation[0:3], rotation[3], scale)
+            assert np.allclose(restored, matrix)
+
+        assert mod.decompose_matrix(np.diag([-1.0, 1.0, 1.0, 1.0])) is None
+
+    def test_shared_digest(self):
+        first, second = model.Material(), model.Material()
+        first.color.ident, second.color.ident = 'Plastic', 'Plastic'
+        meshes = [TestSharedModels.make_triangle(name) for name in ('First', 'Second')]
+        for mesh, material in zip(meshes, (first, second)):
+            mesh.appearance().material = material
+        assert mod.calc_geometry_digest(meshes[0]) == mod.calc_geometry_digest(meshes[1])
+
+        # Materials with the same name and different properties are not shared
+        second.color.diffuse = np.array([0.5, 0.5, 0.5])
+        assert mod.calc_geometry_digest(meshes[0]) != mod.calc_geometry_digest(meshes[1])
+
+        # Texture coordinates are taken into account
+        second.color.diffuse = first.color.diffuse
+        for mesh, offset in zip(meshes, (0.0, 0.5)):
+            mesh.tex_vertices = [np.array([offset, 0.0]), np.array([1.0, 0.0]),
+                                 np.array([0.0, 1.0])]
+            mesh.tex_polygons = [[0, 1, 2]]
+        assert mod.calc_geometry_digest(meshes[0]) != mod.calc_geometry_digest(meshes[1])
+
+    def test_shared_fallback(self, tmp_path):
+        pattern = TestSharedModels.make_triangle('Pattern')
+        models = []
+        for i, name in enumerate(['First', 'Second', 'Mirrored']):
+            mesh = model.Mesh(parent=pattern, name=name + 'Pin')
+            mesh.translate(np.array([float(i), 0.0, 0.0]))
+            if name == 'Mirrored':
+                mesh.transform.scale(np.array([-1.0, 1.0, 1.0]))
+            models.append(([mesh], name))
+        unique = TestSharedModels.make_triangle('Unique')
+        unique.geo_vertices[0] = np.array([0.0, 0.0, 1.0])
+        models.append(([unique], 'Unique'))
+
+        mod.write_models(models, None, str(tmp_path), False, is_shared=True)
+        assert len(list((tmp_path / 'shared').iterdir())) == 1
+
+        for name, is_referenced in (('First', True), ('Second', True), ('Mirrored', False),
+                                    ('Unique', False)):
+            with open(tmp_path / f'{name}.x3d', 'rb') as file:
+                data = file.read().decode('utf-8')
+            assert ('<Inline' in data) is is_referenced
+
+        mod.write_models(models, None, str(tmp_path), True, is_shared=True)
+        with open(tmp_path / 'First.wrl', 'rb') as file:
+            data = file.read().decode('utf-8')
+        assert 'EXTERNPROTO' not in data
+        assert 'Inline { url "shared/' in data
@@ -244,6 +244,16 @@ class TestHelpers:
         value = curves.calc_bezier_weight(None, None, 1.5707963267948966)
         assert math.isclose(value, 0.5522847498307933) is True
 
+    def test_circle_table(self):
+        table = primitives.make_circle_table(4)
+        assert table.shape == (4, 3)
+        assert np.allclose(table[1], (0.0, 1.0, 0.0))
+        assert primitives.make_circle_table(4) is table
+
+        table = primitives.make_circle_table(2, (0.0, math.pi))
+        assert table.shape == (3, 3)
+        assert np.allclose(table[-1], (-1.0, 0.0, 0.0))
+
     def test_hmils(self):
         value = primitives.hmils(2.54)
         assert math.isclose(value, 1.0) is True
@@ -262,6 +272,145 @@ class TestHelpers:
         value = model.calc_median_point([(1.0, 1.0, 1.0), (-1.0, -1.0, -1.0)])
         assert np.isclose(value, (0.0, 0.0, 0.0)).all().item() is True
 
+    def test_sort_vertices_by_angle(self):
+        points = [
+            np.array([1.0, 0.0, 0.0]),
+            np.array([0.0, -1.0, 0.0]),
+            np.array([-1.0, 0.0, 0.0]),
+            np.array([0.0, 1.0, 0.0])
+        ]
+        normal = np.array([0.0, 0.0, 1.0])
+
+        order = primitives.argsort_vertices_by_angle(points, np.zeros(3), normal)
+        assert order.tolist() == [1, 0, 3, 2]
+
+        vertices = dict(zip(range(10, 14), points))
+        pairs = primitives.sort_vertices_by_angle(vertices, np.zeros(3), normal)
+        assert [key for key, _ in pairs] == [11, 10, 13, 12]
+
+    def test_pattern_registry(self):
+        registry = primitives.PatternRegistry()
+        arguments = {'center': np.zeros(3), 'radius': 1.0, 'edges': 8}
+
+        first = registry.make('Test', None, primitives.make_circle_outline, **arguments)
+        second = registry.make('Test', None, primitives.make_circle_outline, **arguments)
+        assert first is not second
+        assert not registry.shared()
+
+        registry.enabled = True
+        first = registry.make('Test', None, primitives.make_circle_outline, **arguments)
+        second = registry.make('Test', None, primitives.make_circle_outline, **arguments)
+        third = registry.make('Test', None, primitives.make_circle_outline,
+                              center=np.ones(3), radius=1.0, edges=8)
+        assert first is second
+        assert first is not third
+        assert len(registry.shared()) == 2
+
+    def test_instanced_mesh(self):
+        segment = model.Mesh()
+        segment.geo_vertices = [
+            np.array([-0.5, -0.5, 0.0]),
+            np.array([ 0.5, -0.5, 0.0]),
+            np.array([ 0.5,  0.5, 0.0]),
+            np.array([-0.5,  0.5, 0.0])
+        ]
+        segment.geo_polygons = [[0, 1, 2, 3]]
+
+        instances = []
+        for i in range(3):
+            matrix = np.identity(4)
+            matrix[0, 3] = float(i)
+            instances.append((segment, matrix))
+
+        mesh = primitives.make_instanced_mesh(instances)
+        assert len(mesh.geo_vertices) == 8
+        assert len(mesh.geo_polygons) == 3
+        assert mesh.geo_polygons[1][0] == mesh.geo_polygons[0][1]
+        assert mesh.geo_polygons[1][3] == mesh.geo_polygons[0][2]
+        assert not mesh.tex_polygons
+
+        segment.tex_vertices = [np.array([0.0, 0.0]), np.array([1.0, 0.0]),
+                                np.array([1.0, 1.0]), np.array([0.0, 1.0])]
+        segment.tex_polygons = [[0, 1, 2, 3]]
+        mesh = primitives.make_instanced_mesh(instances)
+        assert len(mesh.geo_vertices) == 8
+        assert len(mesh.tex_vertices) == 12
+        assert mesh.tex_polygons[2] == [8, 9, 10, 11]
+
+    def test_decimate_triangles(self):
+        # Closed tessellated sphere
+        rings, segments = 12, 24
+        vertices = [np.array([0.0, 0.0, 1.0])]
+        for i in range(1, rings):
+            theta = math.pi * i / rings
+            for point in primitives.make_circle_table(segments):
+                vertices.append(np.array([point[0] * math.sin(theta), point[1] * math.sin(theta),
+                                          math.cos(theta)]))
+        vertices.append(np.array([0.0, 0.0, -1.0]))
+
+        triangles = []
+        for j in range(segments):
+            triangles.append([0, 1 + j, 1 + (j + 1) % segments])
+        for i in range(rings - 2):
+            for j in range(segments):
+                a, b = 1 + i * segments + j, 1 + i * segments + (j + 1) % segments
+                triangles.extend([[a, a + segments, b + segments], [a, b + segments, b]])
+        last = len(vertices) - 1
+        for j in range(segments):
+            offset = 1 + (rings - 2) * segments
+            triangles.append([last, offset + (j + 1) % segments, offset + j])
+
+        points, faces = primitives.decimate_triangles(vertices, triangles, budget=100)
+        assert len(faces) <= 100
+        assert np.allclose(np.linalg.norm(points, axis=1), 1.0, atol=0.05)
+
+        edges = np.sort(np.concatenate((faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]])),
+                        axis=1)
+        _, counts = np.unique(edges, axis=0, return_counts=True)
+        assert np.all(counts == 2)
+
+    def test_triangulate_polygon(self):
+        # Concave L-shaped polygon
+        vertices = [
+            np.array([0.0, 0.0, 0.0]),
+            np.array([2.0, 0.0, 0.0]),
+            np.array([2.0, 1.0, 0.0]),
+            np.array([1.0, 1.0, 0.0]),
+            np.array([1.0, 2.0, 0.0]),
+            np.array([0.0, 2.0, 0.0])
+        ]
+        triangles = primitives.triangulate_polygon(vertices, [0, 1, 2, 3, 4, 5])
+        assert len(triangles) == 4
+
+        normals = [np.cross(vertices[b] - vertices[a], vertices[c] - vertices[a])
+                   for a, b, c in triangles]
+        assert all(normal[2] > 0.0 for normal in normals)
+        assert math.isclose(sum(normal[2] for normal in normals) / 2.0, 3.0)
+
+        mesh = model.Mesh()
+        mesh.geo_vertices = vertices
+        mesh.geo_polygons = [[0, 1, 2, 3, 4, 5]]
+        mesh.tex_vertices = [np.zeros(2)] * 6
+        mesh.tex_polygons = [[0, 1, 2, 3, 4, 5]]
+        primitives.decimate_mesh(mesh, budget=1)
+        assert mesh.geo_polygons == [[0, 1, 2, 3, 4, 5]]
+
+    def test_quantize_mesh(self):
+        mesh = model.Mesh()
+        mesh.geo_vertices = [
+            np.array([0.0, 0.0, 0.0]),
+            np.array([1.0, 0.0, 0.0]),
+            np.array([1.0, 1.0, 0.0]),
+            np.array([1.00004, 1.00004, 0.0]),
+            np.array([0.0, 1.0, 0.0])
+        ]
+        mesh.geo_polygons = [[0, 1, 2, 3, 4], [1, 2, 3]]
+
+        primitives.quantize_mesh(mesh, 0.001)
+        assert len(mesh.geo_vertices) == 4
+        assert mesh.geo_polygons == [[0, 1, 2, 3]]
+        assert np.allclose(mesh.geo_vertices[2], [1.0, 1.0, 0.0])
+
     def test_round1f(self):
         value = primitives.round1f(1.0)
         assert value == '1'
@@ -537,6 +686,52 @@ class TestPrimitives:
 
         verify_models([mesh], tmp_path, TestPrimitives.FILE_ROTATION_MESH)
 
+    def test_make_tube(self, tmp_path):
+        angles = np.linspace(0.0, math.pi * 4.0, 50)
+        path = np.stack((np.cos(angles), np.sin(angles), angles * 0.1), axis=1)
+        shape = primitives.make_circle_outline(np.zeros(3), 0.1, 12)
+
+        mesh = primitives.make_tube(path=path, shape=shape)
+        assert len(mesh.geo_vertices) == 50 * 12
+        assert len(mesh.geo_polygons) == 49 * 12
+
+        rings = np.array(mesh.geo_vertices).reshape(50, 12, 3)
+        assert np.allclose(np.linalg.norm(rings - path[:, None, :], axis=2), 0.1)
+
+    def test_make_tube_repeated_points(self):
+        angles = np.linspace(0.0, math.pi, 10)
+        path = np.stack((np.cos(angles), np.sin(angles), np.zeros(10)), axis=1)
+        shape = primitives.make_circle_outline(np.zeros(3), 0.1, 8)
+
+        reference = primitives.make_tube(path=path, shape=shape)
+        mesh = primitives.make_tube(path=np.insert(path, [0, 4, 9], path[[0, 4, 9]], axis=0),
+                                    shape=shape)
+        assert np.all(np.isfinite(mesh.geo_vertices))
+        assert np.allclose(mesh.geo_vertices, reference.geo_vertices)
+        assert mesh.geo_polygons == reference.geo_polygons
+
+        try:
+            primitives.make_tube(path=np.zeros((3, 3)), shape=shape)
+            failed = False
+        except ValueError:
+            failed = True
+        assert failed is True
+
+    def test_make_lathe(self, tmp_path):
+        curve = TestPrimitives.make_barrel_curve(radius=1.0, height=2.0, edge_resolution=3)
+        slices = curves.rotate(curve=curve, axis=np.array([0.0, 0.0, 1.0]), edges=24)
+        grid = primitives.make_lathe(primitives.make_lathe_profile(curve), 24)
+        assert np.allclose(grid, np.array(slices))
+
+        reference = geometry.build_rotation_mesh(slices=slices, wrap=True, invert=True)
+        mesh = primitives.make_lathe_mesh(grid=grid, wrap=True, inversion=True)
+        assert mesh.geo_polygons == reference.geo_polygons
+
+        grid = primitives.make_lathe(primitives.make_lathe_profile(curve), 6,
+                                     (0.0, math.pi / 2.0))
+        assert len(grid) == 7
+        assert np.allclose(grid[-1][1], [0.0, -0.8, 0.0])
+
 
 class TestBox:
     FILE_BANDED_BOX_HP = 'test_banded_box_hp.x3d'